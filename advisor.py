@@ -0,0 +1,136 @@
+# advisor.py
+# Asyncio advisor layer
+# - One pooled AsyncOpenAI client (keep-alive HTTP connections) per AsyncAdvisor
+# - Semaphore capping in-flight requests, per-call timeout
+# - submit() returns a task so the turn keeps computing/rendering while the LLM answers
+# - stream()/advise_stream() yield the reply as it is generated (time-to-first-token latency)
+# Works against any chat-completions endpoint (base_url), e.g. llm_stub.StubLLMServer.
+
+import asyncio
+from typing import AsyncIterator, Callable, Optional
+
+from engine import LLM_FALLBACK_ADVICE, LLM_FALLBACK_PREFIX
+
+ADVISOR_SYSTEM = "You are a concise, lively advisor."
+
+
+class AsyncAdvisor:
+    def __init__(self, model: str = "gpt-4o-mini", base_url: Optional[str] = None,
+                 api_key: Optional[str] = None, max_concurrency: int = 4, timeout: float = 30.0,
+                 temperature: float = 0.8, max_tokens: int = 400, system: str = ADVISOR_SYSTEM):
+        self.model = model
+        self.base_url = base_url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.system = system
+        self.max_concurrency = max_concurrency
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._client = None
+
+    @property
+    def client(self):
+        # Created on first use and kept for the advisor's lifetime (connection pool)
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url,
+                                       timeout=self.timeout, max_retries=0)
+        return self._client
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Built inside the running loop (Python 3.9 binds primitives at creation)
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+        return self._sem
+
+    def messages(self, prompt: str):
+        return [{"role": "system", "content": self.system}, {"role": "user", "content": prompt}]
+
+    async def complete(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Raw completion; raises on provider errors and asyncio.TimeoutError past the deadline."""
+        async with self.semaphore:
+            resp = await asyncio.wait_for(
+                self.client.chat.completions.create(
+                    model=self.model, messages=self.messages(prompt),
+                    temperature=self.temperature, max_tokens=self.max_tokens,
+                ),
+                timeout if timeout is not None else self.timeout,
+            )
+        return resp.choices[0].message.content
+
+    async def advise(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Same contract as engine.openai_llm_call: never raises, falls back to a canned advice."""
+        try:
+            return await self.complete(prompt, timeout)
+        except asyncio.TimeoutError:
+            return f"{LLM_FALLBACK_PREFIX} timeout\n" + LLM_FALLBACK_ADVICE
+        except Exception as e:
+            return f"{LLM_FALLBACK_PREFIX} {e}\n" + LLM_FALLBACK_ADVICE
+
+    async def stream(self, prompt: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Raw streamed completion: text deltas as they arrive.
+
+        Raises like complete(); `timeout` bounds the wait for the first and for each next chunk.
+        A stream closed before its finish_reason chunk raises ConnectionError (cut short).
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        async with self.semaphore:
+            resp = await asyncio.wait_for(
+                self.client.chat.completions.create(
+                    model=self.model, messages=self.messages(prompt),
+                    temperature=self.temperature, max_tokens=self.max_tokens, stream=True,
+                ),
+                timeout,
+            )
+            chunks = resp.__aiter__()
+            finished = False
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+                except StopAsyncIteration:
+                    break
+                if chunk.choices:
+                    if chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+                    finished = finished or bool(chunk.choices[0].finish_reason)
+            if not finished:
+                raise ConnectionError("stream closed before its last chunk")
+
+    async def advise_stream(self, prompt: str, on_delta: Callable[[str], None],
+                            timeout: Optional[float] = None) -> str:
+        """advise() with streaming: on_delta(text) per chunk, full text returned, never raises.
+
+        On failure the canned advice is returned, not passed to on_delta; a stream cut
+        mid-way also returns it (prefixed, so AdvisorCache never keeps the partial text).
+        """
+        parts = []
+        try:
+            async for delta in self.stream(prompt, timeout):
+                parts.append(delta)
+                on_delta(delta)
+            return "".join(parts)
+        except Exception as e:
+            reason = "timeout" if isinstance(e, asyncio.TimeoutError) else e
+            if parts:
+                reason = f"flux interrompu ({reason})"
+            return f"{LLM_FALLBACK_PREFIX} {reason}\n" + LLM_FALLBACK_ADVICE
+
+    def submit(self, prompt: str, timeout: Optional[float] = None) -> "asyncio.Task[str]":
+        """Starts the request in the background; await the task when the text is needed."""
+        return asyncio.ensure_future(self.advise(prompt, timeout))
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+
+__all__ = ["AsyncAdvisor"]
@@ -0,0 +1,133 @@
+# advisor_cache.py
+# Content-addressed cache for advisor responses
+# - Key: sha256 of canonical JSON over the prompt inputs (report, events, last actions)
+#   plus the static build_advisor_prompt.md text and TEMPLATE_VERSION
+# - In-memory LRU with TTL, optional on-disk store that survives restarts
+# - Hit/miss counters; fallback answers are never stored
+# - Thread-safe: a hedged call abandoned past its deadline (local_advisor.hedge_sync) still
+#   finishes on a pool thread and stores its answer there
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from engine import LLM_FALLBACK_PREFIX
+from prompt_builder import load_template
+
+# Bump when the way the prompt is assembled from its inputs changes
+TEMPLATE_VERSION = 1
+
+
+def canonical_json(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class AdvisorCache:
+    def __init__(self, max_entries: int = 512, ttl: float = 24 * 3600.0, directory: Optional[str] = None,
+                 template_path: str = "build_advisor_prompt.md", clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = Path(directory) if directory else None
+        self.template_path = template_path
+        self.clock = clock
+        self._mem: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()  # get/put/clear; the LLM call itself runs outside it
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    # --- keys ---
+    def template_digest(self) -> str:
+        """Hash of the static prompt text, recomputed only when the file changes."""
+        try:
+            return load_template(self.template_path).digest
+        except OSError:
+            return ""
+
+    def key(self, report: Dict, events: List[str], last_actions: str) -> str:
+        payload = canonical_json({
+            "v": TEMPLATE_VERSION,
+            "template": self.template_digest(),
+            "report": report,
+            "events": list(events or []),
+            "last_actions": (last_actions or "").strip(),
+        })
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # --- storage ---
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            now = self.clock()
+            entry = self._mem.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl:
+                    self._mem.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._mem[key]
+            if self.directory is not None:
+                try:
+                    with open(self._path(key), "r", encoding="utf-8") as fh:
+                        stored = json.load(fh)
+                    if now - stored["created"] <= self.ttl:
+                        self._remember(key, stored["created"], stored["text"])
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return stored["text"]
+                except (OSError, ValueError, KeyError):
+                    pass
+            self.misses += 1
+            return None
+
+    def _remember(self, key: str, created: float, text: str):
+        self._mem[key] = (created, text)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def put(self, key: str, text: str):
+        if not text or text.startswith(LLM_FALLBACK_PREFIX):
+            return
+        with self._lock:
+            created = self.clock()
+            self._remember(key, created, text)
+            if self.directory is not None:
+                path = self._path(key)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(".tmp")
+                with open(tmp, "w", encoding="utf-8") as fh:
+                    json.dump({"created": created, "text": text}, fh, ensure_ascii=False)
+                os.replace(tmp, path)
+
+    def get_or_call(self, key: str, call: Callable[[], str]) -> str:
+        text = self.get(key)
+        if text is None:
+            text = call()
+            self.put(key, text)
+        return text
+
+    async def aget_or_call(self, key: str, call: Callable[[], Awaitable[str]]) -> str:
+        text = self.get(key)
+        if text is None:
+            text = await call()
+            self.put(key, text)
+        return text
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "disk_hits": self.disk_hits, "entries": len(self._mem)}
+
+
+__all__ = ["AdvisorCache", "TEMPLATE_VERSION", "canonical_json"]
@@ -0,0 +1,114 @@
+# advisor_sections.py
+# Incremental parser for the advisor's tagged reply: [NARRATION] [BILAN] [OPPORTUNITÉS] [CHOIX]
+# - feed() takes stream deltas of any size; a tag split across deltas is held back, not misread
+# - on_section(name, text) fires when a section is closed by the next tag or the end of the reply
+# - on_choices(choices) fires once, as soon as the [CHOIX] menu is complete (expected count of
+#   numbered lines, next tag, or end of reply): the menu is usable before the stream ends
+# - Replies without a [CHOIX] block (canned fallback "[1] ..., [2] ...") still yield a menu on close()
+
+import re
+from typing import Callable, Dict, List, Optional
+
+SECTIONS = ("NARRATION", "BILAN", "OPPORTUNITÉS", "CHOIX")
+_TAG = re.compile(r"\[(NARRATION|BILAN|OPPORTUNIT[ÉE]S|CHOIX)\]", re.IGNORECASE)
+_TAG_MAX = max(len(s) for s in SECTIONS) + 2
+_CHOICE = re.compile(r"^\s*(?:[-*]\s*)?\(?(\d+)[.):\]]\s*(.+?)\s*$")
+_INLINE_CHOICE = re.compile(r"\[(\d+)\]\s*([^\[]+?)\s*(?:,\s*)?(?=\[\d+\]|$)")
+
+
+def _name(tag: str) -> str:
+    tag = tag.upper()
+    return "OPPORTUNITÉS" if tag.startswith("OPPORTUNIT") else tag
+
+
+class SectionParser:
+    def __init__(self, expected_choices: int = 3,
+                 on_section: Optional[Callable[[str, str], None]] = None,
+                 on_choices: Optional[Callable[[List[str]], None]] = None):
+        self.expected_choices = expected_choices
+        self.on_section = on_section
+        self.on_choices = on_choices
+        self.sections: Dict[str, str] = {}  # "" holds any text before the first tag
+        self.current = ""
+        self.choices: List[str] = []
+        self.choices_ready = False
+        self.text = ""
+        self._buf = ""
+        self._line = ""
+
+    # --- input ---
+    def feed(self, delta: str):
+        self.text += delta
+        buf = self._buf + delta
+        while True:
+            m = _TAG.search(buf)
+            if m is None:
+                break
+            self._append(buf[:m.start()])
+            self._end_section()
+            self.current = _name(m.group(1))
+            self.sections.setdefault(self.current, "")
+            buf = buf[m.end():]
+        # Hold back a trailing "[OPPORT" that the next delta may turn into a tag
+        cut = buf.rfind("[")
+        if cut >= 0 and "]" not in buf[cut:] and len(buf) - cut < _TAG_MAX:
+            self._append(buf[:cut])
+            self._buf = buf[cut:]
+        else:
+            self._append(buf)
+            self._buf = ""
+
+    def close(self) -> Dict[str, str]:
+        """Flushes the reply; returns the sections, stripped."""
+        self._append(self._buf)
+        self._buf = ""
+        self._end_section()
+        if not self.choices_ready and not self.choices:
+            self.choices = [c for _, c in _INLINE_CHOICE.findall(self.text)]
+            self._choices_done()
+        self.sections = {k: v.strip() for k, v in self.sections.items()}
+        return self.sections
+
+    # --- internals ---
+    def _append(self, text: str):
+        if not text:
+            return
+        self.sections[self.current] = self.sections.get(self.current, "") + text
+        if self.current == "CHOIX" and not self.choices_ready:
+            lines = (self._line + text).split("\n")
+            self._line = lines.pop()
+            for line in lines:
+                self._choice(line)
+
+    def _choice(self, line: str):
+        m = _CHOICE.match(line)
+        if m:
+            self.choices.append(m.group(2))
+            if len(self.choices) >= self.expected_choices:
+                self._choices_done()
+
+    def _choices_done(self):
+        if not self.choices_ready and self.choices:
+            self.choices_ready = True
+            if self.on_choices is not None:
+                self.on_choices(list(self.choices))
+
+    def _end_section(self):
+        if self.current == "CHOIX":
+            if not self.choices_ready:
+                self._choice(self._line)
+                self._choices_done()
+            self._line = ""
+        if self.current and self.on_section is not None:
+            self.on_section(self.current, self.sections.get(self.current, "").strip())
+
+
+def parse_sections(text: str, expected_choices: int = 3) -> SectionParser:
+    """Whole-reply parse (cache hits, non-streaming calls): .sections and .choices."""
+    p = SectionParser(expected_choices)
+    p.feed(text)
+    p.close()
+    return p
+
+
+__all__ = ["SECTIONS", "SectionParser", "parse_sections"]
@@ -0,0 +1,335 @@
+# batch.py
+# Vectorized tribe engine for balance campaigns
+# - Dense arrays: demographics (tribe), assignments (tribe × activity × worker), stocks (tribe),
+#   activities present in each tribe's mapping (tribe × activity, kept even when emptied to 0)
+# - One next_turn for N tribes as a few matrix products against PRODUCTION_RULES
+# - Same integer truncations as the scalar Tribe, so reports match exactly
+# - InertiaBatch: InertiaTracker for all tribes at once (last assignments and cooldowns as arrays)
+# - EventBatch: event scheduling for all tribes at once (skip-ahead counters and cooldowns as arrays)
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from engine import (
+    Demographics, Assignments, Resources, Tribe, Ruleset, InertiaTracker, EventSpec, default_ruleset,
+    event_specs,
+)
+
+DEMO_FIELDS = ("men", "women_active", "women_pregnant", "babies", "children", "grandpas", "grandmas", "king")
+STOCK_KEYS = ("🥫", "🔧")
+COVERAGE_ACTIVITIES = ("🎭", "📚", "👩‍🍼")
+
+
+def _round1(values: np.ndarray) -> np.ndarray:
+    # np.round(x, 1) rounds x*10 in binary and only disagrees with round(x, 1)
+    # when x*10 sits on a .5 boundary; redo those few in Python.
+    out = np.round(values, 1)
+    scaled = values * 10.0
+    tie = np.nonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)[0]
+    if tie.size:
+        out[tie] = [round(v, 1) for v in values[tie].tolist()]
+    return out
+
+
+class TribeBatch:
+    """N tribes stored as dense arrays, stepped together with the scalar Tribe rules."""
+
+    def __init__(self, n: int, seasons: Sequence[str] = None, rules: Optional[Ruleset] = None):
+        self.rules = rules if rules is not None else default_ruleset()
+        self.activities: List[str] = list(self.rules.activities)
+        self.workers: List[str] = list(self.rules.workers)
+        self.activity_id = self.rules.activity_id
+        self.worker_id = self.rules.worker_id
+        self.seasons: List[str] = list(seasons or self.rules.season_factor.keys())
+        self.season_id = {s: i for i, s in enumerate(self.seasons)}
+
+        A, W = len(self.activities), len(self.workers)
+        self.n = n
+        self.demo = np.zeros((n, len(DEMO_FIELDS)), dtype=np.int64)
+        self.assign = np.zeros((n, A, W), dtype=np.int32)
+        self.present = np.zeros((n, A), dtype=bool)  # activity key in the mapping, even at 0 workers
+        self.stocks = np.zeros((n, len(STOCK_KEYS)), dtype=np.int64)
+        self.season = np.zeros(n, dtype=np.int64)
+        self.king_activity = np.full(n, -1, dtype=np.int64)
+        self.king_bonus = np.zeros(n, dtype=np.float64)
+        self._compile()
+
+    def _compile(self):
+        # One coefficient row per activity: production for stockables, capacity
+        # per worker for covered activities, organization points for 🏛. A single
+        # product then yields flows, storage capacity and coverage capacities.
+        rs = self.rules
+        coef = np.zeros((len(self.activities), len(self.workers)), dtype=np.int64)
+        for aid in rs.stockable:
+            for wid, c in rs.rows[aid]:
+                coef[aid, wid] = c
+        for aid, row in rs.capacity_rows.items():
+            for wid, per in row:
+                coef[aid, wid] = per
+        if rs.org >= 0:
+            coef[rs.org, rs.king] = 1
+            coef[rs.org, rs.spec_org] = 2
+        self.coef = coef
+        self.stockable = np.zeros(len(self.activities), dtype=bool)
+        self.stockable[list(rs.stockable)] = True
+        self.season_factor = np.array([rs.season_factor.get(s, 1.0) for s in self.seasons], dtype=np.float64)
+
+    # --- conversion helpers ---
+    def _season_index(self, season: str) -> int:
+        if season not in self.season_id:
+            self.season_id[season] = len(self.seasons)
+            self.seasons.append(season)
+            self.season_factor = np.append(self.season_factor, self.rules.season_factor.get(season, 1.0))
+        return self.season_id[season]
+
+    def set_tribe(self, i: int, tribe: Tribe):
+        self.demo[i] = [getattr(tribe.demo, f) for f in DEMO_FIELDS]
+        self.assign[i] = self.rules.counts(tribe.assign)
+        self.present[i] = False
+        self.present[i, [self.activity_id[a] for a in tribe.assign.per_activity]] = True
+        self.stocks[i] = [tribe.res.stocks.get(k, 0) for k in STOCK_KEYS]
+        self.season[i] = self._season_index(tribe.season)
+        self.king_activity[i] = self.activity_id.get(tribe.king_activity, -1)
+        self.king_bonus[i] = tribe.king_bonus
+
+    @classmethod
+    def from_tribes(cls, tribes: Sequence[Tribe]) -> "TribeBatch":
+        batch = cls(len(tribes))
+        for i, t in enumerate(tribes):
+            batch.set_tribe(i, t)
+        return batch
+
+    def tribe(self, i: int) -> Tribe:
+        """Rebuild a scalar Tribe from row i (zero counts are dropped, present activities kept)."""
+        demo = Demographics(**{f: int(v) for f, v in zip(DEMO_FIELDS, self.demo[i])})
+        per_activity: Dict[str, Dict[str, int]] = {self.activities[a]: {} for a in np.flatnonzero(self.present[i])}
+        for a, w in zip(*np.nonzero(self.assign[i])):
+            per_activity.setdefault(self.activities[a], {})[self.workers[w]] = int(self.assign[i, a, w])
+        k = int(self.king_activity[i])
+        return Tribe(
+            demo=demo, assign=Assignments(per_activity=per_activity),
+            res=Resources(stocks={key: int(v) for key, v in zip(STOCK_KEYS, self.stocks[i])}),
+            season=self.seasons[int(self.season[i])],
+            king_activity=self.activities[k] if k >= 0 else "",
+            king_bonus=float(self.king_bonus[i]),
+        )
+
+    def presence(self, rows: np.ndarray, assign: Optional[np.ndarray] = None) -> np.ndarray:
+        """(len(rows), A) bool: activities in those tribes' mappings (listed, or holding workers)."""
+        assign = self.assign if assign is None else assign
+        return self.present[rows] | assign[rows].any(axis=2)
+
+    # --- turn computation ---
+    def compute_base(self) -> np.ndarray:
+        self.base = np.einsum("naw,aw->na", self.assign, self.coef)
+        return self.base
+
+    def compute_stockable_flows(self) -> np.ndarray:
+        flows = self.base.copy()
+        flows[:, ~self.stockable] = 0
+        agri = self.rules.agri
+        if agri >= 0:
+            flows[:, agri] = (flows[:, agri] * self.season_factor[self.season]).astype(np.int64)
+        rows = np.nonzero(self.king_activity >= 0)[0]
+        acts = self.king_activity[rows]
+        rows = rows[self.stockable[acts] & (self.assign[rows, acts, self.rules.king] > 0)]
+        acts = self.king_activity[rows]
+        flows[rows, acts] = (flows[rows, acts] * (1.0 + self.king_bonus[rows])).astype(np.int64)
+        return flows
+
+    def compute_food_and_storage(self, flows: np.ndarray) -> Dict[str, np.ndarray]:
+        produced = flows[:, list(self.rules.food)].sum(axis=1)
+        consumed = self.demo.sum(axis=1)
+        net = produced - consumed
+        store = self.rules.store
+        cap = self.base[:, store]
+        stored = np.maximum(0, np.minimum(net, cap))
+        flows[:, store] = stored
+        return {"produced": produced, "consumed": consumed, "net": net, "stored": stored, "capacity": cap}
+
+    def update_stocks(self, flows: np.ndarray):
+        for k, res_name in enumerate(STOCK_KEYS):
+            a = self.activity_id.get(res_name)
+            if a is not None:
+                self.stocks[:, k] += flows[:, a]
+
+    def non_stock_coverages(self) -> Dict[str, Dict[str, np.ndarray]]:
+        zeros = np.zeros(self.n, dtype=np.int64)
+        needs_by_key = {
+            "population_total": self.demo.sum(axis=1),
+            "children_only": self.demo[:, DEMO_FIELDS.index("children")],
+            "babies_only": self.demo[:, DEMO_FIELDS.index("babies")],
+        }
+        out = {}
+        for act in COVERAGE_ACTIVITIES:
+            aid = self.activity_id.get(act)
+            if aid not in self.rules.capacity_rows:
+                out[act] = {"coverage_pct": np.zeros(self.n), "needs": zeros, "capacity": np.zeros(self.n)}
+                continue
+            needs = needs_by_key.get(self.rules.needs[aid], zeros)
+            cap = self.base[:, aid].astype(np.float64)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                pct = np.where(needs == 0, 100.0, np.minimum(100.0, 100.0 * cap / needs))
+            out[act] = {"coverage_pct": _round1(pct), "needs": needs, "capacity": cap}
+        org_points = self.base[:, self.rules.org] if self.rules.org >= 0 else zeros
+        out["🏛"] = {"maturity_index": np.where(org_points > 0, np.minimum(100, 20 + org_points * 10), 10)}
+        return out
+
+    def next_turn(self) -> Dict:
+        self.compute_base()
+        flows = self.compute_stockable_flows()
+        food = self.compute_food_and_storage(flows)
+        self.update_stocks(flows)
+        cover = self.non_stock_coverages()
+        self.flows = flows
+        self.food = food
+        self.cover = cover
+        return {
+            "population_total": food["consumed"],
+            "flows": flows,
+            "stocks": self.stocks,
+            "food_report": food,
+            "coverage": cover,
+        }
+
+    def report(self, i: int) -> Dict:
+        """Row i of the last next_turn as the dict returned by Tribe.next_turn."""
+        flows = {a: int(self.flows[i, k]) for k, a in enumerate(self.activities) if self.stockable[k]}
+        flows["🍛_net"] = int(self.food["net"][i])
+        coverage = {}
+        for act in COVERAGE_ACTIVITIES:
+            c = self.cover[act]
+            coverage[act] = {"coverage_pct": float(c["coverage_pct"][i]), "needs": int(c["needs"][i]), "capacity": float(c["capacity"][i])}
+        coverage["🏛"] = {"maturity_index": int(self.cover["🏛"]["maturity_index"][i])}
+        return {
+            "population_total": int(self.food["consumed"][i]),
+            "season": self.seasons[int(self.season[i])],
+            "flows": flows,
+            "stocks": {k: int(v) for k, v in zip(STOCK_KEYS, self.stocks[i])},
+            "food_report": {k: int(v[i]) for k, v in self.food.items()},
+            "coverage": coverage,
+        }
+
+
+class InertiaBatch:
+    """InertiaTracker semantics for a TribeBatch, one vectorized apply() per turn.
+
+    An activity is present for a tribe when it is in the tribe's mapping (TribeBatch.presence:
+    the present mask or nonzero workers), as for the scalar tracker: only present activities
+    trigger a cooldown or are penalized, and an activity absent last turn is diffed against zero.
+    """
+
+    def __init__(self, batch: TribeBatch, penalty: float = 0.10, threshold: int = 3, cooldown_len: int = 2):
+        self.batch = batch
+        self.penalty = penalty
+        self.threshold = threshold
+        self.cooldown_len = cooldown_len
+        n, A, W = batch.assign.shape
+        self.last = np.zeros((n, A, W), dtype=batch.assign.dtype)
+        self.cooldown = np.zeros((n, A), dtype=np.int32)
+
+    def set_tracker(self, i: int, tracker: InertiaTracker):
+        self.last[i] = self.batch.rules.counts(Assignments(tracker.last_assignments))
+        self.cooldown[i] = 0
+        for act, n in tracker.cooldowns.items():
+            a = self.batch.activity_id.get(act)
+            if a is not None:
+                self.cooldown[i, a] = max(0, n)
+
+    @classmethod
+    def from_trackers(cls, batch: TribeBatch, trackers: Sequence[InertiaTracker]) -> "InertiaBatch":
+        t0 = trackers[0]
+        inertia = cls(batch, t0.penalty, t0.threshold, t0.cooldown_len)
+        for i, t in enumerate(trackers):
+            inertia.set_tracker(i, t)
+        return inertia
+
+    def tracker(self, i: int) -> InertiaTracker:
+        b = self.batch
+        last: Dict[str, Dict[str, int]] = {}
+        for a, w in zip(*np.nonzero(self.last[i])):
+            last.setdefault(b.activities[a], {})[b.workers[w]] = int(self.last[i, a, w])
+        cooldowns = {b.activities[a]: int(self.cooldown[i, a]) for a in np.nonzero(self.cooldown[i])[0]}
+        return InertiaTracker(last, self.penalty, self.threshold, cooldowns, self.cooldown_len)
+
+    def apply(self, flows: np.ndarray, assign: Optional[np.ndarray] = None) -> np.ndarray:
+        """Penalized copy of the (N, A) flows from TribeBatch.next_turn; advances cooldowns."""
+        assign = self.batch.assign if assign is None else assign
+        n = assign.shape[0]
+        # Diff only the tribes whose assignments changed since the last call
+        changed = np.flatnonzero((assign != self.last).reshape(n, -1).any(axis=1))
+        if changed.size:
+            cur = assign[changed]
+            moved = np.einsum("naw->na", np.abs(cur - self.last[changed]))
+            trigger = self.batch.presence(changed, assign) & (moved > self.threshold)
+            cd = self.cooldown[changed]
+            cd[trigger] = max(0, self.cooldown_len)
+            self.cooldown[changed] = cd
+            self.last[changed] = cur
+        out = flows.copy()
+        rows = np.flatnonzero(self.cooldown.any(axis=1))
+        if rows.size:
+            cd = self.cooldown[rows]
+            hit = (cd > 0) & self.batch.presence(rows, assign) & self.batch.stockable
+            f = out[rows]
+            f[hit] = (f[hit] * (1 - self.penalty)).astype(np.int64)
+            out[rows] = f
+            self.cooldown[rows] = np.maximum(cd - 1, 0)
+        return out
+
+
+class EventBatch:
+    """EventEngine scheduling for a TribeBatch: one vectorized roll() per turn.
+
+    Same model as the scalar engine: each spec is a Bernoulli trial on every turn of its
+    seasons outside its cooldown, sampled by geometric skip-ahead (misses left per tribe
+    and spec), so random draws happen only on hits. Effects act on Tribe objects and are
+    left to the caller; roll() returns the (N, E) hit matrix.
+    """
+
+    def __init__(self, batch: TribeBatch, specs_by_season: Dict[str, List[EventSpec]], rng_seed: int = 123):
+        self.batch = batch
+        self.specs, self.spec_seasons = event_specs(specs_by_season)
+        E = len(self.specs)
+        self.in_season = np.zeros((0, E), dtype=bool)  # batch season id -> specs rolled in it
+        self._sync_seasons()
+        self.prob = np.array([spec.probability for spec in self.specs], dtype=np.float64)
+        self.cooldown_len = np.array([spec.cooldown for spec in self.specs], dtype=np.int32)
+        self.rng = np.random.default_rng(rng_seed)
+        self.left = self._misses(np.broadcast_to(self.prob, (batch.n, E)))  # misses before the next hit
+        self.cooldown = np.zeros((batch.n, E), dtype=np.int32)             # turns still blocked
+
+    def _sync_seasons(self):
+        # Rows for seasons the batch has added since (TribeBatch._season_index)
+        added = self.batch.seasons[len(self.in_season):]
+        if added:
+            rows = np.array([[s in key for key in self.spec_seasons] for s in added], dtype=bool)
+            self.in_season = np.concatenate([self.in_season, rows.reshape(len(added), -1)])
+
+    def _misses(self, p: np.ndarray) -> np.ndarray:
+        # Geometric number of misses; p <= 0 never hits
+        never = p <= 0
+        k = self.rng.geometric(np.where(never, 1.0, np.minimum(p, 1.0))) - 1
+        k[never] = np.iinfo(np.int64).max
+        return k
+
+    def roll(self) -> np.ndarray:
+        """(N, E) bool: events hitting each tribe this turn; advances skip-ahead and cooldowns."""
+        blocked = self.cooldown > 0
+        self.cooldown -= blocked
+        self._sync_seasons()
+        trial = self.in_season[self.batch.season] & ~blocked
+        self.left -= trial
+        hits = trial & (self.left < 0)
+        rows, cols = np.nonzero(hits)
+        if rows.size:
+            self.left[rows, cols] = self._misses(self.prob[cols])
+            self.cooldown[rows, cols] = self.cooldown_len[cols]
+        return hits
+
+    def names(self, hits: np.ndarray, i: int) -> List[str]:
+        return [self.specs[e].name for e in np.flatnonzero(hits[i])]
+
+
+__all__ = ["TribeBatch", "InertiaBatch", "EventBatch"]
@@ -0,0 +1,327 @@
+# bench.py
+# Benchmark suite for every turn phase, with stored baselines
+# - Phases: Tribe.next_turn (clean / reassigned), InertiaTracker.apply, EventEngine.roll,
+#   render_compact, build_advisor_prompt / PromptBuilder, HistoryMemory and TurnJournal appends
+# - Scales: 1 tribe, 1k tribes (scalar objects), 100k tribes (batch engine, engine phases only),
+#   10k-turn campaigns (headless, and full pipeline with the in-process stub LLM reply)
+# - JSON results; --baseline compares against a stored run and fails past --threshold %
+#
+# Usage:
+#   python bench.py                                   # table on stdout
+#   python bench.py --json bench_output.json --baseline bench_baseline.json
+#   python bench.py --save-baseline bench_baseline.json
+#   python bench.py --phases next_turn,inertia --scales 1,1k
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import timeit
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from engine import (
+    Demographics, Assignments, Resources, Tribe, InertiaTracker, EventEngine, render_compact, step_turn,
+    MAN, WOMAN, CHILD, KING, SPEC_AGRI, SPEC_FISH, SPEC_ARMY, SPEC_NURSE,
+)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCALES = {"1": 1, "1k": 1_000, "100k": 100_000}
+CAMPAIGN_TURNS = 10_000
+SEASONS = ("spring", "summer", "autumn", "winter")
+DEFAULT_THRESHOLD = 10.0  # % slower than the baseline counts as a regression
+
+
+@dataclass
+class Case:
+    phase: str
+    scale: str
+    tribes: int
+    setup: Callable[[], Callable[[], None]]  # returns one call: a turn at this scale
+    repeat: int = 5
+
+    @property
+    def key(self) -> str:
+        return f"{self.phase}@{self.scale}"
+
+
+# --- fixtures ---
+def sample_tribe(rng: random.Random) -> Tribe:
+    demo = Demographics(men=rng.randint(20, 32), women_active=rng.randint(8, 14), women_pregnant=rng.randint(10, 22),
+                        babies=rng.randint(15, 25), children=rng.randint(12, 20), grandpas=2, grandmas=1, king=1)
+    pa = {"🌾": {MAN: 10, SPEC_AGRI: 2, KING: 1}, "🐟": {SPEC_FISH: 1, CHILD: 6}, "🦌": {SPEC_ARMY: 3}, "🥫": {MAN: 3},
+          "🔧": {MAN: 3}, "📚": {MAN: 1, WOMAN: 1}, "👩‍🍼": {WOMAN: 8, SPEC_NURSE: 1}, "🏛": {KING: 1}}
+    return Tribe(demo, Assignments(pa), Resources(stocks={"🥫": rng.randint(50, 300), "🔧": 5}),
+                 season=rng.choice(SEASONS))
+
+
+def tribes(n: int, seed: int = 1) -> List[Tribe]:
+    rng = random.Random(seed)
+    return [sample_tribe(rng) for _ in range(n)]
+
+
+def event_specs() -> Dict:
+    from config_loader import load_game_config
+    return load_game_config(os.path.join(HERE, "config.yaml")).specs_by_season
+
+
+def stub_reply(prompt: str) -> str:
+    from llm_stub import DEFAULT_REPLY
+    return DEFAULT_REPLY
+
+
+def batch_of(n: int):
+    from batch import TribeBatch
+    rng = random.Random(1)
+    b = TribeBatch(n, seasons=SEASONS)
+    b.set_tribe(0, sample_tribe(rng))
+    for name in ("demo", "assign", "stocks", "season", "king_activity", "king_bonus"):
+        getattr(b, name)[1:] = getattr(b, name)[0]
+    b.season[:] = [i % len(SEASONS) for i in range(n)]
+    return b
+
+
+# --- scalar phases (1, 1k) ---
+def next_turn(n: int):
+    ts = tribes(n)
+    def run():
+        for t in ts:
+            t.next_turn()
+    return run
+
+
+def next_turn_dirty(n: int):
+    ts = tribes(n)
+    step = [1]
+    def run():
+        d = step[0]
+        step[0] = -d  # +1 / -1 woman on 🌾 every other turn: every turn recomputes an activity
+        for t in ts:
+            t.assign.add("🌾", WOMAN, d)
+            t.next_turn()
+    return run
+
+
+def inertia(n: int):
+    ts = tribes(n)
+    pairs = [(t, InertiaTracker(last_assignments=t.assign.to_dict()), dict(t.next_turn()["flows"])) for t in ts]
+    def run():
+        for t, tr, flows in pairs:
+            tr.apply(t.assign.per_activity, flows)
+    return run
+
+
+def events(n: int):
+    specs = event_specs()
+    pairs = [(t, EventEngine(specs, rng_seed=i)) for i, t in enumerate(tribes(n))]
+    def run():
+        for t, ev in pairs:
+            ev.roll(t)
+            t.effects.active.clear()  # next_turn is not run here: keep the table from growing
+    return run
+
+
+def render(n: int):
+    items = [(t, t.next_turn()) for t in tribes(n)]
+    def run():
+        for t, report in items:
+            render_compact(report, t.assign, t.demo)
+    return run
+
+
+def advisor_prompt(n: int):
+    from engine_integration import build_advisor_prompt
+    items = [(t.next_turn(), render_compact(t.next_turn(), t.assign, t.demo)) for t in tribes(n)]
+    def run():
+        for report, compact in items:
+            build_advisor_prompt(report, compact, "[Tour 1] ...", ["Pluie abondante"], "(N/A)")
+    return run
+
+
+def prompt_builder(n: int):
+    from prompt_builder import PromptBuilder
+    items = []
+    for t in tribes(n):
+        report = t.next_turn()
+        pb = PromptBuilder(os.path.join(HERE, "build_advisor_prompt.md"))
+        items.append((pb, t, report, render_compact(report, t.assign, t.demo)))
+    def run():
+        for pb, t, report, compact in items:
+            pb.build(t.next_turn(), compact, "[Tour 1] ...", ["Pluie abondante"], "(N/A)")
+    return run
+
+
+def history(n: int):
+    from history_memory import HistoryMemory
+    items = [(HistoryMemory(), t.next_turn()) for t in tribes(n)]
+    turn = [0]
+    def run():
+        turn[0] += 1
+        for mem, report in items:
+            mem.add_turn(turn[0], report, ["Pluie abondante"], stub_reply(""))
+    return run
+
+
+def journal(n: int):
+    from journal import TurnJournal
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-"), "history.jsonl")
+    j = TurnJournal(path, fsync="never")
+    items = [(t.next_turn(), render_compact(t.next_turn(), t.assign, t.demo)) for t in tribes(n)]
+    turn = [0]
+    def run():
+        for report, compact in items:
+            turn[0] += 1
+            j.append(turn[0], report, compact, stub_reply(""), "(N/A)", ["Pluie abondante"], ts="2000-01-01T00:00:00")
+        j.flush()
+    return run
+
+
+# --- batch phases (100k) ---
+def batch_next_turn(n: int):
+    b = batch_of(n)
+    return lambda: b.next_turn()
+
+
+def batch_inertia(n: int):
+    from batch import InertiaBatch
+    b = batch_of(n)
+    ib = InertiaBatch(b)
+    b.compute_base()
+    flows = b.compute_stockable_flows()
+    ib.apply(flows)
+    return lambda: ib.apply(flows)
+
+
+def batch_events(n: int):
+    from batch import EventBatch
+    b = batch_of(n)
+    eb = EventBatch(b, event_specs(), rng_seed=1)
+    return lambda: eb.roll()
+
+
+# --- campaigns (10k turns) ---
+def campaign(turns: int, full: bool):
+    def setup():
+        def run():
+            from prompt_builder import PromptBuilder
+            from history_memory import HistoryMemory
+            t = tribes(1)[0]
+            tr, ev = InertiaTracker(last_assignments=t.assign.to_dict()), EventEngine(event_specs(), rng_seed=7)
+            pb, mem = PromptBuilder(os.path.join(HERE, "build_advisor_prompt.md")), HistoryMemory()
+            for turn in range(1, turns + 1):
+                t.season = SEASONS[(turn - 1) // 3 % 4]
+                t.res.stocks["🥫"] = max(t.res.stocks["🥫"], 100)  # keep the tribe alive
+                report, evs = step_turn(t, tr, ev)
+                if full:
+                    compact = render_compact(report, t.assign, t.demo)
+                    advice = stub_reply(pb.build(report, compact, mem.retrieve(), evs, "(N/A)"))
+                    mem.add_turn(turn, report, evs, advice)
+        return run
+    return setup
+
+
+PHASES = {
+    "next_turn": (next_turn, batch_next_turn),
+    "next_turn_dirty": (next_turn_dirty, None),
+    "inertia": (inertia, batch_inertia),
+    "events": (events, batch_events),
+    "render_compact": (render, None),
+    "build_advisor_prompt": (advisor_prompt, None),
+    "prompt_builder": (prompt_builder, None),
+    "history": (history, None),
+    "journal": (journal, None),
+}
+
+
+def cases(phases: Optional[List[str]] = None, scales: Optional[List[str]] = None) -> List[Case]:
+    out = []
+    for phase, (scalar, batched) in PHASES.items():
+        if phases and phase not in phases:
+            continue
+        for scale, n in SCALES.items():
+            if scales and scale not in scales:
+                continue
+            fn = batched if n >= 100_000 else scalar
+            if fn is not None:
+                out.append(Case(phase, scale, n, (lambda fn=fn, n=n: fn(n)), repeat=3 if n >= 1000 else 5))
+    if not scales or "10k" in scales:
+        for phase, full in (("campaign_headless", False), ("campaign_full", True)):
+            if not phases or phase in phases:
+                out.append(Case(phase, "10k", CAMPAIGN_TURNS, campaign(CAMPAIGN_TURNS, full), repeat=1))
+    return out
+
+
+def measure(case: Case) -> Dict:
+    fn = case.setup()
+    fn()  # warm caches and memo tables
+    timer = timeit.Timer(fn)
+    number = 1 if case.repeat == 1 else max(1, timer.autorange()[0] // 4)
+    best = min(timer.repeat(repeat=case.repeat, number=number)) / number
+    per = case.tribes if case.phase not in ("campaign_headless", "campaign_full") else CAMPAIGN_TURNS
+    return {"us": best * 1e6, "us_per_item": best * 1e6 / per, "items": per}
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> Dict[str, float]:
+    """Phases slower than the baseline by more than `threshold` %: key -> % change."""
+    out = {}
+    for key, r in results.items():
+        b = baseline.get(key)
+        if b and b.get("us"):
+            change = (r["us"] - b["us"]) / b["us"] * 100.0
+            r["baseline_us"], r["change_pct"] = b["us"], round(change, 1)
+            if change > threshold:
+                out[key] = change
+    return out
+
+
+def run(phases=None, scales=None, out=sys.stdout) -> Dict:
+    results = {}
+    for case in cases(phases, scales):
+        t0 = time.perf_counter()
+        r = measure(case)
+        results[case.key] = r
+        out.write(f"{case.key:<28} {r['us']:>14.1f} us/call {r['us_per_item']:>10.3f} us/item"
+                  f"  ({time.perf_counter() - t0:.1f}s)\n")
+        out.flush()
+    return results
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Turn phase benchmarks with regression baselines")
+    ap.add_argument("--phases", help="comma-separated subset of: " + ", ".join(list(PHASES) + ["campaign_headless", "campaign_full"]))
+    ap.add_argument("--scales", help="comma-separated subset of: " + ", ".join(list(SCALES) + ["10k"]))
+    ap.add_argument("--json", help="write results to this JSON file")
+    ap.add_argument("--baseline", help="compare against this stored JSON run")
+    ap.add_argument("--save-baseline", help="store this run as a baseline")
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="regression threshold in %%")
+    args = ap.parse_args(argv)
+    split = lambda s: [x.strip() for x in s.split(",")] if s else None
+
+    results = run(split(args.phases), split(args.scales))
+    regressions = {}
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as fh:
+            regressions = compare(results, json.load(fh)["results"], args.threshold)
+        for key, change in regressions.items():
+            print(f"REGRESSION {key}: {change:+.1f}% (threshold {args.threshold:g}%)")
+        if not regressions:
+            print(f"no regression above {args.threshold:g}% against {args.baseline}")
+    doc = {
+        "meta": {"python": platform.python_version(), "machine": platform.machine(), "platform": platform.platform(),
+                 "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "threshold_pct": args.threshold},
+        "results": results,
+        "regressions": regressions,
+    }
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as fh:
+                json.dump(doc, fh, indent=1, ensure_ascii=False)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+# campaign.py
+# Headless Monte Carlo campaigns to validate config changes before shipping
+# - Engine + inertia + events only: no rendering, no LLM, no history.md writes
+# - Seeds spread over a process pool; each seed's run is deterministic (seeded EventEngine)
+# - Aggregate distributions: starvation probability, 🥫 stock and coverage percentiles per turn
+# - default_campaign(): the sample starting tribe shared by server.py and main.py
+
+import copy
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+from engine import (
+    Demographics, Assignments, Resources, Tribe,
+    InertiaTracker, EventEngine, step_turn,
+    MAN, WOMAN, CHILD, GRANDPA, GRANDMA, KING, SPEC_AGRI, SPEC_FISH, SPEC_ARMY, SPEC_NURSE,
+)
+from config_loader import GameConfig, load_game_config
+
+# Tour = 1 mois, année = 12 tours, 3 tours par saison
+SEASON_ORDER = ("spring", "summer", "autumn", "winter")
+TURNS_PER_SEASON = 3
+PERCENTILES = (5, 25, 50, 75, 95)
+COVERAGE_ACTIVITIES = ("🎭", "📚", "👩‍🍼")
+
+# policy(turn, tribe) -> new per_activity assignments, or None to keep the current ones.
+# Must be a module-level function so it can be sent to worker processes.
+Policy = Callable[[int, Tribe], Optional[Dict[str, Dict[str, int]]]]
+
+
+@dataclass
+class CampaignConfig:
+    demo: Demographics
+    assignments: Dict[str, Dict[str, int]]
+    stocks: Dict[str, int] = field(default_factory=lambda: {"🥫": 0, "🔧": 0})
+    season: str = "spring"
+    king_activity: str = "🌾"
+    king_bonus: float = 0.20
+    config_path: Optional[str] = None  # YAML rules and events, loaded (from cache) in each worker
+    penalty: float = 0.10
+    threshold: int = 3
+    cooldown_len: int = 2
+
+    def build(self, seed: int):
+        game = _game_config(self.config_path)
+        tribe = Tribe(
+            demo=copy.deepcopy(self.demo),
+            assign=Assignments(per_activity=copy.deepcopy(self.assignments)),
+            res=Resources(stocks=dict(self.stocks)),
+            season=self.season, king_activity=self.king_activity, king_bonus=self.king_bonus,
+            rules=game.ruleset if game else None,
+        )
+        # Starting assignments are the status quo, not a reassignment
+        inertia = InertiaTracker(
+            last_assignments=copy.deepcopy(self.assignments),
+            penalty=self.penalty, threshold=self.threshold, cooldown_len=self.cooldown_len,
+        )
+        events = EventEngine(specs_by_season=game.specs_by_season if game else {}, rng_seed=seed)
+        return tribe, inertia, events
+
+
+def default_campaign(config_path: Optional[str] = None) -> CampaignConfig:
+    """Starting tribe of a new campaign (same sample as the console demo)."""
+    return CampaignConfig(
+        demo=Demographics(men=26, women_active=10, women_pregnant=21, babies=24, children=18,
+                          grandpas=2, grandmas=1, king=1),
+        assignments={
+            "🌾": {MAN: 10, SPEC_AGRI: 2, KING: 1}, "🐟": {SPEC_FISH: 1, CHILD: 6}, "🦌": {SPEC_ARMY: 3},
+            "🥫": {MAN: 3}, "🔧": {MAN: 3}, "🧪": {MAN: 3}, "🏗": {MAN: 3}, "🛡️": {SPEC_ARMY: 1},
+            "🎭": {MAN: 3}, "📚": {MAN: 1, WOMAN: 1, GRANDPA: 1, GRANDMA: 1},
+            "👩‍🍼": {WOMAN: 8, SPEC_NURSE: 1, GRANDPA: 1, GRANDMA: 1}, "🏛": {KING: 1},
+        },
+        stocks={"🥫": 1519, "🔧": 100},
+        season="summer",
+        config_path=config_path,
+    )
+
+
+@dataclass
+class CampaignResult:
+    seeds: int
+    turns: int
+    starvation_probability: float
+    stock_percentiles: Dict[str, List[float]]                  # "p50" -> 🥫 stock per turn
+    coverage_percentiles: Dict[str, Dict[str, List[float]]]    # activity -> "p50" -> coverage % per turn
+    starved_turns: List[int]                                   # per seed
+
+
+_CONFIGS: Dict[str, GameConfig] = {}
+
+def _game_config(path: Optional[str]) -> Optional[GameConfig]:
+    # Compiled once per worker process
+    if not path:
+        return None
+    if path not in _CONFIGS:
+        _CONFIGS[path] = load_game_config(path)
+    return _CONFIGS[path]
+
+
+def season_for_turn(start: str, turn: int) -> str:
+    """Season of turn `turn` (1-based) for a campaign starting in `start`."""
+    i = SEASON_ORDER.index(start) if start in SEASON_ORDER else 0
+    return SEASON_ORDER[(i + (turn - 1) // TURNS_PER_SEASON) % len(SEASON_ORDER)]
+
+
+def run_seed(config: CampaignConfig, seed: int, turns: int, policy: Optional[Policy] = None) -> Dict:
+    """One deterministic headless run; per-turn 🥫 stock, coverages and starvation flags."""
+    tribe, inertia, events = config.build(seed)
+    stocks: List[int] = []
+    starved: List[bool] = []
+    coverage: Dict[str, List[float]] = {a: [] for a in COVERAGE_ACTIVITIES}
+    for turn in range(1, turns + 1):
+        tribe.season = season_for_turn(config.season, turn)
+        if policy is not None:
+            new = policy(turn, tribe)
+            if new is not None:
+                tribe.assign.per_activity = new
+        report, _ = step_turn(tribe, inertia, events)
+        food = report["food_report"]
+        stock = tribe.res.stocks.get("🥫", 0)
+        # Famine: the turn's deficit exceeds what the 🥫 reserve can cover
+        starved.append(food["net"] < 0 and -food["net"] > stock)
+        stocks.append(stock)
+        for a in COVERAGE_ACTIVITIES:
+            coverage[a].append(report["coverage"][a]["coverage_pct"])
+    return {"seed": seed, "stocks": stocks, "starved": starved, "coverage": coverage}
+
+
+def _run_chunk(args) -> List[Dict]:
+    config, seeds, turns, policy = args
+    return [run_seed(config, s, turns, policy) for s in seeds]
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Linear-interpolated percentile (q in 0..100) of a non-empty sequence."""
+    xs = sorted(values)
+    pos = (len(xs) - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(xs) - 1)
+    return xs[lo] + (xs[hi] - xs[lo]) * (pos - lo)
+
+
+def _per_turn_percentiles(series: List[List[float]], turns: int) -> Dict[str, List[float]]:
+    columns = [[run[t] for run in series] for t in range(turns)]
+    return {f"p{q}": [percentile(col, q) for col in columns] for q in PERCENTILES}
+
+
+def aggregate(runs: List[Dict], turns: int) -> CampaignResult:
+    starved_turns = [sum(r["starved"]) for r in runs]
+    return CampaignResult(
+        seeds=len(runs),
+        turns=turns,
+        starvation_probability=sum(1 for n in starved_turns if n) / len(runs) if runs else 0.0,
+        stock_percentiles=_per_turn_percentiles([r["stocks"] for r in runs], turns) if runs else {},
+        coverage_percentiles={
+            a: _per_turn_percentiles([r["coverage"][a] for r in runs], turns) if runs else {}
+            for a in COVERAGE_ACTIVITIES
+        },
+        starved_turns=starved_turns,
+    )
+
+
+def simulate(config: CampaignConfig, seeds: Sequence[int], turns: int,
+             policy: Optional[Policy] = None, processes: Optional[int] = None,
+             chunk_size: int = 16) -> CampaignResult:
+    """
+    Runs one headless campaign per seed across a process pool and aggregates them.
+    Results are ordered by seed position, so the same inputs give the same output.
+    """
+    seeds = list(seeds)
+    chunks = [(config, seeds[i:i + chunk_size], turns, policy) for i in range(0, len(seeds), chunk_size)]
+    from concurrent.futures import ProcessPoolExecutor  # ~25 ms of imports, only for the parent
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        runs = [r for chunk in pool.map(_run_chunk, chunks) for r in chunk]
+    return aggregate(runs, turns)
+
+
+__all__ = ["CampaignConfig", "CampaignResult", "default_campaign", "simulate", "run_seed", "season_for_turn"]
@@ -0,0 +1,188 @@
+# config_loader.py
+# config.yaml → validated, immutable game config, cached on disk
+# - Schema check of seasonal_agri / production_rules / events, every problem reported at once
+# - Config names (farming, man, specialist_farmer, ...) mapped to the engine's emoji keys
+# - Compiled into a fresh Ruleset + event specs: no module globals touched, configs coexist
+# - Normalized tables pickled under a content-hash key: warm startups skip YAML entirely;
+#   the key also covers the engine defaults the tables are merged into (rules, aliases)
+
+import copy
+import hashlib
+import os
+import pickle
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from engine import (
+    ACTIVITY_KEYS, WORKER_KEYS, PRODUCTION_RULES, NON_STOCK_RULES, SEASONAL_AGRI,
+    ACTIVITY_ALIASES, WORKER_ALIASES,
+    EventSpec, EventEffects, Ruleset, compile_effect, full_rule,
+)
+
+CACHE_FORMAT = 1  # bump when the normalized tables change shape
+CACHE_DIR = os.environ.get("SOCIETY_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "society"))
+EVENT_KEYS = {"name", "prob", "probability", "cooldown", "severity", "seasons", "message", "effect", "effects"}
+
+
+class ConfigError(ValueError):
+    def __init__(self, path: str, errors: List[str]):
+        self.errors = errors
+        super().__init__(f"{path}: " + "; ".join(errors))
+
+
+@dataclass(frozen=True)
+class GameConfig:
+    ruleset: Ruleset
+    specs_by_season: Dict[str, List[EventSpec]]
+    digest: str
+
+
+def _number(v) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def _row(where: str, rule, errors: List[str]) -> Dict[str, float]:
+    if not isinstance(rule, dict):
+        errors.append(f"{where}: expected a worker -> value mapping")
+        return {}
+    out = {}
+    for w, v in rule.items():
+        wk = WORKER_KEYS.lookup(str(w))
+        if wk is None:
+            errors.append(f"{where}: unknown worker {w!r}")
+        elif not _number(v) or v < 0:
+            errors.append(f"{where}.{w}: expected a number >= 0, got {v!r}")
+        else:
+            out[WORKER_KEYS.names[wk]] = v
+    return out
+
+
+def validate(cfg) -> Tuple[Dict, List[str]]:
+    """Normalized tables (emoji keys, plain data) and the list of schema errors."""
+    errors: List[str] = []
+    if not isinstance(cfg, dict):
+        return {}, ["top level: expected a mapping"]
+    seasons = dict(SEASONAL_AGRI)
+    for season, f in (cfg.get("seasonal_agri") or {}).items():
+        if season not in SEASONAL_AGRI:
+            errors.append(f"seasonal_agri: unknown season {season!r}")
+        elif not _number(f) or f < 0:
+            errors.append(f"seasonal_agri.{season}: expected a number >= 0, got {f!r}")
+        else:
+            seasons[season] = float(f)
+
+    production = {a: dict(rule) for a, rule in PRODUCTION_RULES.items()}
+    non_stock = copy.deepcopy(NON_STOCK_RULES)
+    for act, rule in (cfg.get("production_rules") or {}).items():
+        aid = ACTIVITY_KEYS.lookup(str(act))
+        if aid is None:
+            errors.append(f"production_rules: unknown activity {act!r}")
+            continue
+        a = ACTIVITY_KEYS.names[aid]
+        row = _row(f"production_rules.{act}", rule, errors)  # unlisted workers are 0
+        if a in non_stock:
+            non_stock[a]["capacity"] = {w: v for w, v in row.items() if v}
+        else:
+            production[a] = full_rule(**row)
+
+    events = cfg.get("events") or []
+    if isinstance(events, dict):  # older layout: season -> list of events
+        events = [dict(item, seasons=[season]) if isinstance(item, dict) else item
+                  for season, lst in events.items() for item in (lst or [])]
+    if not isinstance(events, list):
+        errors.append("events: expected a list")
+        events = []
+    out_events = []
+    for i, item in enumerate(events):
+        where = f"events[{i}]"
+        if not isinstance(item, dict):
+            errors.append(f"{where}: expected a mapping")
+            continue
+        where = f"events[{i}] {item.get('name', '')!r}"
+        for k in sorted(set(item) - EVENT_KEYS):
+            errors.append(f"{where}: unknown key {k!r}")
+        p = item.get("probability", item.get("prob", 0.1))
+        if not _number(p) or not 0 <= p <= 1:
+            errors.append(f"{where}: probability must be in [0, 1], got {p!r}")
+        cooldown = item.get("cooldown", 0)
+        if not isinstance(cooldown, int) or cooldown < 0:
+            errors.append(f"{where}: cooldown must be an integer >= 0, got {cooldown!r}")
+        ev_seasons = item.get("seasons") or list(seasons)
+        for s in ev_seasons:
+            if s not in seasons:
+                errors.append(f"{where}: unknown season {s!r}")
+        raw = item.get("effects")
+        if raw is None:
+            raw = [item["effect"]] if item.get("effect") else []
+        effects = []
+        for fx in raw if isinstance(raw, list) else [raw]:
+            try:
+                effects.append(compile_effect(fx).to_dict())
+            except (ValueError, AttributeError, TypeError) as e:
+                errors.append(f"{where}: {e}")
+        out_events.append({
+            "name": str(item.get("name", "custom_event")), "probability": p, "cooldown": cooldown,
+            "severity": item.get("severity", 1), "seasons": list(ev_seasons),
+            "message": item.get("message", item.get("name", "Event")), "effects": effects,
+        })
+    return {"seasonal_agri": seasons, "production_rules": production,
+            "non_stock_rules": non_stock, "events": out_events}, errors
+
+
+def compile_tables(tables: Dict, digest: str = "") -> GameConfig:
+    """Ruleset and event specs from normalized tables."""
+    ruleset = Ruleset(tables["production_rules"], tables["non_stock_rules"], tables["seasonal_agri"])
+    specs_by_season: Dict[str, List[EventSpec]] = {}
+    for ev in tables["events"]:
+        spec = EventSpec(
+            name=ev["name"], probability=float(ev["probability"]), severity=int(ev["severity"]),
+            effect=EventEffects([compile_effect(fx) for fx in ev["effects"]], ev["message"]),
+            cooldown=int(ev["cooldown"]),
+        )
+        for season in ev["seasons"]:
+            specs_by_season.setdefault(season, []).append(spec)
+    return GameConfig(ruleset, specs_by_season, digest)
+
+
+def _defaults_digest() -> bytes:
+    """Engine tables a config is merged into: editing them must not serve stale pickles."""
+    defaults = (PRODUCTION_RULES, NON_STOCK_RULES, SEASONAL_AGRI, WORKER_ALIASES, ACTIVITY_ALIASES)
+    return hashlib.sha256(repr(defaults).encode("utf-8")).digest()
+
+
+def _cache_path(cache_dir: str, digest: str) -> str:
+    return os.path.join(cache_dir, f"config-{digest[:32]}.pickle")
+
+
+def load_game_config(path: str, cache_dir: Optional[str] = CACHE_DIR) -> GameConfig:
+    """Validated config from `path`; `cache_dir=None` disables the disk cache.
+
+    Raises ConfigError listing every schema problem, ImportError without PyYAML on a cache miss.
+    """
+    with open(path, "rb") as fh:
+        data = fh.read()
+    digest = hashlib.sha256(b"%d\0" % CACHE_FORMAT + _defaults_digest() + data).hexdigest()
+    cached = _cache_path(cache_dir, digest) if cache_dir else None
+    if cached and os.path.exists(cached):
+        try:
+            with open(cached, "rb") as fh:
+                return compile_tables(pickle.load(fh), digest)
+        except Exception:
+            pass  # unreadable or stale entry: recompile below
+    import yaml
+    tables, errors = validate(yaml.safe_load(data.decode("utf-8")) or {})
+    if errors:
+        raise ConfigError(path, errors)
+    if cached:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f"{cached}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as fh:
+                pickle.dump(tables, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cached)
+        except OSError:
+            pass  # read-only home: run uncached
+    return compile_tables(tables, digest)
+
+
+__all__ = ["ConfigError", "GameConfig", "validate", "compile_tables", "load_game_config"]
@@ -1,24 +1,35 @@
 # engine.py
 # Core game engine for the Neolithic proto-RTS
 # - Stockable productions and non-stockable coverages
+# - Incremental turns: per-activity version stamps, only changed activities recomputed
 # - Inertia with per-activity cooldowns
-# - Parameterized events
-# - Compact renderer
+# - Parameterized events: cooldowns, geometric skip-ahead sampling
+# - Event effects compiled to a small IR (this turn / N turns / while condition), one pass per turn
+# - Compact view: direct render, or a per-tribe renderer cached per line with in-place terminal redraw
 # - LLM prompt builder
 # - Optional YAML config loader to override seasons, production rules, events
 
 import os
+import sys
 import json
+import math
+import operator
+import heapq
 import random
-from dataclasses import dataclass, field
-from typing import Dict, Tuple, Callable, Optional, List
+import itertools
+import threading
+from array import array
+from collections.abc import MutableMapping
+from dataclasses import dataclass, field, replace
+from typing import Dict, Tuple, Callable, Optional, List, Iterable
 from datetime import datetime
 from pathlib import Path
+from types import MappingProxyType
 
-try:
-    import yaml
-except ImportError:
-    yaml = None  # YAML loading is optional; guard load_config accordingly
+from prompt_builder import load_template
+
+# No YAML or LLM SDK import here: headless runs (campaigns, batch workers) never load
+# them; config_loader imports yaml on a cache miss, the OpenAI SDK loads on first use.
 
 # Worker emojis
 MAN = "🧔‍♂️"; WOMAN = "👩"; PREGNANT="🤰"; BABY="👶"; CHILD="🧒"; GRANDPA="👴"; GRANDMA="👵"; KING="👑"
@@ -37,6 +48,82 @@ def full_rule(**kwargs):
     rule.update(kwargs)
     return rule
 
+# Key normalization: worker and activity keys interned as small integer ids.
+# Emoji match with or without the VS16 variation selector and skin tone modifiers
+# (🛡 = 🛡️, 🧑‍🏫 = 🧑🏻‍🏫); config.yaml names are aliases (man, farming, ...).
+_FOLD = {0xFE0F: None, **{c: None for c in range(0x1F3FB, 0x1F400)}}
+
+def _fold(key:str)->str:
+    return key.strip().translate(_FOLD).lower()
+
+class KeyTable:
+    """Interned keys: canonical name <-> id, with folded and alias lookups."""
+    def __init__(self, kind:str):
+        self.kind = kind
+        self.names: List[str] = []
+        self._ids: Dict[str, int] = {}
+    def __len__(self)->int:
+        return len(self.names)
+    def lookup(self, key)->Optional[int]:
+        i = self._ids.get(key)
+        if i is None and isinstance(key, str):
+            i = self._ids.get(_fold(key))
+            if i is not None:
+                self._ids[key] = i
+        return i
+    def id(self, key)->int:
+        i = self.lookup(key)
+        if i is None:
+            raise ValueError(f"unknown {self.kind} {key!r}")
+        return i
+    def canonical(self, key)->str:
+        return self.names[self.id(key)]
+    def register(self, key:str, aliases:Iterable[str]=())->int:
+        i = self.lookup(key)
+        if i is None:
+            if len(self.names) >= 255:
+                raise ValueError(f"too many {self.kind} keys")
+            i = len(self.names)
+            self.names.append(key)
+            self._ids[key] = self._ids[_fold(key)] = i
+        for a in aliases:
+            self._ids[_fold(a)] = i
+        return i
+    def intern(self, key:str)->str:
+        """Canonical name for `key`, registering it as a new key if unknown."""
+        return self.names[self.register(key)]
+
+WORKER_KEYS = KeyTable("worker")
+ACTIVITY_KEYS = KeyTable("activity")
+
+WORKER_ALIASES = {
+    MAN: ("man", "men"), WOMAN: ("woman", "women", "women_active"), PREGNANT: ("pregnant", "women_pregnant"),
+    BABY: ("baby", "babies"), CHILD: ("child", "children"), GRANDPA: ("elder_m", "grandpa", "grandpas"),
+    GRANDMA: ("elder_f", "grandma", "grandmas"), KING: ("king",),
+    SPEC_AGRI: ("specialist_farmer",), SPEC_FISH: ("specialist_fisher",), SPEC_STORE: ("specialist_cook",),
+    SPEC_TOOLS: ("specialist_smith",), SPEC_SCI: ("specialist_scientist",), SPEC_BUILD: ("specialist_builder",),
+    SPEC_ARMY: ("specialist_guard",), SPEC_ART: ("specialist_artist",), SPEC_EDU: ("specialist_teacher",),
+    SPEC_ORG: ("specialist_organizer",), SPEC_NURSE: ("specialist_nurse",),
+}
+ACTIVITY_ALIASES = {
+    "🥫": ("food_storage", "storage", "food"), "🌾": ("farming", "agriculture"), "🐟": ("fishing", "foraging"),
+    "🦌": ("hunting",), "🔧": ("tools",), "🧪": ("science",), "🏗": ("construction",), "🛡️": ("army",),
+    "🎭": ("culture",), "📚": ("education",), "👩‍🍼": ("childcare",), "🏛": ("organization",),
+}
+for _w in _all_workers():
+    WORKER_KEYS.register(_w, WORKER_ALIASES.get(_w, ()))
+for _a, _names in ACTIVITY_ALIASES.items():
+    ACTIVITY_KEYS.register(_a, _names)
+
+def normalize_worker(key:str)->str:
+    return WORKER_KEYS.canonical(key)
+
+def normalize_activity(key:str)->str:
+    return ACTIVITY_KEYS.canonical(key)
+
+# Slotted dataclasses where supported (3.10+)
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
 # Seasons for agriculture
 SEASONAL_AGRI = {"summer": 1.00, "spring": 0.70, "autumn": 0.50, "winter": 0.20}
 
@@ -60,8 +147,130 @@ NON_STOCK_RULES = {
     "👩‍🍼": {"capacity": {SPEC_NURSE:5, WOMAN:2, GRANDPA:1, MAN:1, GRANDMA:1}, "needs":"babies_only"},
 }
 
+# Compiled ruleset: worker/activity emojis mapped to small integer ids, only
+# nonzero coefficients kept as sparse rows, seasonal/king multipliers precomputed.
+NON_STOCK_ACTIVITIES = ("🎭", "📚", "👩‍🍼", "🏛")
+FOOD_ACTIVITIES = ("🌾", "🐟", "🦌")
+
+class Ruleset:
+    """Production and coverage rules compiled for the per-turn hot path; immutable once built."""
+    def __init__(self, production_rules=None, non_stock_rules=None, seasonal_agri=None):
+        production_rules = PRODUCTION_RULES if production_rules is None else production_rules
+        non_stock_rules = NON_STOCK_RULES if non_stock_rules is None else non_stock_rules
+        seasonal_agri = SEASONAL_AGRI if seasonal_agri is None else seasonal_agri
+        self._source = ({a: dict(r) for a, r in production_rules.items()},
+                        {a: dict(r, capacity=dict(r["capacity"])) for a, r in non_stock_rules.items()},
+                        dict(seasonal_agri))  # for pickling
+        # Ids are the interned key ids, so Assignments rows index the rules directly
+        production_rules = {ACTIVITY_KEYS.intern(a): {WORKER_KEYS.intern(w): c for w, c in rule.items()}
+                            for a, rule in production_rules.items()}
+        non_stock_rules = {ACTIVITY_KEYS.intern(a): dict(r, capacity={WORKER_KEYS.intern(w): per for w, per in r["capacity"].items()})
+                           for a, r in non_stock_rules.items()}
+        workers = list(WORKER_KEYS.names)
+        activities = list(ACTIVITY_KEYS.names)
+        self.workers: Tuple[str, ...] = tuple(workers)
+        self.activities: Tuple[str, ...] = tuple(activities)
+        self.worker_id: Dict[str, int] = {w: i for i, w in enumerate(workers)}
+        self.activity_id: Dict[str, int] = {a: i for i, a in enumerate(activities)}
+        # Production rows (activity id -> ((worker id, coef), ...)), nonzero only
+        self.rows: Tuple[Tuple[Tuple[int, int], ...], ...] = tuple(
+            tuple((self.worker_id[w], c) for w, c in production_rules.get(a, {}).items() if c)
+            for a in activities
+        )
+        self.stockable: Tuple[int, ...] = tuple(
+            self.activity_id[a] for a in production_rules if a not in NON_STOCK_ACTIVITIES
+        )
+        # Non stockable capacity rows and their needs key
+        self.capacity_rows: Dict[int, Tuple[Tuple[int, int], ...]] = {
+            self.activity_id[a]: tuple((self.worker_id[w], per) for w, per in r["capacity"].items() if per)
+            for a, r in non_stock_rules.items()
+        }
+        self.needs: Dict[int, str] = {self.activity_id[a]: r["needs"] for a, r in non_stock_rules.items()}
+        self.season_factor: Dict[str, float] = dict(seasonal_agri)
+        self.agri = self.activity_id.get("🌾", -1)
+        self.store = self.activity_id.get("🥫", -1)
+        self.food = tuple(self.activity_id[a] for a in FOOD_ACTIVITIES if a in self.activity_id)
+        self.king = self.worker_id[KING]
+        self.org = self.activity_id.get("🏛", -1)
+        self.spec_org = self.worker_id[SPEC_ORG]
+        self._multipliers: Dict[Tuple[str, str, float], Tuple[float, int, float]] = {}
+        for name in ("worker_id", "activity_id", "capacity_rows", "needs", "season_factor"):
+            setattr(self, name, MappingProxyType(getattr(self, name)))
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise AttributeError(f"Ruleset is immutable (setting {name!r})")
+        object.__setattr__(self, name, value)
+
+    def __reduce__(self):
+        return (Ruleset, self._source)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def counts(self, assign: 'Assignments') -> List[List[int]]:
+        """Assignment counts as a dense [activity id][worker id] table."""
+        W = len(self.workers)
+        return [assign.row(aid, W) for aid in range(len(self.activities))]
+
+    def multipliers(self, season: str, king_activity: str, king_bonus: float) -> Tuple[float, int, float]:
+        """(agriculture factor, king activity id, king factor) for a tribe setup."""
+        key = (season, king_activity, king_bonus)
+        m = self._multipliers.get(key)
+        if m is None:
+            king_aid = ACTIVITY_KEYS.lookup(king_activity) if king_activity else None
+            if king_aid not in self.stockable:
+                king_aid = -1
+            m = (self.season_factor.get(season, 1.0), king_aid, 1.0 + king_bonus)
+            self._multipliers[key] = m
+        return m
+
+_DEFAULT_RULESET: Optional[Ruleset] = None
+
+def default_ruleset() -> Ruleset:
+    """Ruleset compiled from the module-level rule tables (rebuilt after load_config)."""
+    global _DEFAULT_RULESET
+    if _DEFAULT_RULESET is None:
+        _DEFAULT_RULESET = Ruleset()
+    return _DEFAULT_RULESET
+
+class TurnMemo:
+    """Per-activity results kept between turns, reused while the activity's version is unchanged."""
+    __slots__ = ("rules", "versions", "flows", "caps", "multipliers")
+    def __init__(self, rules:Ruleset):
+        self.rules = rules
+        A = len(rules.activities)
+        self.versions = array("Q", bytes(8 * A))       # 0: not computed yet
+        self.flows: List[Optional[int]] = [None] * A  # stockable flow per activity
+        self.caps: List[Optional[float]] = [None] * A # coverage or storage capacity
+        self.multipliers = None
+    def refresh(self, assign:'Assignments', multipliers:Tuple[float,int,float])->'AssignmentRows':
+        """Forget dirty activities and the flows depending on a changed season/king setup."""
+        rs = self.rules
+        versions = assign._versions
+        if versions != self.versions:
+            n = len(versions)
+            for aid in range(len(self.versions)):
+                v = versions[aid] if aid < n else 0
+                if v != self.versions[aid]:
+                    self.versions[aid] = v
+                    self.flows[aid] = self.caps[aid] = None
+        old = self.multipliers
+        if old != multipliers:
+            if old is None or old[0] != multipliers[0]:
+                if rs.agri >= 0: self.flows[rs.agri] = None
+            if old is None or old[1:] != multipliers[1:]:
+                for aid in ((old[1] if old else -1), multipliers[1]):
+                    if aid >= 0: self.flows[aid] = None
+            self.multipliers = multipliers
+        return AssignmentRows(assign, len(rs.workers))
+
 # Data classes
-@dataclass
+@dataclass(**_SLOTS)
 class Demographics:
     men:int=0
     women_active:int=0
@@ -75,63 +284,413 @@ class Demographics:
     def total(self)->int:
         return self.men + self.women_active + self.women_pregnant + self.babies + self.children + self.grandpas + self.grandmas + self.king
 
-@dataclass
+COUNT_MAX = 0xFFFF  # array('H') cell
+
+# Dirty tracking: every activity carries a version stamp renewed on each write.
+# Stamps come from one process-wide counter, so an unchanged stamp means unchanged contents.
+_VERSIONS = itertools.count(1)
+
 class Assignments:
-    per_activity: Dict[str, Dict[str,int]] = field(default_factory=dict)
+    """Worker counts per activity in one array('H') indexed by interned ids.
+
+    per_activity is a live dict-like view {activity: {worker: n}} that keeps insertion
+    order; keys go through WORKER_KEYS/ACTIVITY_KEYS, so an unknown key raises ValueError,
+    as does a count outside 0..COUNT_MAX.
+    """
+    __slots__ = ("_cells", "_stride", "_acts", "_keys", "_versions")
+
+    def __init__(self, per_activity:Optional[Dict[str, Dict[str,int]]]=None):
+        self._clear()
+        if per_activity:
+            self.per_activity = per_activity
+
+    def _clear(self):
+        A, W = len(ACTIVITY_KEYS), len(WORKER_KEYS)
+        self._stride = W
+        self._cells = array("H", bytes(2 * A * W))
+        self._acts = bytearray()   # present activity ids, insertion order
+        self._keys = bytearray()   # present (activity id, worker id) pairs, insertion order
+        self._versions = array("Q", [next(_VERSIONS)]) * A
+
+    def _grow(self):
+        # New keys were interned after this object was created
+        A, W, s = len(ACTIVITY_KEYS), len(WORKER_KEYS), self._stride
+        cells = array("H", bytes(2 * A * W))
+        for aid in range(len(self._versions)):
+            cells[aid * W: aid * W + s] = self._cells[aid * s: aid * s + s]
+        self._cells, self._stride = cells, W
+        self._versions.extend([next(_VERSIONS)] * (A - len(self._versions)))
+
+    def _find(self, aid:int, wid:int)->int:
+        keys, pair = self._keys, bytes((aid, wid))
+        i = keys.find(pair)
+        while i >= 0 and i & 1:
+            i = keys.find(pair, i + 1)
+        return i
+
+    def _workers(self, aid:int)->List[int]:
+        k = self._keys
+        return [k[i + 1] for i in range(0, len(k), 2) if k[i] == aid]
+
+    @staticmethod
+    def _check(aid:int, wid:int, n:int)->int:
+        if not 0 <= n <= COUNT_MAX:
+            raise ValueError(f"{ACTIVITY_KEYS.names[aid]} {WORKER_KEYS.names[wid]}: count {n} outside 0..{COUNT_MAX}")
+        return n
+
+    def _put(self, aid:int, wid:int, n:int):
+        self._check(aid, wid, n)
+        if aid >= len(self._versions) or wid >= self._stride:
+            self._grow()
+        self._cells[aid * self._stride + wid] = n
+        if self._find(aid, wid) < 0:
+            self._keys += bytes((aid, wid))
+        if aid not in self._acts:
+            self._acts.append(aid)
+        self._versions[aid] = next(_VERSIONS)
+
+    def _drop(self, aid:int, wid:int):
+        i = self._find(aid, wid)
+        if i >= 0:
+            del self._keys[i:i + 2]
+            self._cells[aid * self._stride + wid] = 0
+            self._versions[aid] = next(_VERSIONS)
+
+    def _set_activity(self, aid:int, workers:Dict[str,int]):
+        items = [(wid, self._check(aid, wid, n)) for wid, n in ((WORKER_KEYS.id(w), n) for w, n in workers.items())]
+        for wid in self._workers(aid):
+            self._drop(aid, wid)
+        if aid >= len(self._versions):
+            self._grow()
+        if aid not in self._acts:
+            self._acts.append(aid)
+        for wid, n in items:
+            self._put(aid, wid, n)
+        self._versions[aid] = next(_VERSIONS)
+
+    def _drop_activity(self, aid:int):
+        for wid in self._workers(aid):
+            self._drop(aid, wid)
+        self._acts.remove(aid)
+        self._versions[aid] = next(_VERSIONS)
+
+    @property
+    def per_activity(self)->'ActivityView':
+        return ActivityView(self)
+
+    @per_activity.setter
+    def per_activity(self, value:Dict[str, Dict[str,int]]):
+        # Built aside and swapped in: a bad key or count leaves this object untouched
+        new = Assignments.__new__(Assignments)
+        new._clear()
+        for a, m in value.items():
+            new._set_activity(ACTIVITY_KEYS.id(a), dict(m))
+        self._cells, self._stride, self._acts, self._keys, self._versions = (
+            new._cells, new._stride, new._acts, new._keys, new._versions)
+
+    def to_dict(self)->Dict[str, Dict[str,int]]:
+        return {a: m.copy() for a, m in self.per_activity.items()}
+
+    def __eq__(self, other):
+        if not isinstance(other, Assignments):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"Assignments(per_activity={self.to_dict()!r})"
+
+    def __reduce__(self):
+        return (Assignments, (self.to_dict(),))  # copies and pickles get fresh stamps
+
+    def version(self, activity:str)->int:
+        aid = ACTIVITY_KEYS.id(activity)
+        return self._versions[aid] if aid < len(self._versions) else 0
+
+    def row(self, aid:int, width:int)->List[int]:
+        """Counts of activity `aid` by worker id, padded or cut to `width`."""
+        s = self._stride
+        if aid >= len(self._versions):
+            return [0] * width
+        row = self._cells[aid * s: aid * s + min(s, width)].tolist()
+        if width > s:
+            row += [0] * (width - s)
+        return row
+
     def count(self, activity:str, worker:str)->int:
-        return self.per_activity.get(activity,{}).get(worker,0)
+        aid, wid = ACTIVITY_KEYS.id(activity), WORKER_KEYS.id(worker)
+        if aid >= len(self._versions) or wid >= self._stride:
+            return 0
+        return self._cells[aid * self._stride + wid]
 
-@dataclass
+    def fork(self)->'Assignments':
+        """Independent flat copy, nothing shared (arrays of ~0.5 kB, one memcpy each); version stamps are kept."""
+        child = Assignments.__new__(Assignments)
+        child._cells = array("H", self._cells)
+        child._stride = self._stride
+        child._acts = bytearray(self._acts)
+        child._keys = bytearray(self._keys)
+        child._versions = array("Q", self._versions)
+        return child
+
+    def set(self, activity:str, worker:str, n:int):
+        aid, wid = ACTIVITY_KEYS.id(activity), WORKER_KEYS.id(worker)
+        if n:
+            self._put(aid, wid, n)
+        else:
+            self._drop(aid, wid)
+            if aid not in self._acts:
+                self._acts.append(aid)
+                self._versions[aid] = next(_VERSIONS)
+
+    def add(self, activity:str, worker:str, delta:int):
+        self.set(activity, worker, self.count(activity, worker) + delta)
+
+class ActivityCounts(MutableMapping):
+    """Live {worker: count} view of one activity of an Assignments."""
+    __slots__ = ("_owner", "_aid")
+    def __init__(self, owner:Assignments, aid:int):
+        self._owner = owner
+        self._aid = aid
+    @property
+    def version(self)->int:
+        return self._owner._versions[self._aid]
+    def __getitem__(self, worker):
+        o, wid = self._owner, WORKER_KEYS.id(worker)
+        if o._find(self._aid, wid) < 0:
+            raise KeyError(worker)
+        return o._cells[self._aid * o._stride + wid]
+    def __setitem__(self, worker, n):
+        self._owner._put(self._aid, WORKER_KEYS.id(worker), n)
+    def __delitem__(self, worker):
+        wid = WORKER_KEYS.id(worker)
+        if self._owner._find(self._aid, wid) < 0:
+            raise KeyError(worker)
+        self._owner._drop(self._aid, wid)
+    def __contains__(self, worker):
+        wid = WORKER_KEYS.lookup(worker)
+        return wid is not None and self._owner._find(self._aid, wid) >= 0
+    def __iter__(self):
+        names = WORKER_KEYS.names
+        return iter([names[w] for w in self._owner._workers(self._aid)])
+    def __len__(self):
+        return len(self._owner._workers(self._aid))
+    def copy(self)->Dict[str,int]:
+        o, aid = self._owner, self._aid
+        k, cells, base, names = o._keys, o._cells, aid * o._stride, WORKER_KEYS.names
+        return {names[k[i + 1]]: cells[base + k[i + 1]] for i in range(0, len(k), 2) if k[i] == aid}
+    def items(self):
+        return self.copy().items()
+    def values(self):
+        return self.copy().values()
+    def __repr__(self):
+        return repr(self.copy())
+
+class ActivityView(MutableMapping):
+    """Live {activity: {worker: count}} view of an Assignments."""
+    __slots__ = ("_owner",)
+    def __init__(self, owner:Assignments):
+        self._owner = owner
+    def __getitem__(self, activity):
+        aid = ACTIVITY_KEYS.id(activity)
+        if aid not in self._owner._acts:
+            raise KeyError(activity)
+        return ActivityCounts(self._owner, aid)
+    def __setitem__(self, activity, workers):
+        self._owner._set_activity(ACTIVITY_KEYS.id(activity), workers)
+    def __delitem__(self, activity):
+        aid = ACTIVITY_KEYS.id(activity)
+        if aid not in self._owner._acts:
+            raise KeyError(activity)
+        self._owner._drop_activity(aid)
+    def __contains__(self, activity):
+        aid = ACTIVITY_KEYS.lookup(activity)
+        return aid is not None and aid in self._owner._acts
+    def __iter__(self):
+        names = ACTIVITY_KEYS.names
+        return iter([names[a] for a in self._owner._acts])
+    def __len__(self):
+        return len(self._owner._acts)
+    def setdefault(self, activity, default=None):
+        if activity not in self:
+            self[activity] = default or {}
+        return self[activity]
+    def items(self):
+        o, names = self._owner, ACTIVITY_KEYS.names
+        return {names[a]: ActivityCounts(o, a) for a in o._acts}.items()
+    def values(self):
+        o = self._owner
+        return [ActivityCounts(o, a) for a in o._acts]
+    def __repr__(self):
+        return repr(self._owner.to_dict())
+
+class AssignmentRows:
+    """counts[aid][wid] over an Assignments without building the whole table."""
+    __slots__ = ("assign", "width")
+    def __init__(self, assign:Assignments, width:int):
+        self.assign = assign
+        self.width = width
+    def __getitem__(self, aid:int)->List[int]:
+        return self.assign.row(aid, self.width)
+
+@dataclass(**_SLOTS)
 class Resources:
     stocks: Dict[str,int] = field(default_factory=lambda: {"🥫":0, "🔧":0})
     flows: Dict[str,int] = field(default_factory=dict)
+    def fork(self)->'Resources':
+        return Resources(dict(self.stocks), dict(self.flows))
 
-@dataclass
+@dataclass(**_SLOTS)
 class NonStockActivity:
     demo: Demographics
     assign: Assignments
+    rules: Optional[Ruleset] = None
+    counts: Optional[List[List[int]]] = None
+    memo: Optional['TurnMemo'] = None
+    def __post_init__(self):
+        if self.rules is None:
+            self.rules = default_ruleset()
+        if self.counts is None:
+            self.counts = self.rules.counts(self.assign)
     def _need_value(self, key:str)->int:
         if key=="population_total": return self.demo.total
         if key=="children_only": return self.demo.children
         if key=="babies_only": return self.demo.babies
         return 0
     def coverage(self, activity:str)->Tuple[float,int,float]:
-        if activity not in NON_STOCK_RULES: return 0.0,0,0.0
-        rule = NON_STOCK_RULES[activity]
-        needs = self._need_value(rule["needs"])
-        cap = 0.0
-        for w, per in rule["capacity"].items():
-            cap += per * self.assign.count(activity, w)
+        aid = ACTIVITY_KEYS.lookup(activity)
+        if aid not in self.rules.capacity_rows: return 0.0,0,0.0
+        needs = self._need_value(self.rules.needs[aid])
+        cap = self.memo.caps[aid] if self.memo is not None else None
+        if cap is None:
+            row = self.counts[aid]
+            cap = 0.0
+            for wid, per in self.rules.capacity_rows[aid]:
+                cap += per * row[wid]
+            if self.memo is not None:
+                self.memo.caps[aid] = cap
         pct = 100.0 if needs==0 else min(100.0, 100.0*cap/float(needs))
         return round(pct,1), needs, cap
 
 # Inertia with cooldowns
-@dataclass
 class InertiaTracker:
-    last_assignments: Dict[str, Dict[str, int]] = field(default_factory=dict)
-    penalty: float = 0.10
-    threshold: int = 3
-    cooldowns: Dict[str, int] = field(default_factory=dict)
-    cooldown_len: int = 2
+    """Moving more than `threshold` workers in an activity puts it on cooldown for
+    `cooldown_len` turns, its flow cut by `penalty`.
+
+    Work per turn is proportional to the activities that changed: activity version stamps
+    tell which ones to diff, unchanged snapshots in last_assignments are reused, and
+    cooldowns live in a per-activity counter array walked only over active slots.
+    """
+    def __init__(self, last_assignments:Optional[Dict[str, Dict[str, int]]]=None, penalty:float=0.10,
+                 threshold:int=3, cooldowns:Optional[Dict[str, int]]=None, cooldown_len:int=2):
+        self.last_assignments: Dict[str, Dict[str, int]] = {} if last_assignments is None else last_assignments
+        self.penalty = penalty
+        self.threshold = threshold
+        self.cooldown_len = cooldown_len
+        self._slot: Dict[str, int] = {}        # activity -> counter slot
+        self._names: List[str] = []
+        self._left = array("i")                # remaining cooldown turns per slot
+        self._active: List[int] = []           # slots holding a cooldown entry
+        # act -> (version, snapshot) seen by the last apply(); valid while that
+        # snapshot is still the one in last_assignments
+        self._seen: Dict[str, Tuple[int, Dict[str, int]]] = {}
+        # (assignments, stamps, activities, last_assignments) after the last apply() on a view
+        self._state: Optional[Tuple] = None
+        self.cooldowns = cooldowns or {}
+
+    def __repr__(self):
+        return (f"InertiaTracker(last_assignments={self.last_assignments!r}, penalty={self.penalty!r}, "
+                f"threshold={self.threshold!r}, cooldowns={self.cooldowns!r}, cooldown_len={self.cooldown_len!r})")
+
+    @property
+    def cooldowns(self)->Dict[str, int]:
+        return {self._names[i]: self._left[i] for i in sorted(self._active)}
+
+    @cooldowns.setter
+    def cooldowns(self, values:Dict[str, int]):
+        for i in self._active:
+            self._left[i] = 0
+        self._active = []
+        for act, n in values.items():
+            self._set(act, int(n))
+
+    def _set(self, act:str, n:int):
+        i = self._slot.get(act)
+        if i is None:
+            i = self._slot[act] = len(self._names)
+            self._names.append(act)
+            self._left.append(0)
+        if i not in self._active:
+            self._active.append(i)
+        self._left[i] = n
+
     def apply(self, current_assignments, flows):
         new_flows = dict(flows)
-        for act, now in current_assignments.items():
-            prev = self.last_assignments.get(act, {})
+        last = self.last_assignments
+        changed = None
+        owner = getattr(current_assignments, "_owner", None)
+        st = self._state
+        if owner is not None and st is not None and st[0] is owner and st[3] is last and st[2] == owner._acts:
+            # Same activities as last turn: diff only those whose stamp moved
+            old, now_v, names = st[1], owner._versions, ACTIVITY_KEYS.names
+            entries = [(names[a], ActivityCounts(owner, a)) for a in owner._acts
+                       if a >= len(old) or old[a] != now_v[a]] if old != now_v else ()
+        else:
+            entries = current_assignments.items()
+        for act, now in entries:
+            version = getattr(now, "version", None)
+            hit = self._seen.get(act)
+            if version is not None and hit is not None and hit[0] == version and last.get(act) is hit[1]:
+                continue
+            now = now.copy()
+            prev = last.get(act) or {}
             moved = 0
-            keys = set(now.keys()) | set(prev.keys())
-            for k in keys:
-                moved += abs(now.get(k,0)-prev.get(k,0))
+            for k, n in now.items():
+                moved += abs(n - prev.get(k, 0))
+            for k, n in prev.items():
+                if k not in now:
+                    moved += abs(n)
             if moved > self.threshold:
-                self.cooldowns[act] = self.cooldown_len
-            if self.cooldowns.get(act,0) > 0 and act in new_flows:
-                new_flows[act] = int(new_flows[act] * (1 - self.penalty))
-        for act in list(self.cooldowns.keys()):
-            self.cooldowns[act] -= 1
-            if self.cooldowns[act] <= 0:
-                self.cooldowns.pop(act, None)
-        self.last_assignments = {a: dict(m) for a,m in current_assignments.items()}
+                self._set(act, self.cooldown_len)
+            snap = now
+            if changed is None:
+                changed = {}
+            changed[act] = snap
+            if version is not None:
+                self._seen[act] = (version, snap)
+        if changed is not None or len(last) != len(current_assignments):
+            # Unchanged activities keep their snapshot; absent ones are dropped
+            new_last = dict(last)
+            if changed:
+                new_last.update(changed)
+            if len(new_last) != len(current_assignments):
+                new_last = {a: new_last[a] for a in current_assignments}
+            self.last_assignments = new_last
+        if owner is not None and entries:
+            self._state = (owner, array("Q", owner._versions), bytes(owner._acts), self.last_assignments)
+        if self._active:
+            keep = []
+            for i in self._active:
+                act = self._names[i]
+                if self._left[i] > 0 and act in new_flows and act in current_assignments:
+                    new_flows[act] = int(new_flows[act] * (1 - self.penalty))
+                self._left[i] -= 1
+                if self._left[i] > 0:
+                    keep.append(i)
+                else:
+                    self._left[i] = 0
+            self._active = keep
         return new_flows
 
+    def fork(self)->'InertiaTracker':
+        # last_assignments is replaced wholesale by apply(), never mutated: safe to share
+        child = InertiaTracker(self.last_assignments, self.penalty, self.threshold, None, self.cooldown_len)
+        child._slot = dict(self._slot)
+        child._names = list(self._names)
+        child._left = array("i", self._left)
+        child._active = list(self._active)
+        child._seen = dict(self._seen)
+        return child
+
 # Events
 @dataclass
 class EventSpec:
@@ -139,23 +698,254 @@ class EventSpec:
     probability:float
     severity:int
     effect:Callable  # Callable[['Tribe'], str]
+    cooldown:int=0   # turns after a hit during which the event cannot fire again
+
+def event_specs(specs_by_season:Dict[str, List[EventSpec]])->Tuple[List[EventSpec], List[frozenset]]:
+    """Distinct specs in declaration order, with the seasons each one is rolled in."""
+    specs, seasons = [], {}
+    for season, lst in specs_by_season.items():
+        for spec in lst:
+            if id(spec) not in seasons:
+                seasons[id(spec)] = set()
+                specs.append(spec)
+            seasons[id(spec)].add(season)
+    return specs, [frozenset(seasons[id(spec)]) for spec in specs]
+
+def geometric_misses(u:float, p:float)->Optional[int]:
+    """Misses before the next hit of a p-Bernoulli trial, from a uniform draw u in [0, 1)."""
+    if p >= 1.0:
+        return 0
+    if p <= 0.0:
+        return None
+    return int(math.log(1.0 - u) / math.log1p(-p))
 
 @dataclass
 class EventEngine:
+    """Seasonal events: every spec is a Bernoulli trial on each turn of its seasons.
+
+    Instead of one draw per spec per turn, the misses before the next hit are drawn once
+    (geometric skip-ahead) and the spec waits in a heap keyed on the trial count of its
+    seasons. After a hit it waits `cooldown` turns in a second heap keyed on the turn it
+    becomes eligible again. The schedule is drawn on the first roll; replace
+    specs_by_season rather than mutating it.
+    """
     specs_by_season: Dict[str, List[EventSpec]] = field(default_factory=dict)
     rng_seed:int = 123
     def __post_init__(self):
         self.rng = random.Random(self.rng_seed)
+        self.turn = 0
+        self._built_for = None
+
+    def _build(self, draw:bool=True):
+        self._built_for = self.specs_by_season
+        self._specs, seasons = event_specs(self.specs_by_season)
+        groups: Dict[frozenset, int] = {}
+        self._group = [groups.setdefault(key, len(groups)) for key in seasons]
+        self._season_groups = {s: [g for key, g in groups.items() if s in key] for s in self.specs_by_season}
+        self._clock = [0] * len(groups)             # trials run so far by each season set
+        self._due: List[List[Tuple[int, int]]] = [[] for _ in groups]  # (clock of next hit, spec)
+        self._cooling: List[Tuple[int, int]] = []   # (first eligible turn, spec)
+        if draw:
+            for i in range(len(self._specs)):
+                self._schedule(i)
+
+    def _schedule(self, i:int):
+        g = self._group[i]
+        k = geometric_misses(self.rng.random(), self._specs[i].probability)
+        if k is not None:
+            heapq.heappush(self._due[g], (self._clock[g] + k + 1, i))
+
     def roll(self, tribe:'Tribe')->List[str]:
-        season = tribe.season
+        if self._built_for is not self.specs_by_season:
+            self._build()
+        self.turn += 1
+        cooling = self._cooling
+        while cooling and cooling[0][0] <= self.turn:
+            self._schedule(heapq.heappop(cooling)[1])
+        hits = []
+        for g in self._season_groups.get(tribe.season, ()):
+            self._clock[g] += 1
+            due = self._due[g]
+            while due and due[0][0] <= self._clock[g]:
+                hits.append(heapq.heappop(due)[1])
         out = []
-        for spec in self.specs_by_season.get(season, []):
-            if self.rng.random() < spec.probability:
-                out.append(spec.effect(tribe))
+        for i in sorted(hits):
+            spec = self._specs[i]
+            out.append(spec.effect(tribe))
+            if spec.cooldown > 0:
+                heapq.heappush(cooling, (self.turn + spec.cooldown + 1, i))
+            else:
+                self._schedule(i)
         return out
 
+    def schedule_state(self)->Optional[Dict]:
+        """Plain-data schedule (None before the first roll), for snapshots."""
+        if self._built_for is None:
+            return None
+        return {"turn": self.turn, "clock": list(self._clock),
+                "due": sorted(e for heap in self._due for e in heap), "cooling": sorted(self._cooling)}
+
+    def restore_schedule(self, state:Dict):
+        self._build(draw=False)
+        self.turn = state["turn"]
+        self._clock = list(state["clock"])
+        for clock, i in state["due"]:
+            heapq.heappush(self._due[self._group[i]], (clock, i))
+        self._cooling = sorted(state["cooling"])
+
+    def fork(self)->'EventEngine':
+        """Same specs, independent RNG and schedule continuing from the current state."""
+        child = EventEngine.__new__(EventEngine)
+        child.__dict__.update(self.__dict__)
+        child.rng = random.Random()
+        child.rng.setstate(self.rng.getstate())
+        if self._built_for is not None:
+            child._clock = list(self._clock)
+            child._due = [list(heap) for heap in self._due]
+            child._cooling = list(self._cooling)
+        return child
+
+# Event effects: a small IR compiled from the YAML, applied by an active-effect table
+# op: "mul" (flow or coverage factor), "mul_floor" (same, never below 0), "add_stock"
+# scope: this turn (turns=1), N turns, or while a condition holds (optionally capped by turns)
+EFFECT_TYPES = {"modify_flow_factor": "mul", "modify_flow_factor_floor": "mul_floor", "add_stock": "add_stock",
+                "mul": "mul", "mul_floor": "mul_floor"}
+LATE_FLOWS = ("🥫",)  # set by compute_food_and_storage, after the effects pass: scaled there
+_COMPARE = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+            "==": operator.eq, "!=": operator.ne}
+
+@dataclass(frozen=True)
+class Condition:
+    """`<stock|flow|coverage>.<activity> <op> <number>`, e.g. "stock.food < 200"."""
+    metric:str
+    target:str
+    op:str
+    value:float
+
+    @classmethod
+    def parse(cls, text:str)->'Condition':
+        parts = text.split()
+        if len(parts) != 3 or "." not in parts[0] or parts[1] not in _COMPARE:
+            raise ValueError(f"bad condition {text!r}, expected e.g. 'stock.food < 200'")
+        metric, target = parts[0].split(".", 1)
+        if metric not in ("stock", "flow", "coverage"):
+            raise ValueError(f"bad condition metric {metric!r}")
+        return cls(metric, normalize_activity(target), parts[1], float(parts[2]))
+
+    def __call__(self, tribe:'Tribe')->bool:
+        if self.metric == "stock":
+            v = tribe.res.stocks.get(self.target, 0)
+        elif self.metric == "flow":
+            v = tribe.res.flows.get(self.target, 0)
+        else:
+            v = NonStockActivity(tribe.demo, tribe.assign, tribe.ruleset).coverage(self.target)[0]
+        return _COMPARE[self.op](v, self.value)
+
+    def __str__(self):
+        return f"{self.metric}.{self.target} {self.op} {self.value:g}"
+
+@dataclass(frozen=True)
+class Effect:
+    op:str
+    target:str
+    value:float
+    turns:Optional[int]=1             # None: as long as `until` holds
+    until:Optional[Condition]=None
+
+    def to_dict(self)->Dict:
+        return {"type": self.op, "target": self.target, "value": self.value, "turns": self.turns,
+                "while": None if self.until is None else str(self.until)}
+
+def compile_effect(item:Dict)->Effect:
+    """One YAML effect ({type, flow|activity|resource, factor|amount, turns, while}) to the IR."""
+    op = EFFECT_TYPES.get(item.get("type"))
+    if op is None:
+        raise ValueError(f"unknown effect type {item.get('type')!r}")
+    target = item.get("target") or item.get("flow") or item.get("activity") or item.get("resource")
+    if target is None and op == "add_stock":
+        target = "🔧"  # older configs: add_stock without a resource meant tools
+    if target is None:
+        raise ValueError(f"effect {item.get('type')!r} has no flow/activity/resource")
+    value = item.get("amount", 0) if op == "add_stock" else item.get("factor", 1.0)
+    value = item.get("value", value)
+    until = item.get("while")
+    turns = item.get("turns", None if until else 1)
+    return Effect(op, normalize_activity(target), float(value), None if turns is None else int(turns),
+                  None if until is None else Condition.parse(until))
+
+class EffectTable:
+    """Active effects of a tribe, folded into the turn's flows in one pass by apply().
+
+    Expired effects are dropped when they run out, so an empty table costs one test per turn.
+    """
+    __slots__ = ("active",)
+
+    def __init__(self, active:Optional[List[list]]=None):
+        self.active: List[list] = active or []   # [effect, turns left or None]
+
+    def __bool__(self):
+        return bool(self.active)
+
+    def __len__(self):
+        return len(self.active)
+
+    def __repr__(self):
+        return f"EffectTable({self.active!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, EffectTable) and self.active == other.active
+
+    def add(self, effect:Effect):
+        self.active.append([effect, effect.turns])
+
+    def fork(self)->'EffectTable':
+        return EffectTable([list(e) for e in self.active])
+
+    def apply(self, tribe:'Tribe')->Dict[str, float]:
+        """Applies this turn's effects to tribe.res.flows/stocks; returns the factors left for later
+        (coverages, and LATE_FLOWS once computed)."""
+        flows, stocks = tribe.res.flows, tribe.res.stocks
+        factor: Dict[str, float] = {}
+        floor = set()
+        keep = []
+        for entry in self.active:
+            e, left = entry
+            if e.until is not None and not e.until(tribe):
+                continue
+            if e.op == "add_stock":
+                stocks[e.target] = stocks.get(e.target, 0) + int(e.value)
+            else:
+                factor[e.target] = factor.get(e.target, 1.0) * e.value
+                if e.op == "mul_floor":
+                    floor.add(e.target)
+            if left is None or left > 1:
+                entry[1] = None if left is None else left - 1
+                keep.append(entry)
+        self.active = keep
+        cover = {}
+        for act, f in factor.items():
+            if act in flows and act not in LATE_FLOWS:
+                v = int(flows[act] * f)
+                flows[act] = max(0, v) if act in floor else v
+            else:
+                cover[act] = f
+        return cover
+
+class EventEffects:
+    """EventSpec.effect compiled from the YAML: queues its effects on the tribe, returns the message."""
+    __slots__ = ("effects", "message")
+
+    def __init__(self, effects:Iterable[Effect], message:str):
+        self.effects = tuple(effects)
+        self.message = message
+
+    def __call__(self, tribe:'Tribe')->str:
+        for e in self.effects:
+            tribe.effects.add(e)
+        return self.message
+
 # Tribe core
-@dataclass
+@dataclass(**_SLOTS)
 class Tribe:
     demo: Demographics
     assign: Assignments
@@ -163,31 +953,67 @@ class Tribe:
     season:str="summer"
     king_activity:str="🌾"
     king_bonus:float=0.20
+    rules:Optional[Ruleset]=None
+    effects:EffectTable=field(default_factory=EffectTable)
+    _memo:Optional[TurnMemo]=field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def ruleset(self)->Ruleset:
+        return self.rules if self.rules is not None else default_ruleset()
+
+    def turn_memo(self)->TurnMemo:
+        rs = self.ruleset
+        if self._memo is None or self._memo.rules is not rs:
+            self._memo = TurnMemo(rs)
+        return self._memo
 
     def population_total(self)->int: return self.demo.total
 
-    def compute_stockable_flows(self)->Dict[str,int]:
+    def fork(self)->'Tribe':
+        """Cheap branch for what-if runs: assignments, stocks/flows and active effects copied, demo shared."""
+        return replace(self, assign=self.assign.fork(), res=self.res.fork(), effects=self.effects.fork())
+
+    def compute_stockable_flows(self, counts:Optional[List[List[int]]]=None, memo:Optional[TurnMemo]=None)->Dict[str,int]:
+        rs = self.ruleset
+        if counts is None:
+            counts = rs.counts(self.assign)
+        agri_factor, king_aid, king_factor = rs.multipliers(self.season, self.king_activity, self.king_bonus)
         flows: Dict[str,int] = {}
-        for activity, rule in PRODUCTION_RULES.items():
-            if activity in ("🎭","📚","👩‍🍼","🏛"):
+        for aid in rs.stockable:
+            if memo is not None and memo.flows[aid] is not None:
+                flows[rs.activities[aid]] = memo.flows[aid]
                 continue
+            row = counts[aid]
             base = 0
-            for w, coef in rule.items():
-                base += coef * self.assign.count(activity, w)
-            if activity=="🌾":
-                base = int(base * SEASONAL_AGRI.get(self.season,1.0))
-            if activity==self.king_activity and self.assign.count(activity, KING)>0:
-                base = int(base * (1.0 + self.king_bonus))
-            flows[activity] = base
+            for wid, coef in rs.rows[aid]:
+                base += coef * row[wid]
+            if aid==rs.agri:
+                base = int(base * agri_factor)
+            if aid==king_aid and row[rs.king]>0:
+                base = int(base * king_factor)
+            flows[rs.activities[aid]] = base
+            if memo is not None:
+                memo.flows[aid] = base
         return flows
 
-    def compute_food_and_storage(self)->Dict[str,int]:
-        produced = sum(self.res.flows.get(k,0) for k in ("🌾","🐟","🦌"))
+    def compute_food_and_storage(self, counts:Optional[List[List[int]]]=None, memo:Optional[TurnMemo]=None)->Dict[str,int]:
+        rs = self.ruleset
+        if counts is None:
+            counts = rs.counts(self.assign)
+        produced = sum(self.res.flows.get(k,0) for k in FOOD_ACTIVITIES)
         consumed = self.population_total()  # 1 portion per person per turn
         net = produced - consumed
         cap = 0
-        for w, coef in PRODUCTION_RULES["🥫"].items():
-            cap += coef * self.assign.count("🥫", w)
+        if rs.store >= 0:
+            cached = memo.caps[rs.store] if memo is not None else None
+            if cached is None:
+                row = counts[rs.store]
+                for wid, coef in rs.rows[rs.store]:
+                    cap += coef * row[wid]
+                if memo is not None:
+                    memo.caps[rs.store] = cap
+            else:
+                cap = cached
         stored = max(0, min(net, cap))
         self.res.flows["🥫"] = stored
         self.res.flows["🍛_net"] = net
@@ -199,21 +1025,35 @@ class Tribe:
             if delta:
                 self.res.stocks[res_name] = self.res.stocks.get(res_name,0) + delta
 
-    def non_stock_coverages(self)->Dict[str,Dict]:
-        nsa = NonStockActivity(self.demo, self.assign)
+    def non_stock_coverages(self, counts:Optional[List[List[int]]]=None, memo:Optional[TurnMemo]=None,
+                            scale:Optional[Dict[str,float]]=None)->Dict[str,Dict]:
+        rs = self.ruleset
+        nsa = NonStockActivity(self.demo, self.assign, rs, counts, memo)
         out={}
         for act in ("🎭","📚","👩‍🍼"):
             pct, needs, cap = nsa.coverage(act)
+            if scale and act in scale:  # event factor on the capacity
+                cap = max(0.0, cap * scale[act])
+                pct = 100.0 if needs==0 else round(min(100.0, 100.0*cap/float(needs)), 1)
             out[act] = {"coverage_pct": pct, "needs":needs, "capacity":cap}
-        org_points = self.assign.count("🏛", KING) + 2*self.assign.count("🏛", SPEC_ORG)
+        org_points = 0
+        if rs.org >= 0:
+            row = nsa.counts[rs.org]
+            org_points = row[rs.king] + 2*row[rs.spec_org]
         out["🏛"] = {"maturity_index": min(100, 20 + org_points*10) if org_points>0 else 10}
         return out
 
     def next_turn(self)->Dict:
-        self.res.flows = self.compute_stockable_flows()
-        food = self.compute_food_and_storage()
+        # Only activities whose assignments changed (or that depend on a changed season/king) are recomputed
+        memo = self.turn_memo()
+        counts = memo.refresh(self.assign, self.ruleset.multipliers(self.season, self.king_activity, self.king_bonus))
+        self.res.flows = self.compute_stockable_flows(counts, memo)
+        scale = self.effects.apply(self) if self.effects.active else None
+        food = self.compute_food_and_storage(counts, memo)
+        if scale and "🥫" in scale:  # event factor on what gets stored this turn
+            food["stored"] = self.res.flows["🥫"] = max(0, int(food["stored"] * scale["🥫"]))
         self.update_stocks()
-        cover = self.non_stock_coverages()
+        cover = self.non_stock_coverages(counts, memo, scale)
         return {
             "population_total": self.population_total(),
             "season": self.season,
@@ -223,56 +1063,38 @@ class Tribe:
             "coverage": cover
         }
 
+# Headless turn: engine, inertia and events, no rendering, LLM or history
+def step_turn(tribe:'Tribe', inertia:'InertiaTracker', event_engine:'EventEngine', metrics=None)->Tuple[Dict, List[str]]:
+    if metrics is None or not metrics.enabled:
+        report = tribe.next_turn()
+        report["flows"] = inertia.apply(tribe.assign.per_activity, report["flows"])
+        return report, event_engine.roll(tribe)
+    # metrics.Metrics: one span per phase
+    with metrics.span("engine"):
+        report = tribe.next_turn()
+    with metrics.span("inertia"):
+        report["flows"] = inertia.apply(tribe.assign.per_activity, report["flows"])
+    with metrics.span("events"):
+        events = event_engine.roll(tribe)
+    return report, events
+
 # YAML config loader
 def load_config(path:str=None):
-    if yaml is None or not path or not os.path.exists(path):
+    """Event specs by season from config.yaml, whose rules become the default ruleset.
+
+    Kept for existing callers; config_loader.load_game_config gives the ruleset and specs
+    without touching the default (several configs side by side).
+    """
+    global _DEFAULT_RULESET
+    if not path or not os.path.exists(path):
         return None
-    with open(path, 'r', encoding='utf-8') as fh:
-        cfg = yaml.safe_load(fh) or {}
-    # Override seasonal
-    if 'seasonal_agri' in cfg:
-        SEASONAL_AGRI.update(cfg['seasonal_agri'])
-    # Override production rules pairs
-    if 'production_rules' in cfg:
-        for act, entries in cfg['production_rules'].items():
-            if act not in PRODUCTION_RULES:
-                PRODUCTION_RULES[act] = full_rule()
-            if isinstance(entries, dict):
-                for w, val in entries.items():
-                    PRODUCTION_RULES[act][w] = val
-    # Build events
-    specs_by_season = {}
-    if 'events' in cfg:
-        for season, lst in cfg['events'].items():
-            specs = []
-            for item in lst:
-                eff = item.get('effect', {})
-                etype = eff.get('type')
-                act = eff.get('activity') or eff.get('flow')
-                factor = eff.get('factor', 1.0)
-                msg = eff.get('message', item.get('name','Event'))
-                def make_effect(etype, act, factor, msg):
-                    def _fx(t:'Tribe'):
-                        base = t.res.flows.get(act, 0)
-                        if etype == 'modify_flow_factor':
-                            t.res.flows[act] = int(base * float(factor))
-                        elif etype == 'modify_flow_factor_floor':
-                            t.res.flows[act] = max(0, int(base * float(factor)))
-                        elif etype == 'add_stock':
-                            # generic add to tools stock if activity name looks like resource
-                            # extend as needed
-                            t.res.stocks["🔧"] = t.res.stocks.get("🔧",0) + int(eff.get('amount',0))
-                        return msg
-                    return _fx
-                fx = make_effect(etype, act, factor, msg)
-                specs.append(EventSpec(
-                    name=item.get('name','custom_event'),
-                    probability=float(item.get('probability', item.get('prob', 0.1))),
-                    severity=int(item.get('severity', 1)),
-                    effect=fx
-                ))
-            specs_by_season[season] = specs
-    return specs_by_season
+    from config_loader import load_game_config
+    try:
+        cfg = load_game_config(path)
+    except ImportError:
+        return None  # no PyYAML and nothing cached
+    _DEFAULT_RULESET = cfg.ruleset
+    return cfg.specs_by_season
 
 # LLM advisor helpers
 GAME_MASTER_PROMPT = (
@@ -286,7 +1108,7 @@ def build_advisor_prompt(report, history, events, last_actions):
     Construit le prompt envoyé au LLM pour jouer le rôle du conseiller.
     """
     # Charger le texte statique
-    base_prompt = Path("build_advisor_prompt.md").read_text(encoding="utf-8")
+    base_prompt = load_template("build_advisor_prompt.md").text
     # Ajouter les infos dynamiques
     dynamic_context = f"""
         # CONTEXTE ACTUEL
@@ -306,10 +1128,35 @@ def build_advisor_prompt(report, history, events, last_actions):
     # Prompt final envoyé au LLM
     return base_prompt + "\n" + dynamic_context
 
+LLM_FALLBACK_PREFIX = "[LLM fallback]"
+LLM_FALLBACK_ADVICE = "Conseiller: Stocke l’excédent, protège les canaux, et prépare des outils pour la moisson. Options: [1] Réaffecter 3 adultes vers 🌾, [2] Investir 🧪 sur filets, [3] Troc peaux↔️pierre."
+
+_OPENAI_CLIENT = None
+_OPENAI_LOCK = threading.Lock()
+
+def _openai_client():
+    # One client per process: keeps its HTTP connection pool across turns
+    global _OPENAI_CLIENT
+    with _OPENAI_LOCK:
+        if _OPENAI_CLIENT is None:
+            from openai import OpenAI
+            _OPENAI_CLIENT = OpenAI()
+    return _OPENAI_CLIENT
+
+def warm_llm_client()->threading.Thread:
+    """Imports the SDK and builds the client on a daemon thread, overlapping the turn's own work."""
+    def _warm():
+        try:
+            _openai_client()
+        except Exception:
+            pass  # reported by openai_llm_call when the advisor is actually asked
+    t = threading.Thread(target=_warm, name="llm-warmup", daemon=True)
+    t.start()
+    return t
+
 def openai_llm_call(prompt:str)->str:
     try:
-        from openai import OpenAI
-        client = OpenAI()
+        client = _openai_client()
         resp = client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[{"role":"system","content":"You are a concise, lively advisor."},
@@ -318,68 +1165,206 @@ def openai_llm_call(prompt:str)->str:
         )
         return resp.choices[0].message.content
     except Exception as e:
-        return f"[LLM fallback] {e}\\nConseiller: Stocke l’excédent, protège les canaux, et prépare des outils pour la moisson. Options: [1] Réaffecter 3 adultes vers 🌾, [2] Investir 🧪 sur filets, [3] Troc peaux↔️pierre."
+        return f"{LLM_FALLBACK_PREFIX} {e}\n" + LLM_FALLBACK_ADVICE
+
+def _workers_fragment(assign:Assignments, act:str)->str:
+    return "".join(f"{w}{n}" for w, n in assign.per_activity.get(act, {}).items())
+
+def _workers_fragments(assign:Assignments)->Dict[str, str]:
+    """{activity: workers fragment} in one pass over the arrays (the views cost µs per activity)."""
+    k, cells, s, names = assign._keys, assign._cells, assign._stride, WORKER_KEYS.names
+    parts: Dict[int, List[str]] = {}
+    for i in range(0, len(k), 2):
+        a, w = k[i], k[i + 1]
+        parts.setdefault(a, []).append(f"{names[w]}{cells[a * s + w]}")
+    acts = ACTIVITY_KEYS.names
+    return {acts[a]: "".join(p) for a, p in parts.items()}
+
+# Compact view, one (key, text) pair per line: key(report, assign, demo, frag) gathers
+# the inputs of the line, text(*key) formats it; frag(assign, act) gives the workers
+# fragment of an activity
+_SEP = (lambda r, a, d, f: (), lambda: "——")
+
+def _food_stock(stock, stored, men, cooks, consumed):
+    cook = f" 🧑‍🍳{cooks}" if cooks else ""
+    return f"🥫 {stock}(+{stored})•{MAN}{men}{cook} | ~{max(0, stock // max(1, consumed))}t / 24"
+
+def _flow_line(act:str, label:str, suffix:str=""):
+    return (lambda r, a, d, f: (r["flows"].get(act, 0), f(a, act)),
+            lambda flow, frag: f"{label.format(flow)}•{frag}{suffix}")
+
+def _stock_line(act:str):
+    return (lambda r, a, d, f: (r["stocks"].get(act, 0), r["flows"].get(act, 0), f(a, act)),
+            lambda stock, flow, frag: f"{act} {stock}(+{flow})•{frag}")
+
+def _coverage_line(act:str):
+    return (lambda r, a, d, f: (r["coverage"][act]["coverage_pct"], f(a, act)),
+            lambda pct, frag: f"{act} {pct}%•{frag}")
+
+_COMPACT_LINES = (
+    (lambda r, a, d, f: (r["population_total"], d.men + d.women_active + d.grandpas + d.grandmas),
+     lambda total, adults: f"👥{total} (💪{adults})"),
+    (lambda r, a, d, f: (d.men, d.women_active, d.women_pregnant, d.babies, d.children, d.grandpas, d.grandmas),
+     lambda m, w, p, b, c, gp, gm: f"{MAN}{m} {WOMAN}{w} {PREGNANT}{p} {BABY}{b} {CHILD}{c} {GRANDPA}{gp} {GRANDMA}{gm}"),
+    _SEP,
+    (lambda r, a, d, f: (r["stocks"].get("🥫", 0), r["food_report"].get("stored", 0), a.count("🥫", MAN),
+                         a.count("🥫", SPEC_STORE), r["food_report"]["consumed"]),
+     _food_stock),
+    (lambda r, a, d, f: (r["food_report"]["produced"], r["food_report"]["consumed"], r["food_report"]["net"]),
+     lambda produced, consumed, net: f"🍛 +{produced}(-{consumed}) = {net:+d}"),
+    (lambda r, a, d, f: tuple(x for act in ("🌾", "🐟", "🦌") for x in (r["flows"].get(act, 0), f(a, act))),
+     lambda ag, agw, fi, fiw, hu, huw: f"{{ 🌾{ag}•{agw} | 🐟{fi}•{fiw} | 🦌{hu}•{huw} }}"),
+    _SEP,
+    _stock_line("🔧"),
+    _flow_line("🧪", "🧪 +{}", " (➡️ selon ordres)"),
+    _flow_line("🏗", "🏗 +{}"),
+    _flow_line("🛡️", "🛡️ {}"),
+    _coverage_line("🎭"),
+    _coverage_line("📚"),
+    _coverage_line("👩‍🍼"),
+    _SEP,
+)
+
+class CompactRenderer:
+    """render_compact with per-line caching, for per-turn console refreshes.
+
+    A line is formatted again only when its inputs (flows, stocks, coverage, headcounts,
+    assignment version stamps) changed; `changed` lists the line indexes of the last render.
+    draw() rewrites just those lines in place with ANSI cursor moves; call reset() after
+    printing anything else so the next draw starts a fresh block.
+    """
+    def __init__(self):
+        self._keys: List[object] = [None] * len(_COMPACT_LINES)
+        self._text: List[str] = [""] * len(_COMPACT_LINES)
+        self._frags: Dict[str, Tuple[int, str]] = {}  # act -> (version stamp, fragment)
+        self.changed: List[int] = []
+        self._shown = False
+
+    def _frag(self, assign:Assignments, act:str)->str:
+        v = assign.version(act)
+        hit = self._frags.get(act)
+        if hit is None or hit[0] != v:
+            hit = self._frags[act] = (v, _workers_fragment(assign, act))
+        return hit[1]
+
+    def lines(self, report:dict, assign:Assignments, demo:Demographics)->List[str]:
+        changed = []
+        keys, texts = self._keys, self._text
+        for i, (key, text) in enumerate(_COMPACT_LINES):
+            k = key(report, assign, demo, self._frag)
+            if k != keys[i] or keys[i] is None:
+                keys[i], texts[i] = k, text(*k)
+                changed.append(i)
+        self.changed = changed
+        return texts
+
+    def render(self, report:dict, assign:Assignments, demo:Demographics)->str:
+        return "\n".join(self.lines(report, assign, demo))
+
+    def draw(self, report:dict, assign:Assignments, demo:Demographics, out=None)->int:
+        """Print the block, or redraw its changed lines in place; returns the lines written."""
+        out = out or sys.stdout
+        texts = self.lines(report, assign, demo)
+        if not self._shown:
+            out.write("\n".join(texts) + "\n")
+            self._shown = True
+            n = len(texts)
+        else:
+            # Cursor sits below the block: go up to each changed line, rewrite it, come back
+            parts = []
+            for i in self.changed:
+                up = len(texts) - i
+                parts.append(f"\x1b[{up}A\r\x1b[2K{texts[i]}\x1b[{up}B\r")
+            out.write("".join(parts))
+            n = len(self.changed)
+        out.flush()
+        return n
+
+    def reset(self):
+        """Forget what is on screen: the next draw() prints the whole block."""
+        self._shown = False
 
 def render_compact(report:dict, assign:Assignments, demo:Demographics)->str:
-    total = report["population_total"]
-    workers_adults = demo.men + demo.women_active + demo.grandpas + demo.grandmas
-    pop_break = f"{MAN}{demo.men} {WOMAN}{demo.women_active} {PREGNANT}{demo.women_pregnant} {BABY}{demo.babies} {CHILD}{demo.children} {GRANDPA}{demo.grandpas} {GRANDMA}{demo.grandmas}"
-    stocks, flows, food = report["stocks"], report["flows"], report["food_report"]
-    # food
-    store_men = assign.count("🥫", MAN)
-    store_cook = assign.count("🥫", SPEC_STORE)
-    food_stock = f"🥫 {stocks.get('🥫',0)}(+{food.get('stored',0)})•{MAN}{store_men}{' 🧑‍🍳'+str(store_cook) if store_cook else ''} | ~{max(0, stocks.get('🥫',0)//max(1,food['consumed']))}t / 24"
-    food_flow  = f"🍛 +{food['produced']}(-{food['consumed']}) = {food['net']:+d}"
-    ag = f"🌾{flows.get('🌾',0)}•" + ''.join([f"{w}{n}" for w,n in assign.per_activity.get('🌾',{}).items()])
-    fg = f"🐟{flows.get('🐟',0)}•" + ''.join([f"{w}{n}" for w,n in assign.per_activity.get('🐟',{}).items()])
-    hn = f"🦌{flows.get('🦌',0)}•" + ''.join([f"{w}{n}" for w,n in assign.per_activity.get('🦌',{}).items()])
-    tools = f"🔧 {stocks.get('🔧',0)}(+{flows.get('🔧',0)})•" + ''.join([f"{w}{n}" for w,n in assign.per_activity.get('🔧',{}).items()])
-    sci   = f"🧪 +{flows.get('🧪',0)}•" + ''.join([f"{w}{n}" for w,n in assign.per_activity.get('🧪',{}).items()]) + " (➡️ selon ordres)"
-    build = f"🏗 +{flows.get('🏗',0)}•" + ''.join([f"{w}{n}" for w,n in assign.per_activity.get('🏗',{}).items()])
-    army  = f"🛡️ {flows.get('🛡️',0)}•" + ''.join([f"{w}{n}" for w,n in assign.per_activity.get('🛡️',{}).items()])
-    cov = report["coverage"]
-    culture = f"🎭 {cov['🎭']['coverage_pct']}%•" + ''.join([f"{w}{n}" for w,n in assign.per_activity.get('🎭',{}).items()])
-    edu     = f"📚 {cov['📚']['coverage_pct']}%•" + ''.join([f"{w}{n}" for w,n in assign.per_activity.get('📚',{}).items()])
-    childcare = f"👩‍🍼 {cov['👩‍🍼']['coverage_pct']}%•" + ''.join([f"{w}{n}" for w,n in assign.per_activity.get('👩‍🍼',{}).items()])
-    lines = [
-        f"👥{total} (💪{workers_adults})",
-        pop_break, "——",
-        food_stock, food_flow, "{ " + " ".join([ag,"|",fg,"|",hn]) + " }",
-        "——", tools, sci, build, army, culture, edu, childcare, "——"
-    ]
-    return "\\n".join(lines)
+    # Uncached, same text as CompactRenderer: callers render many tribes in turn and a shared
+    # line cache would only thrash. Keep a CompactRenderer per tribe to skip unchanged lines.
+    f = _workers_fragments(assign)
+    stocks, flows, food, cov = report["stocks"], report["flows"], report["food_report"], report["coverage"]
+    return "\n".join((
+        f"👥{report['population_total']} (💪{demo.men + demo.women_active + demo.grandpas + demo.grandmas})",
+        f"{MAN}{demo.men} {WOMAN}{demo.women_active} {PREGNANT}{demo.women_pregnant} {BABY}{demo.babies} "
+        f"{CHILD}{demo.children} {GRANDPA}{demo.grandpas} {GRANDMA}{demo.grandmas}",
+        "——",
+        _food_stock(stocks.get("🥫", 0), food.get("stored", 0), assign.count("🥫", MAN),
+                    assign.count("🥫", SPEC_STORE), food["consumed"]),
+        f"🍛 +{food['produced']}(-{food['consumed']}) = {food['net']:+d}",
+        f"{{ 🌾{flows.get('🌾', 0)}•{f.get('🌾', '')} | 🐟{flows.get('🐟', 0)}•{f.get('🐟', '')} "
+        f"| 🦌{flows.get('🦌', 0)}•{f.get('🦌', '')} }}",
+        "——",
+        f"🔧 {stocks.get('🔧', 0)}(+{flows.get('🔧', 0)})•{f.get('🔧', '')}",
+        f"🧪 +{flows.get('🧪', 0)}•{f.get('🧪', '')} (➡️ selon ordres)",
+        f"🏗 +{flows.get('🏗', 0)}•{f.get('🏗', '')}",
+        f"🛡️ {flows.get('🛡️', 0)}•{f.get('🛡️', '')}",
+        f"🎭 {cov['🎭']['coverage_pct']}%•{f.get('🎭', '')}",
+        f"📚 {cov['📚']['coverage_pct']}%•{f.get('📚', '')}",
+        f"👩‍🍼 {cov['👩‍🍼']['coverage_pct']}%•{f.get('👩‍🍼', '')}",
+        "——",
+    ))
 
 HISTORY_PATH="history.md"
 def append_history_md(turn:int, compact:str, narrative:str, orders:str, events:list):
     ts = datetime.utcnow().isoformat(timespec="seconds")
     with open(HISTORY_PATH,"a",encoding="utf-8") as f:
-        f.write(f"## Tour {turn}  •  {ts} UTC\\n")
-        f.write(compact+"\\n\\n")
-        f.write("**Conseiller**\\n\\n"+narrative.strip()+"\\n\\n")
-        f.write("**Ordres**\\n\\n"+(orders or "(N/A)")+"\\n\\n")
-        f.write("**Événements**\\n\\n"+("\\n".join(events) if events else "(aucun)")+"\\n\\n")
-        f.write("---\\n")
-
-def run_turn_console(tribe:'Tribe', assign:'Assignments', last_orders:str, inertia:'InertiaTracker', event_engine:'EventEngine', turn:int=1)->None:
-    report = tribe.next_turn()
-    adjusted = inertia.apply(assign.per_activity, report["flows"])
-    report["flows"] = adjusted
-    events = event_engine.roll(tribe)
-    compact = render_compact(report, assign, tribe.demo)
-    prompt = build_advisor_prompt(turn, report, compact, last_orders, events)
-    advisor = openai_llm_call(prompt)
-    append_history_md(turn, compact, advisor, last_orders, events)
-    print("\\n===== TOUR", turn, "=====")
+        f.write(f"## Tour {turn}  •  {ts} UTC\n")
+        f.write(compact+"\n\n")
+        f.write("**Conseiller**\n\n"+narrative.strip()+"\n\n")
+        f.write("**Ordres**\n\n"+(orders or "(N/A)")+"\n\n")
+        f.write("**Événements**\n\n"+("\n".join(events) if events else "(aucun)")+"\n\n")
+        f.write("---\n")
+
+def run_turn_console(tribe:'Tribe', assign:'Assignments', last_orders:str, inertia:'InertiaTracker', event_engine:'EventEngine', turn:int=1, metrics=None, deadline:Optional[float]=None)->None:
+    # deadline: secondes accordées au LLM; au-delà (ou en cas d'échec) local_advisor répond
+    if _OPENAI_CLIENT is None:
+        warm_llm_client()
+    if metrics is None:
+        from metrics import current_metrics
+        metrics = current_metrics()
+    with metrics.turn(turn):
+        _console_turn(tribe, assign, last_orders, inertia, event_engine, turn, metrics, deadline)
+
+def _console_turn(tribe, assign, last_orders, inertia, event_engine, turn, metrics, deadline=None):
+    from local_advisor import local_advice, hedge_sync  # local_advisor importe engine
+    from engine_integration import build_advisor_prompt as build_prompt  # idem
+    with metrics.span("engine"):
+        report = tribe.next_turn()
+    with metrics.span("inertia"):
+        report["flows"] = inertia.apply(assign.per_activity, report["flows"])
+    with metrics.span("events"):
+        events = event_engine.roll(tribe)
+    with metrics.span("render"):
+        compact = render_compact(report, assign, tribe.demo)
+    with metrics.span("prompt"):
+        prompt = build_prompt(report, compact, "(vide)", events, last_orders)
+    metrics.incr("prompt_chars", len(prompt))
+    with metrics.span("llm"):
+        advisor, _ = hedge_sync(lambda: openai_llm_call(prompt),
+                                lambda reason: local_advice(report, assign, events, inertia, reason, tribe.ruleset).text, deadline)
+    if advisor.startswith(LLM_FALLBACK_PREFIX):
+        metrics.incr("llm_fallbacks")
+    with metrics.span("history"):
+        append_history_md(turn, compact, advisor, last_orders, events)
+    print("\n===== TOUR", turn, "=====")
     print(compact)
-    print("\\nConseiller >\\n", advisor)
-    print("\\nÉvénements >")
+    print("\nConseiller >\n", advisor)
+    print("\nÉvénements >")
     for e in events: print(" -", e)
-    print("\\nHistorique:", "history.md")
+    print("\nHistorique:", "history.md")
 
 __all__ = [
-    "Demographics","Assignments","Resources","Tribe",
-    "EventEngine","EventSpec","InertiaTracker",
+    "Demographics","Assignments","Resources","Tribe","Ruleset","default_ruleset",
+    "EventEngine","EventSpec","InertiaTracker","event_specs","geometric_misses",
+    "Effect","Condition","EffectTable","EventEffects","compile_effect",
     "MAN","WOMAN","PREGNANT","BABY","CHILD","GRANDPA","GRANDMA","KING",
     "SPEC_AGRI","SPEC_FISH","SPEC_STORE","SPEC_TOOLS","SPEC_SCI","SPEC_BUILD","SPEC_ARMY","SPEC_ART","SPEC_EDU","SPEC_ORG","SPEC_NURSE",
-    "render_compact","build_advisor_prompt","load_config"
+    "KeyTable","WORKER_KEYS","ACTIVITY_KEYS","COUNT_MAX","normalize_worker","normalize_activity",
+    "render_compact","CompactRenderer","build_advisor_prompt","load_config","step_turn"
 ]
\ No newline at end of file
@@ -1,28 +1,40 @@
 # engine_integration.py
+import asyncio
+import time
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict
+from collections import deque
+from typing import Deque, List, Dict
 
 from engine import Tribe, Assignments, Demographics, Resources
 from engine import render_compact, build_advisor_prompt as build_prompt_core  # si tu gardes ta version
-from engine import InertiaTracker, EventEngine, EventSpec
+from engine import InertiaTracker, EventEngine, EventSpec, step_turn, LLM_FALLBACK_PREFIX
+from prompt_builder import load_template, count_tokens
+from metrics import current_metrics
+from advisor_sections import SectionParser
+from local_advisor import local_advice, hedge, hedge_sync
 
 HISTORY_PATH = Path("history.md")
 
 class HistoryBuffer:
+    """Dernières lignes brutes; history_memory.HistoryMemory garde aussi le long terme."""
     def __init__(self, max_lines: int = 30):
         self.max_lines = max_lines
-        self.lines: List[str] = []
+        self.lines: Deque[str] = deque(maxlen=max_lines)
 
     def add(self, text: str):
-        for line in text.strip().splitlines():
-            self.lines.append(line)
-        if len(self.lines) > self.max_lines:
-            self.lines = self.lines[-self.max_lines:]
+        self.lines.extend(text.strip().splitlines())
+
+    def add_turn(self, turn: int, report: Dict, events: List[str], advisor_text: str):
+        self.add(f"[Tour {turn}] {advisor_text}")
 
     def recent_text(self) -> str:
         return "\n".join(self.lines)
 
+def _history_text(history_buf: HistoryBuffer, memory) -> str:
+    # history_memory.HistoryMemory si fourni: tours récents + saisons + années, sous budget
+    return memory.retrieve() if memory is not None else history_buf.recent_text()
+
 def append_history_file(compact_block: str, advisor_text: str, events: List[str], last_actions: str):
     ts = datetime.utcnow().isoformat(timespec="seconds")
     with HISTORY_PATH.open("a", encoding="utf-8") as f:
@@ -41,7 +53,7 @@ def build_advisor_prompt(report_json: Dict, compact_block: str, history_text: st
     - les événements
     - les dernières actions du joueur
     """
-    base = Path("build_advisor_prompt.md").read_text(encoding="utf-8")
+    base = load_template("build_advisor_prompt.md").text
     state_json_str = json_dumps_safe(report_json)
 
     dynamic = f"""
@@ -69,36 +81,70 @@ def json_dumps_safe(obj) -> str:
     return json.dumps(obj, ensure_ascii=False, indent=2)
 
 def openai_advisor(prompt: str) -> str:
-    # Branche ton client ici si tu veux une vraie réponse
-    # Fallback local pour éviter une dépendance à l’instant T
-    return "Conseiller: Les stocks tiennent, mais la pêche peut surprendre. Option prudente: renforcer 🥫. Option audacieuse: basculer 2 adultes vers 🐟. Option créative: rituel court pour la cohésion."
+    # Branche ton client ici (ou passe llm=engine.openai_llm_call à run_one_turn);
+    # sans client, local_advisor répond à partir de l'état du tour
+    return f"{LLM_FALLBACK_PREFIX} aucun client LLM branché"
 
-def run_one_turn(tribe: Tribe, inertia: InertiaTracker, event_engine: EventEngine,
-                 history_buf: HistoryBuffer, last_actions: str, turn: int):
-    # 1) Moteur calcule l'état
-    report = tribe.next_turn()
+def _count_prompt(metrics, prompt: str):
+    if metrics.enabled:
+        metrics.incr("prompt_chars", len(prompt))
+        metrics.incr("prompt_tokens", count_tokens(prompt))
 
-    # 2) Inertie post-calcule sur les flux stockables
-    adjusted = inertia.apply(tribe.assign.per_activity, report["flows"])
-    report["flows"] = adjusted  # on remplace par les flux après inertie
+def _count_advice(metrics, cache, hits: int, misses: int, advisor_text: str):
+    if metrics.enabled:
+        if cache is not None:
+            metrics.incr("cache_hits", cache.hits - hits)
+            metrics.incr("cache_misses", cache.misses - misses)
+        if advisor_text.startswith(LLM_FALLBACK_PREFIX):
+            metrics.incr("llm_fallbacks")
 
-    # 3) Événements paramétrés
-    events = event_engine.roll(tribe)
+def run_one_turn(tribe: Tribe, inertia: InertiaTracker, event_engine: EventEngine,
+                 history_buf: HistoryBuffer, last_actions: str, turn: int, cache=None,
+                 prompt_builder=None, journal=None, metrics=None, llm=None, deadline=None, memory=None):
+    # metrics.Metrics: spans par phase + compteurs (désactivé par défaut, coût négligeable)
+    # memory: history_memory.HistoryMemory, source du bloc historique du prompt si fourni
+    # llm(prompt) -> str bloquant (openai_advisor par défaut); au-delà de `deadline` secondes
+    # ou en cas d'échec, le conseiller local (local_advisor) répond à partir du rapport
+    metrics = metrics if metrics is not None else current_metrics()
+    with metrics.turn(turn):
+        return _one_turn(tribe, inertia, event_engine, history_buf, last_actions, turn,
+                         cache, prompt_builder, journal, metrics, llm or openai_advisor, deadline, memory)
+
+def _one_turn(tribe, inertia, event_engine, history_buf, last_actions, turn, cache, prompt_builder, journal,
+              metrics, llm, deadline, memory):
+    # 1-3) Moteur, inertie post-calcul sur les flux stockables, événements paramétrés
+    report, events = step_turn(tribe, inertia, event_engine, metrics)
 
     # 4) Rendu compact
-    compact_block = render_compact(report, tribe.assign, tribe.demo)
+    with metrics.span("render"):
+        compact_block = render_compact(report, tribe.assign, tribe.demo)
 
     # 5) Construire le prompt conseiller à partir du .md et du contexte dynamique
-    prompt = build_advisor_prompt(
-        report_json=report,
-        compact_block=compact_block,
-        history_text=history_buf.recent_text(),
-        events=events,
-        last_actions=last_actions
-    )
+    #    (prompt_builder.PromptBuilder: état complet + changements, budget de tokens)
+    with metrics.span("prompt"):
+        if prompt_builder is not None:
+            prompt = prompt_builder.build(report, compact_block, _history_text(history_buf, memory), events, last_actions)
+        else:
+            prompt = build_advisor_prompt(
+                report_json=report,
+                compact_block=compact_block,
+                history_text=_history_text(history_buf, memory),
+                events=events,
+                last_actions=last_actions
+            )
+    _count_prompt(metrics, prompt)
 
-    # 6) Appel LLM conseiller
-    advisor_text = openai_advisor(prompt)
+    # 6) Appel LLM conseiller (via advisor_cache.AdvisorCache si fourni), en course contre le délai
+    hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    local = lambda reason: local_advice(report, tribe.assign, events, inertia, reason, tribe.ruleset).text
+    with metrics.span("llm"):
+        if cache is not None:
+            key = cache.key(report, events, last_actions)
+            call = lambda: cache.get_or_call(key, lambda: llm(prompt))
+        else:
+            call = lambda: llm(prompt)
+        advisor_text, _ = hedge_sync(call, local, deadline)
+    _count_advice(metrics, cache, hits, misses, advisor_text)
 
     # 7) Afficher en console
     print("\n===== TOUR", turn, "=====")
@@ -108,9 +154,15 @@ def run_one_turn(tribe: Tribe, inertia: InertiaTracker, event_engine: EventEngin
     for e in events:
         print(" -", e)
 
-    # 8) Historiser
-    append_history_file(compact_block, advisor_text, events, last_actions)
-    history_buf.add(f"[Tour {turn}] {advisor_text}")
+    # 8) Historiser (journal.TurnJournal si fourni, history.md rendu à la demande)
+    with metrics.span("history"):
+        if journal is not None:
+            journal.append(turn, report, compact_block, advisor_text, last_actions, events)
+        else:
+            append_history_file(compact_block, advisor_text, events, last_actions)
+        history_buf.add_turn(turn, report, events, advisor_text)
+        if memory is not None:
+            memory.add_turn(turn, report, events, advisor_text)
 
     # 9) Retour si besoin
     return {
@@ -120,3 +172,108 @@ def run_one_turn(tribe: Tribe, inertia: InertiaTracker, event_engine: EventEngin
         "advisor": advisor_text,
         "prompt_used": prompt
     }
+
+async def run_one_turn_async(tribe: Tribe, inertia: InertiaTracker, event_engine: EventEngine,
+                             history_buf: HistoryBuffer, last_actions: str, turn: int, advisor, cache=None,
+                             prompt_builder=None, journal=None, metrics=None, stream=False, on_choices=None,
+                             deadline=None, memory=None):
+    """
+    Variante asyncio de run_one_turn: la requête conseiller (advisor.AsyncAdvisor)
+    part dès que le prompt est prêt, le rendu se fait pendant qu'elle est en vol,
+    et l'écriture de l'historique ne bloque pas la boucle d'événements.
+    Le span "llm" va de l'envoi à la réponse et chevauche donc l'affichage.
+    stream=True: la réponse s'affiche au fil des tokens (advisor.advise_stream) et
+    on_choices(choix) est appelé dès que le menu [CHOIX] est complet.
+    deadline: sans réponse (ni premier token en streaming) après ce délai, ou si le
+    fournisseur échoue, le conseiller local (local_advisor) répond à partir du rapport.
+    memory: history_memory.HistoryMemory, source du bloc historique du prompt si fourni.
+    """
+    metrics = metrics if metrics is not None else current_metrics()
+    with metrics.turn(turn):
+        return await _one_turn_async(tribe, inertia, event_engine, history_buf, last_actions, turn,
+                                     advisor, cache, prompt_builder, journal, metrics, stream, on_choices,
+                                     deadline, memory)
+
+async def _one_turn_async(tribe, inertia, event_engine, history_buf, last_actions, turn, advisor,
+                          cache, prompt_builder, journal, metrics, stream, on_choices, deadline, memory):
+    report, events = step_turn(tribe, inertia, event_engine, metrics)
+    with metrics.span("render"):
+        compact_block = render_compact(report, tribe.assign, tribe.demo)
+    with metrics.span("prompt"):
+        if prompt_builder is not None:
+            prompt = prompt_builder.build(report, compact_block, _history_text(history_buf, memory), events, last_actions)
+        else:
+            prompt = build_advisor_prompt(
+                report_json=report,
+                compact_block=compact_block,
+                history_text=_history_text(history_buf, memory),
+                events=events,
+                last_actions=last_actions
+            )
+    _count_prompt(metrics, prompt)
+    hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    sections = SectionParser(on_choices=on_choices)
+    streamed = []
+    sent = time.perf_counter()
+
+    def on_delta(delta: str):
+        # Appelé par le flux: les prints du tour sont déjà passés (aucun await avant)
+        if not streamed:
+            metrics.observe("llm_first_token", time.perf_counter() - sent)
+            print("\nConseiller >")
+        streamed.append(delta)
+        print(delta, end="", flush=True)
+        sections.feed(delta)
+
+    if stream:
+        call = lambda: advisor.advise_stream(prompt, on_delta)
+    else:
+        call = lambda: advisor.advise(prompt)
+    llm = metrics.start("llm")
+    if cache is not None:
+        key = cache.key(report, events, last_actions)
+        pending = asyncio.ensure_future(cache.aget_or_call(key, call))
+    elif stream:
+        pending = asyncio.ensure_future(call())
+    else:
+        pending = advisor.submit(prompt)
+
+    # Pendant que le conseiller réfléchit
+    print("\n===== TOUR", turn, "=====")
+    print(compact_block)
+    print("\nÉvénements >")
+    for e in events:
+        print(" -", e)
+
+    local = lambda reason: local_advice(report, tribe.assign, events, inertia, reason, tribe.ruleset).text
+    advisor_text, _ = await hedge(pending, local, deadline, answering=lambda: bool(streamed))
+    llm.stop()
+    _count_advice(metrics, cache, hits, misses, advisor_text)
+    if streamed and not advisor_text.startswith(LLM_FALLBACK_PREFIX):
+        print()
+    else:  # non-streaming, served from the cache, answered locally or stream cut short
+        if streamed:
+            print()
+            sections = SectionParser(on_choices=on_choices)
+        print("\nConseiller >\n", advisor_text)
+        sections.feed(advisor_text)
+    sections.close()
+
+    with metrics.span("history"):
+        if journal is not None:  # TurnJournal.append may fsync
+            await asyncio.to_thread(journal.append, turn, report, compact_block, advisor_text, last_actions, events)
+        else:
+            await asyncio.to_thread(append_history_file, compact_block, advisor_text, events, last_actions)
+        history_buf.add_turn(turn, report, events, advisor_text)
+        if memory is not None:
+            memory.add_turn(turn, report, events, advisor_text)
+
+    return {
+        "report": report,
+        "compact": compact_block,
+        "events": events,
+        "advisor": advisor_text,
+        "sections": sections.sections,
+        "choices": sections.choices,
+        "prompt_used": prompt
+    }
@@ -0,0 +1,140 @@
+# history_memory.py
+# Hierarchical history for the advisor, at constant cost per turn
+# - Ring buffer (deque) of the most recent turns
+# - Rolling per-season and per-year summaries built from engine reports (no LLM call)
+# - retrieve(token_budget): newest detail first, then seasons, then years, shown oldest → newest;
+#   the season and year in progress count as the newest of each
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+from prompt_builder import count_tokens
+
+TURNS_PER_YEAR = 12
+SEASON_FR = {"spring": "Printemps", "summer": "Été", "autumn": "Automne", "winter": "Hiver"}
+COVERAGE_ACTIVITIES = ("🎭", "📚", "👩‍🍼")
+ADVISOR_EXCERPT = 240  # characters of advisor text kept per recent turn
+
+
+@dataclass
+class _Rollup:
+    """Running totals for one season or one year."""
+    label: str
+    first_turn: int
+    last_turn: int = 0
+    produced: int = 0
+    consumed: int = 0
+    deficit_turns: int = 0
+    stock_start: Optional[int] = None
+    stock_end: int = 0
+    coverage_min: Dict[str, float] = field(default_factory=dict)
+    events: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, turn: int, report: Dict, events: List[str]):
+        food = report.get("food_report", {})
+        stock = report.get("stocks", {}).get("🥫", 0)
+        if self.stock_start is None:
+            self.stock_start = stock - food.get("stored", 0)
+        self.last_turn = turn
+        self.produced += food.get("produced", 0)
+        self.consumed += food.get("consumed", 0)
+        self.deficit_turns += food.get("net", 0) < 0
+        self.stock_end = stock
+        for act in COVERAGE_ACTIVITIES:
+            pct = report.get("coverage", {}).get(act, {}).get("coverage_pct")
+            if pct is not None:
+                self.coverage_min[act] = min(pct, self.coverage_min.get(act, pct))
+        for e in events:
+            self.events[e] = self.events.get(e, 0) + 1
+
+    def text(self, current: bool = False) -> str:
+        net = self.produced - self.consumed
+        cov = " ".join(f"{a}{p}%" for a, p in self.coverage_min.items())
+        line = (f"{self.label} (T{self.first_turn}-T{self.last_turn}{', en cours' if current else ''}): "
+                f"🍛 +{self.produced}/-{self.consumed} = {net:+d}"
+                f" | 🥫 {self.stock_start}→{self.stock_end}")
+        if self.deficit_turns:
+            line += f" | déficit {self.deficit_turns}t"
+        if cov:
+            line += f" | couv. min {cov}"
+        if self.events:
+            line += " | évts: " + ", ".join(f"{e[:40]}×{n}" for e, n in self.events.items())
+        return line
+
+
+class HistoryMemory:
+    def __init__(self, recent_turns: int = 6, max_seasons: int = 8, max_years: int = 50,
+                 token_budget: int = 600):
+        self.recent: Deque[Tuple[str, int]] = deque(maxlen=recent_turns)
+        self.seasons: Deque[Tuple[str, int]] = deque(maxlen=max_seasons)
+        self.years: Deque[Tuple[str, int]] = deque(maxlen=max_years)
+        self.token_budget = token_budget
+        self._season: Optional[_Rollup] = None
+        self._season_name = ""
+        self._year: Optional[_Rollup] = None
+
+    @staticmethod
+    def _entry(text: str) -> Tuple[str, int]:
+        return text, count_tokens(text)
+
+    def add(self, text: str):
+        """Free-form note kept with the recent turns (HistoryBuffer compatible)."""
+        text = " ".join(text.strip().splitlines())
+        if text:
+            self.recent.append(self._entry(text))
+
+    def add_turn(self, turn: int, report: Dict, events: List[str], advisor_text: str = ""):
+        season = report.get("season", "")
+        year = (turn - 1) // TURNS_PER_YEAR + 1
+        if self._year is not None and self._year.label != f"An {year}":
+            self.years.append(self._entry(self._year.text()))
+            self._year = None
+        if self._season is not None and (season != self._season_name or self._year is None):
+            self.seasons.append(self._entry(self._season.text()))
+            self._season = None
+        if self._year is None:
+            self._year = _Rollup(f"An {year}", turn)
+        if self._season is None:
+            self._season = _Rollup(f"{SEASON_FR.get(season, season)} an {year}", turn)
+            self._season_name = season
+        self._year.add(turn, report, events)
+        self._season.add(turn, report, events)
+
+        food = report.get("food_report", {})
+        line = f"[Tour {turn}] 🍛{food.get('net', 0):+d} 🥫{report.get('stocks', {}).get('🥫', 0)}"
+        if events:
+            line += " | " + "; ".join(events)
+        if advisor_text:
+            line += " | " + " ".join(advisor_text.strip().splitlines())[:ADVISOR_EXCERPT]
+        self.recent.append(self._entry(line))
+
+    def retrieve(self, token_budget: Optional[int] = None) -> str:
+        """Recent turns first, then the latest seasons, then years, within the budget."""
+        budget = (self.token_budget if token_budget is None else token_budget) - 12  # section headers
+        chosen: Dict[str, List[str]] = {"years": [], "seasons": [], "recent": []}
+        seasons, years = list(self.seasons), list(self.years)
+        if self._season is not None:
+            seasons.append(self._entry(self._season.text(current=True)))
+        if self._year is not None:
+            years.append(self._entry(self._year.text(current=True)))
+        for name, items in (("recent", self.recent), ("seasons", seasons), ("years", years)):
+            for text, tokens in reversed(items):
+                if tokens + 1 > budget:
+                    break
+                chosen[name].append(text)
+                budget -= tokens + 1
+        parts = []
+        if chosen["years"]:
+            parts += ["[ANNÉES]"] + chosen["years"][::-1]
+        if chosen["seasons"]:
+            parts += ["[SAISONS]"] + chosen["seasons"][::-1]
+        if chosen["recent"]:
+            parts += ["[TOURS]"] + chosen["recent"][::-1]
+        return "\n".join(parts)
+
+    def recent_text(self) -> str:
+        return self.retrieve()
+
+
+__all__ = ["HistoryMemory"]
@@ -0,0 +1,97 @@
+# http_util.py
+# Minimal HTTP/1.1 over asyncio streams (no extra dependency)
+# - Keep-alive request loop with Content-Length bodies; an oversized or malformed length
+#   raises HTTPError (413/400) and the caller answers it and closes the connection
+# - JSON and server-sent-events responses
+# Used by the local LLM stub and the game server.
+
+import json
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+STATUS_TEXT = {
+    200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 429: "Too Many Requests", 500: "Internal Server Error", 502: "Bad Gateway", 503: "Service Unavailable",
+}
+MAX_BODY = 8 * 1024 * 1024
+
+
+class HTTPError(Exception):
+    """A request that cannot be read; the rest of the connection is unusable."""
+
+    def __init__(self, status: int, message: str):
+        self.status = status
+        super().__init__(message)
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+    def json(self):
+        return json.loads(self.body or b"{}")
+
+    @property
+    def keep_alive(self) -> bool:
+        return self.headers.get("connection", "").lower() != "close"
+
+
+async def read_request(reader) -> Optional[Request]:
+    """Next request on the connection, or None once the client hung up.
+
+    Raises HTTPError when the body length is not a number or exceeds MAX_BODY (left unread).
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, path, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        return None
+    headers: Dict[str, str] = {}
+    while True:
+        h = await reader.readline()
+        if h in (b"\r\n", b"\n", b""):
+            break
+        k, _, v = h.decode("latin-1").partition(":")
+        headers[k.strip().lower()] = v.strip()
+    raw = headers.get("content-length", "") or "0"
+    if not raw.isdigit():
+        raise HTTPError(400, f"invalid Content-Length {raw!r}")
+    length = int(raw)
+    if length > MAX_BODY:
+        raise HTTPError(413, f"body of {length} bytes exceeds {MAX_BODY}")
+    body = await reader.readexactly(length) if length else b""
+    return Request(method.upper(), path, headers, body)
+
+
+def _head(status: int, headers: Dict[str, str]) -> bytes:
+    lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'Status')}"]
+    lines += [f"{k}: {v}" for k, v in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def write_response(writer, status: int, body: bytes, content_type: str = "application/json",
+                         headers: Optional[Dict[str, str]] = None):
+    h = {"Content-Type": content_type, "Content-Length": str(len(body))}
+    h.update(headers or {})
+    writer.write(_head(status, h) + body)
+    await writer.drain()
+
+
+async def write_json(writer, status: int, obj, headers: Optional[Dict[str, str]] = None):
+    await write_response(writer, status, json.dumps(obj, ensure_ascii=False).encode("utf-8"), headers=headers)
+
+
+async def start_sse(writer):
+    """Opens a server-sent-events response; the body ends when the connection closes."""
+    writer.write(_head(200, {"Content-Type": "text/event-stream", "Cache-Control": "no-cache", "Connection": "close"}))
+    await writer.drain()
+
+
+async def write_sse(writer, data: str):
+    writer.write(f"data: {data}\n\n".encode("utf-8"))
+    await writer.drain()
@@ -0,0 +1,202 @@
+# journal.py
+# Append-only turn journal (replaces free-form history.md appends on the hot path)
+# - One JSON record per turn: report, compact block, advisor text, orders, events
+# - Offset index (<name>.idx): fixed-size slots keyed by turn number, so read(turn) is O(1)
+# - Buffered writer with an fsync policy: "never", "flush" (on each flush) or "always" (each turn)
+# - Markdown history rendered on demand from the records
+
+import json
+import os
+import struct
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+INDEX_MAGIC = b"SJIX"
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct("<4sHxxQ")   # magic, version, base turn
+SLOT = struct.Struct("<Q")
+EMPTY = 0xFFFFFFFFFFFFFFFF                # slot of a turn never written
+FSYNC_POLICIES = ("never", "flush", "always")
+
+
+class TurnJournal:
+    def __init__(self, path: str = "history.jsonl", fsync: str = "flush", buffer_size: int = 64 * 1024):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + ".idx")
+        self.fsync = fsync
+        self.buffer_size = buffer_size
+        self.base: Optional[int] = None
+        self._slots: List[int] = []
+        self._pending: List[bytes] = []
+        self._pending_slots: List[bytes] = []
+        self._pending_bytes = 0
+        self._pending_records: Dict[int, bytes] = {}
+        self._open()
+
+    # --- open / recovery ---
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._data = open(self.path, "ab+")
+        self._index = open(self.index_path, "ab+")
+        self._index.seek(0)
+        raw = self._index.read()
+        if len(raw) >= INDEX_HEADER.size:
+            magic, version, base = INDEX_HEADER.unpack_from(raw)
+            if magic != INDEX_MAGIC or version != INDEX_VERSION:
+                raise ValueError(f"{self.index_path}: not a turn journal index (v{INDEX_VERSION})")
+            self.base = base
+            n = (len(raw) - INDEX_HEADER.size) // SLOT.size
+            self._slots = [SLOT.unpack_from(raw, INDEX_HEADER.size + i * SLOT.size)[0] for i in range(n)]
+        self._end = self._data.seek(0, os.SEEK_END)
+        self._recover()
+
+    def _recover(self):
+        # Drop slots pointing past the data (index written, data lost)
+        while self._slots and self._slots[-1] != EMPTY and self._slots[-1] >= self._end:
+            self._slots.pop()
+        last = max((o for o in self._slots if o != EMPTY), default=None)
+        good_end = 0
+        if last is not None:
+            self._data.seek(last)
+            line = self._data.readline()
+            good_end = last + len(line) if line.endswith(b"\n") else last
+            if not line.endswith(b"\n"):
+                self._slots[self._slots.index(last)] = EMPTY
+        # Complete records written after the last indexed one (data written, index lost)
+        self._data.seek(good_end)
+        for line in iter(self._data.readline, b""):
+            if not line.endswith(b"\n"):
+                break
+            turn = json.loads(line)["turn"]
+            self._set_slot(turn, good_end)
+            good_end += len(line)
+        if good_end != self._end:
+            self._data.truncate(good_end)
+            self._end = good_end
+        self._rewrite_index()
+
+    def _set_slot(self, turn: int, offset: int):
+        if self.base is None:
+            self.base = turn
+        i = turn - self.base
+        if i < len(self._slots):
+            raise ValueError(f"turn {turn} already journaled or older than the last turn")
+        self._slots.extend([EMPTY] * (i - len(self._slots)))
+        self._slots.append(offset)
+        return i
+
+    def _rewrite_index(self):
+        self._index.truncate(0)
+        if self.base is not None:
+            self._index.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, self.base))
+            self._index.write(b"".join(SLOT.pack(o) for o in self._slots))
+        self._index.flush()
+
+    # --- writing ---
+    def append(self, turn: int, report: Dict, compact: str, advisor: str,
+               orders: str = "", events: Optional[List[str]] = None, ts: Optional[str] = None):
+        record = {
+            "turn": turn,
+            "ts": ts or datetime.utcnow().isoformat(timespec="seconds"),
+            "report": report,
+            "compact": compact,
+            "advisor": advisor,
+            "orders": orders,
+            "events": list(events or []),
+        }
+        line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        first = self.base is None
+        start = len(self._slots)
+        self._set_slot(turn, self._end)
+        if first:
+            self._pending_slots.append(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, self.base))
+        self._pending_slots.extend(SLOT.pack(o) for o in self._slots[start:])
+        self._pending.append(line)
+        self._pending_records[turn] = line
+        self._pending_bytes += len(line)
+        self._end += len(line)
+        if self.fsync == "always" or self._pending_bytes >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        # Data before index: a crash in between leaves records the index can recover
+        self._data.write(b"".join(self._pending))
+        self._data.flush()
+        self._index.seek(0, os.SEEK_END)
+        self._index.write(b"".join(self._pending_slots))
+        self._index.flush()
+        if self.fsync != "never":
+            os.fsync(self._data.fileno())
+            os.fsync(self._index.fileno())
+        self._pending.clear()
+        self._pending_slots.clear()
+        self._pending_records.clear()
+        self._pending_bytes = 0
+
+    def close(self):
+        self.flush()
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- reading ---
+    @property
+    def turns(self) -> List[int]:
+        return [self.base + i for i, o in enumerate(self._slots) if o != EMPTY]
+
+    def __len__(self) -> int:
+        return sum(1 for o in self._slots if o != EMPTY)
+
+    def read(self, turn: int) -> Dict:
+        pending = self._pending_records.get(turn)
+        if pending is not None:
+            return json.loads(pending)
+        i = -1 if self.base is None else turn - self.base
+        if i < 0 or i >= len(self._slots) or self._slots[i] == EMPTY:
+            raise KeyError(turn)
+        self._data.seek(self._slots[i])
+        return json.loads(self._data.readline())
+
+    def __iter__(self) -> Iterator[Dict]:
+        for turn in self.turns:
+            yield self.read(turn)
+
+
+def render_markdown_record(rec: Dict) -> str:
+    events = rec.get("events") or []
+    return (
+        f"## Tour {rec['turn']}  •  {rec['ts']} UTC\n"
+        + rec.get("compact", "") + "\n\n"
+        + "**Conseiller**\n\n" + (rec.get("advisor") or "").strip() + "\n\n"
+        + "**Ordres**\n\n" + (rec.get("orders") or "(N/A)") + "\n\n"
+        + "**Événements**\n\n" + ("\n".join(events) if events else "(aucun)") + "\n\n"
+        + "---\n"
+    )
+
+
+def render_markdown(journal: TurnJournal, start: Optional[int] = None, stop: Optional[int] = None) -> str:
+    """history.md content for turns in [start, stop], rendered from the journal."""
+    parts = []
+    for turn in journal.turns:
+        if (start is None or turn >= start) and (stop is None or turn <= stop):
+            parts.append(render_markdown_record(journal.read(turn)))
+    return "".join(parts)
+
+
+def export_markdown(journal: TurnJournal, path: str = "history.md") -> Path:
+    out = Path(path)
+    out.write_text(render_markdown(journal), encoding="utf-8")
+    return out
+
+
+__all__ = ["TurnJournal", "render_markdown", "render_markdown_record", "export_markdown"]
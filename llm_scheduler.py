@@ -0,0 +1,275 @@
+# llm_scheduler.py
+# Request scheduler in front of the advisor's LLM calls
+# - Two token buckets: requests/min and tokens/min (prompt estimate + max_tokens per call)
+# - Priority classes: INTERACTIVE turns dispatch before BACKGROUND work; the order is decided
+#   when a call slot frees up, so a queued background job never delays a turn
+# - Identical in-flight prompts coalesced into one request (shared result)
+# - Exponential backoff with full jitter on 429/5xx/timeouts, honoring Retry-After; a 429
+#   pauses all dispatch until the provider's window reopens
+# - advise() keeps the never-raises contract of AsyncAdvisor.advise (canned fallback)
+#
+# Usage:
+#   llm = AsyncAdvisor(base_url=...)
+#   sched = LLMScheduler(llm.complete, rpm=500, tpm=200_000, max_tokens=llm.max_tokens)
+#   text = await sched.advise(prompt)                  # interactive
+#   text = await sched.advise(prompt, BACKGROUND)      # e.g. a long-term summary
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from engine import LLM_FALLBACK_ADVICE, LLM_FALLBACK_PREFIX
+from prompt_builder import count_tokens
+from metrics import current_metrics
+
+INTERACTIVE = 0
+BACKGROUND = 10
+
+
+class TokenBucket:
+    """`rate` units per minute, bursts up to `capacity` (a full minute by default)."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate / 60.0
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.stamp = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def delay(self, n: float) -> float:
+        """Seconds until `n` units are available (0 when they are); consumes nothing."""
+        self._refill()
+        n = min(n, self.capacity)  # an oversized request waits for a full bucket, not forever
+        return 0.0 if self.tokens >= n else (n - self.tokens) / self.rate
+
+    def take(self, n: float):
+        self._refill()
+        self.tokens -= min(n, self.capacity)
+
+
+def retry_info(exc: BaseException) -> Tuple[bool, bool, Optional[float]]:
+    """(retryable, throttled, Retry-After seconds) for a provider error.
+
+    Retryable: 429, 5xx, timeouts and dropped connections; throttled: 429.
+    """
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError)):
+        return True, False, None
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    if status is None:
+        # openai.APIConnectionError / APITimeoutError carry no status
+        return type(exc).__name__ in ("APIConnectionError", "APITimeoutError"), False, None
+    after = None
+    try:
+        after = float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        pass
+    return status == 429 or status >= 500, status == 429, after
+
+
+def _consume(fut: asyncio.Future):
+    if not fut.cancelled():
+        fut.exception()
+
+
+class _Job:
+    __slots__ = ("key", "prompt", "tokens", "priority", "attempt", "future", "started")
+
+    def __init__(self, key: str, prompt: str, tokens: int, priority: int, future: asyncio.Future):
+        self.key = key
+        self.prompt = prompt
+        self.tokens = tokens
+        self.priority = priority
+        self.attempt = 0
+        self.future = future
+        self.started = False
+
+
+class LLMScheduler:
+    def __init__(self, complete: Callable[[str], Awaitable[str]], rpm: Optional[float] = None,
+                 tpm: Optional[float] = None, max_tokens: int = 400, max_in_flight: int = 8,
+                 max_retries: int = 4, base_delay: float = 0.5, max_delay: float = 30.0,
+                 rng: Optional[random.Random] = None, clock: Callable[[], float] = time.monotonic, metrics=None):
+        self.complete = complete
+        self.requests = TokenBucket(rpm, clock=clock) if rpm else None
+        self.tokens = TokenBucket(tpm, clock=clock) if tpm else None
+        self.max_tokens = max_tokens
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng or random.Random()
+        self.clock = clock
+        self.metrics = metrics if metrics is not None else current_metrics()
+        self.paused_until = 0.0
+        self._heap: List[Tuple[int, int, _Job]] = []
+        self._seq = itertools.count()
+        self._jobs: Dict[str, _Job] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._calls: set = set()
+        self.stats = {"requests": 0, "calls": 0, "coalesced": 0, "retries": 0, "throttled": 0, "failures": 0}
+
+    # --- public API ---
+    async def request(self, prompt: str, priority: int = INTERACTIVE) -> str:
+        """Completion text; raises the provider error once retries are exhausted."""
+        self._ensure_started()
+        self.stats["requests"] += 1
+        key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        job = self._jobs.get(key)
+        if job is not None:
+            self.stats["coalesced"] += 1
+            self.metrics.incr("llm_coalesced")
+            if priority < job.priority and not job.started:
+                job.priority = priority
+                self._push(job)  # the stale heap entry is skipped once started
+        else:
+            fut = asyncio.get_running_loop().create_future()
+            fut.add_done_callback(_consume)  # no "exception never retrieved" once callers gave up
+            job = self._jobs[key] = _Job(key, prompt, count_tokens(prompt) + self.max_tokens, priority, fut)
+            self._push(job)
+        return await asyncio.shield(job.future)
+
+    async def advise(self, prompt: str, priority: int = INTERACTIVE, timeout: Optional[float] = None) -> str:
+        """Same contract as AsyncAdvisor.advise: never raises, falls back to a canned advice."""
+        try:
+            if timeout is None:
+                return await self.request(prompt, priority)
+            return await asyncio.wait_for(self.request(prompt, priority), timeout)
+        except asyncio.TimeoutError:
+            return f"{LLM_FALLBACK_PREFIX} timeout\n" + LLM_FALLBACK_ADVICE
+        except Exception as e:
+            return f"{LLM_FALLBACK_PREFIX} {e}\n" + LLM_FALLBACK_ADVICE
+
+    def submit(self, prompt: str, priority: int = INTERACTIVE, timeout: Optional[float] = None) -> "asyncio.Task[str]":
+        """advise() in the background, as AsyncAdvisor.submit (drop-in for run_one_turn_async)."""
+        return asyncio.ensure_future(self.advise(prompt, priority, timeout))
+
+    @property
+    def pending(self) -> int:
+        return sum(1 for j in self._jobs.values() if not j.started)
+
+    async def aclose(self):
+        tasks = [t for t in [self._dispatcher, *self._calls] if t is not None]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._dispatcher = None
+        for job in self._jobs.values():
+            if not job.future.done():
+                job.future.cancel()
+        self._jobs.clear()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    # --- dispatch ---
+    def _ensure_started(self):
+        # Primitives built inside the running loop (Python 3.9 binds them at creation)
+        if self._dispatcher is None:
+            self._wakeup = asyncio.Event()
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+
+    def _push(self, job: _Job):
+        heapq.heappush(self._heap, (job.priority, next(self._seq), job))
+        self._wakeup.set()
+
+    def _top(self) -> Optional[_Job]:
+        while self._heap:
+            job = self._heap[0][2]
+            if not job.started and job.priority == self._heap[0][0]:
+                return job
+            heapq.heappop(self._heap)  # started, or superseded by a higher priority entry
+        return None
+
+    def _delay(self, job: _Job) -> float:
+        wait = self.paused_until - self.clock()
+        if self.requests is not None:
+            wait = max(wait, self.requests.delay(1))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.delay(job.tokens))
+        return wait
+
+    async def _dispatch(self):
+        while True:
+            await self._slots.acquire()
+            while True:
+                self._wakeup.clear()
+                job = self._top()
+                wait = self._delay(job) if job is not None else None
+                if wait is not None and wait <= 0:
+                    break
+                # Nothing ready: sleep until the buckets refill or a new (maybe higher priority) job
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+            heapq.heappop(self._heap)
+            job.started = True
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(job.tokens)
+            task = asyncio.ensure_future(self._call(job))
+            self._calls.add(task)
+            task.add_done_callback(self._calls.discard)
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full jitter: uniform in [0, min(max_delay, base * 2^attempt)], at least Retry-After."""
+        delay = self.rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        return max(delay, retry_after or 0.0)
+
+    async def _call(self, job: _Job):
+        try:
+            self.stats["calls"] += 1
+            text = await self.complete(job.prompt)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            retryable, throttled, after = retry_info(e)
+            if not retryable or job.attempt >= self.max_retries:
+                self.stats["failures"] += 1
+                self._finish(job, error=e)
+                return
+            if throttled:
+                # Throttled: hold every dispatch, not just this job
+                self.stats["throttled"] += 1
+                self.metrics.incr("llm_throttled")
+                self.paused_until = max(self.paused_until, self.clock() + (after or self.backoff(job.attempt)))
+            delay = self.backoff(job.attempt, after)
+            job.attempt += 1
+            self.stats["retries"] += 1
+            self.metrics.incr("llm_retries")
+            self._slots.release()
+            await asyncio.sleep(delay)
+            job.started = False
+            self._push(job)
+            return
+        self._finish(job, text=text)
+
+    def _finish(self, job: _Job, text: Optional[str] = None, error: Optional[BaseException] = None):
+        self._slots.release()
+        self._jobs.pop(job.key, None)
+        if job.future.done():
+            return
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(text)
+
+
+__all__ = ["INTERACTIVE", "BACKGROUND", "TokenBucket", "LLMScheduler", "retry_info"]
@@ -0,0 +1,164 @@
+# llm_stub.py
+# Local stub speaking the chat-completions API, for advisor tests without a provider
+# - POST /v1/chat/completions -> canned reply (string or callable on the prompt);
+#   "stream": true answers with server-sent chunks, one word every `token_delay` seconds
+# - Artificial latency and in-flight counters to check concurrency limits
+# - Throttling injection: scripted error statuses for the first requests, and/or a server-side
+#   requests-per-minute window answering 429 + Retry-After (exercises llm_scheduler)
+#
+# Usage:
+#   async with StubLLMServer(reply="...", latency=0.2) as stub:
+#       advisor = AsyncAdvisor(base_url=stub.base_url, api_key="stub")
+
+import asyncio
+import json
+import re
+import time
+from collections import deque
+from typing import Callable, Deque, List, Optional, Sequence, Union
+
+from http_util import HTTPError, read_request, start_sse, write_json, write_sse
+
+DEFAULT_REPLY = (
+    "[NARRATION]\nLe feu crépite, la tribu attend.\n\n"
+    "[BILAN]\nStocks stables.\n\n"
+    "[OPPORTUNITÉS]\n- Renforcer 🥫\n- Envoyer 2 adultes vers 🐟\n\n"
+    "[CHOIX]\n1. Prudent: renforcer 🥫\n2. Risqué: basculer vers 🐟\n3. Innovant: investir 🧪\n"
+)
+
+
+class StubLLMServer:
+    def __init__(self, reply: Union[str, Callable[[str], str]] = DEFAULT_REPLY, latency: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0, model: str = "stub-model",
+                 errors: Sequence[int] = (), rpm: Optional[int] = None, retry_after: float = 1.0,
+                 token_delay: float = 0.0):
+        self.reply = reply
+        self.latency = latency  # before the first token when streaming
+        self.token_delay = token_delay
+        self.errors = deque(errors)  # status per request, in order; 200 serves normally
+        self.rpm = rpm
+        self.retry_after = retry_after
+        self.statuses: List[int] = []
+        self._window: Deque[float] = deque()
+        self.host = host
+        self.port = port
+        self.model = model
+        self.prompts: List[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def _reply_for(self, prompt: str) -> str:
+        return self.reply(prompt) if callable(self.reply) else self.reply
+
+    def completion(self, content: str) -> dict:
+        return {
+            "id": f"chatcmpl-stub-{len(self.prompts)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": self.model,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    def chunk(self, delta: dict, finish_reason: Optional[str] = None) -> str:
+        return json.dumps({
+            "id": f"chatcmpl-stub-{len(self.prompts)}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": self.model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }, ensure_ascii=False)
+
+    async def _stream(self, writer, content: str):
+        await start_sse(writer)
+        await write_sse(writer, self.chunk({"role": "assistant", "content": ""}))
+        for i, piece in enumerate(re.findall(r"\s*\S+\s*|\s+", content)):
+            if i and self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            await write_sse(writer, self.chunk({"content": piece}))
+        await write_sse(writer, self.chunk({}, "stop"))
+        await write_sse(writer, "[DONE]")
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    req = await read_request(reader)
+                except HTTPError as e:
+                    await write_json(writer, e.status, {"error": {"message": str(e), "type": "stub"}}, {"Connection": "close"})
+                    break
+                if req is None:
+                    break
+                if req.method != "POST" or not req.path.rstrip("/").endswith("/chat/completions"):
+                    await write_json(writer, 404, {"error": {"message": "not found"}})
+                elif await self._chat(req, writer):
+                    break  # streamed: the SSE body ends with the connection
+                if not req.keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass  # client gone or server shutting down
+        finally:
+            writer.close()
+
+    def _injected_status(self) -> int:
+        if self.errors:
+            return self.errors.popleft()
+        if self.rpm is not None:
+            now = time.monotonic()
+            while self._window and now - self._window[0] >= 60.0:
+                self._window.popleft()
+            if len(self._window) >= self.rpm:
+                return 429
+            self._window.append(now)
+        return 200
+
+    async def _chat(self, req, writer) -> bool:
+        """Answers one completion request; True when the response was streamed."""
+        status = self._injected_status()
+        self.statuses.append(status)
+        if status != 200:
+            headers = {"Retry-After": f"{self.retry_after:g}"} if status == 429 else None
+            await write_json(writer, status, {"error": {"message": f"injected {status}", "type": "stub",
+                                                        "code": status}}, headers)
+            return False
+        body = req.json()
+        prompt = "\n".join(m.get("content", "") for m in body.get("messages", []) if m.get("role") == "user")
+        self.prompts.append(prompt)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if body.get("stream"):
+                await self._stream(writer, self._reply_for(prompt))
+                return True
+            await write_json(writer, 200, self.completion(self._reply_for(prompt)))
+            return False
+        finally:
+            self.in_flight -= 1
+
+
+__all__ = ["StubLLMServer"]
@@ -0,0 +1,196 @@
+# local_advisor.py
+# Deterministic rule-based advisor, built from the turn's report in microseconds
+# - Same tagged structure as the LLM: [NARRATION] [BILAN] [OPPORTUNITÉS] [CHOIX] (3 choices)
+# - Reads the food runway (food_report + 🥫 stock), coverage gaps (report["coverage"], i.e.
+#   Tribe.non_stock_coverages), inertia cooldowns and the turn's events
+# - Each choice comes with its moves in the fork.Option shape, at most 2 workers per move so
+#   no activity crosses the inertia threshold
+# - hedge() / hedge_sync(): race the LLM under a latency deadline, local advice on a miss or
+#   a provider failure; the text starts with LLM_FALLBACK_PREFIX so caches never store it
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from engine import LLM_FALLBACK_PREFIX, MAN, WOMAN, default_ruleset
+
+SEASON_FR = {"spring": "Printemps", "summer": "Été", "autumn": "Automne", "winter": "Hiver"}
+COVERAGE_ACTIVITIES = ("🎭", "📚", "👩‍🍼")
+COVERAGE_LABEL = {"🎭": "cohésion", "📚": "éducation", "👩‍🍼": "soins"}
+FOOD_ACTIVITIES = ("🌾", "🐟", "🦌")
+# Where spare adults are taken from, least essential first
+DONORS = ("🎭", "🏗", "🧪", "🔧", "🛡️", "🥫", "🦌", "🐟", "🌾")
+MOVABLE = (MAN, WOMAN)
+RUNWAY_SAFE = 6       # turns of 🥫 reserve below which food comes first
+COVERAGE_GAP = 80.0   # coverage % below which an activity is short
+MOVE = 2              # workers per move: under the default inertia threshold (3)
+
+
+@dataclass
+class LocalAdvice:
+    text: str
+    options: Dict[str, List[Dict]] = field(default_factory=dict)  # "prudent" -> fork.Option moves
+
+
+def _runway(report: Dict) -> Tuple[int, int, Optional[int]]:
+    """(🥫 stock, net food per turn, turns before the reserve runs out or None if it grows)."""
+    food = report.get("food_report", {})
+    stock = report.get("stocks", {}).get("🥫", 0)
+    net = food.get("net", 0)
+    if net >= 0:
+        return stock, net, None
+    return stock, net, stock // max(1, -net)
+
+
+def _gaps(report: Dict) -> List[Tuple[str, float]]:
+    cov = report.get("coverage", {})
+    gaps = [(a, cov[a]["coverage_pct"]) for a in COVERAGE_ACTIVITIES
+            if a in cov and cov[a].get("coverage_pct", 100.0) < COVERAGE_GAP]
+    return sorted(gaps, key=lambda g: g[1])
+
+
+def _move(assign, dst: str, cooling: Dict[str, int], avoid: Sequence[str] = ()) -> List[Dict]:
+    """Up to MOVE adults into `dst` from the least essential activity that has them."""
+    if dst in cooling:
+        return []
+    for src in DONORS:
+        if src == dst or src in avoid or src in cooling:
+            continue
+        workers = assign.per_activity.get(src, {})
+        for w in MOVABLE:
+            n = min(MOVE, workers.get(w, 0))
+            if n:
+                return [{"activity": src, "worker": w, "delta": -n}, {"activity": dst, "worker": w, "delta": n}]
+    return []
+
+
+def _describe(moves: List[Dict], fallback: str) -> str:
+    if not moves:
+        return fallback
+    src, dst = moves
+    return f"déplacer {dst['delta']} {dst['worker']} de {src['activity']} vers {dst['activity']}"
+
+
+def local_advice(report: Dict, assign, events: Sequence[str] = (), inertia=None, reason: str = "",
+                 rules=None) -> LocalAdvice:
+    """`rules`: the tribe's Ruleset (tribe.ruleset), for the season factors the engine used."""
+    season = report.get("season", "")
+    stock, net, runway = _runway(report)
+    consumed = report.get("food_report", {}).get("consumed", 0)
+    reserve = stock // max(1, consumed)
+    gaps = _gaps(report)
+    cooling = dict(inertia.cooldowns) if inertia is not None else {}
+    short = (runway is not None and runway < RUNWAY_SAFE) or reserve < RUNWAY_SAFE
+    # Fields: the season factor decides between 🌾 and 🐟
+    factors = (rules if rules is not None else default_ruleset()).season_factor
+    food_dst = "🌾" if factors.get(season, 1.0) >= 0.5 else "🐟"
+
+    # [NARRATION]
+    scene = " ".join(f"{e.rstrip('.')}." for e in events) if events else "Le camp est calme."
+    narration = f"{SEASON_FR.get(season, season).capitalize()}: {scene} La tribu compte {report.get('population_total', 0)} âmes."
+
+    # [BILAN]
+    if runway is None:
+        food_line = f"🥫 {stock} (+{net}/t): ~{reserve} tours de réserve."
+    else:
+        food_line = f"🥫 {stock} ({net}/t): déficit, réserve épuisée dans ~{runway} tours."
+    bilan = [food_line]
+    if gaps:
+        bilan.append("Couverture faible: " + ", ".join(f"{a} {pct}%" for a, pct in gaps) + ".")
+    else:
+        bilan.append("Cohésion, éducation et soins couverts.")
+    if cooling:
+        bilan.append("Inertie: " + ", ".join(f"{a} en recharge ({n}t)" for a, n in sorted(cooling.items())) + ".")
+
+    # [OPPORTUNITÉS]
+    opps = []
+    if short:
+        opps.append(f"Renforcer {food_dst} avant que la réserve ne fonde.")
+    for a, pct in gaps[:2]:
+        opps.append(f"Ajouter des adultes à {a} ({COVERAGE_LABEL[a]} à {pct}%).")
+    if not short and reserve >= 2 * RUNWAY_SAFE:
+        opps.append("Réserve confortable: investir dans 🧪 ou 🔧.")
+    if cooling:
+        opps.append("Laisser " + ", ".join(sorted(cooling)) + " tranquilles le temps de la recharge.")
+    if not opps:
+        opps.append("Garder la répartition actuelle et surveiller 🥫.")
+
+    # [CHOIX]
+    if short:
+        prudent = _move(assign, food_dst, cooling, avoid=FOOD_ACTIVITIES)
+    elif gaps:
+        prudent = _move(assign, gaps[0][0], cooling, avoid=FOOD_ACTIVITIES)
+    else:
+        prudent = _move(assign, "🥫", cooling, avoid=FOOD_ACTIVITIES)
+    # Risky: adults taken off the food chain (to hunt when short, else to the worst gap)
+    risky_dst = "🦌" if short or not gaps else gaps[0][0]
+    risky = _move(assign, risky_dst, cooling, avoid=[a for a in DONORS if a not in FOOD_ACTIVITIES])
+    innovative = _move(assign, "🧪" if "🧪" not in cooling else "🔧", cooling, avoid=FOOD_ACTIVITIES if short else ())
+    options = {"prudent": prudent, "risqué": risky, "innovant": innovative}
+    choices = [
+        f"Prudent: {_describe(prudent, 'garder la répartition actuelle')}",
+        f"Risqué: {_describe(risky, 'tenter une chasse avec les effectifs actuels')}",
+        f"Innovant: {_describe(innovative, 'attendre la fin de la recharge pour investir')}",
+    ]
+
+    head = f"{LLM_FALLBACK_PREFIX} conseiller local" + (f" ({reason})" if reason else "")
+    text = "\n".join([
+        head, "",
+        "[NARRATION]", narration, "",
+        "[BILAN]", *bilan, "",
+        "[OPPORTUNITÉS]", *(f"- {o}" for o in opps), "",
+        "[CHOIX]", *(f"{i}. {c}" for i, c in enumerate(choices, 1)), "",
+    ])
+    return LocalAdvice(text, options)
+
+
+def _reason(text: str) -> str:
+    return text.splitlines()[0][len(LLM_FALLBACK_PREFIX):].strip() if text else ""
+
+
+async def hedge(pending: "asyncio.Future[str]", local: Callable[[str], str], deadline: Optional[float] = None,
+                answering: Callable[[], bool] = lambda: False) -> Tuple[str, str]:
+    """(text, "llm" | "local"): the LLM reply if it beats `deadline`, else local(reason).
+
+    `answering()` true (e.g. a stream already printing) lets a late reply finish instead.
+    A fallback reply from the provider side is replaced by the local advice too.
+    """
+    if deadline is not None:
+        done, _ = await asyncio.wait({pending}, timeout=deadline)
+        if not done and not answering():
+            pending.cancel()
+            return local(f"délai {deadline:g}s dépassé"), "local"
+    text = await pending
+    if text.startswith(LLM_FALLBACK_PREFIX):
+        return local(_reason(text)), "local"
+    return text, "llm"
+
+
+_POOL = None
+
+def hedge_sync(call: Callable[[], str], local: Callable[[str], str], deadline: Optional[float] = None) -> Tuple[str, str]:
+    """hedge() for blocking clients: the call runs on a helper thread.
+
+    Past `deadline` the call is abandoned, not cancelled: a running future cannot be stopped,
+    so it keeps its pool thread until the provider returns, and whatever it does then (e.g.
+    an AdvisorCache.put, which is locked for this) happens on that thread.
+    """
+    if deadline is None:
+        text = call()
+    else:
+        global _POOL
+        if _POOL is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _POOL = ThreadPoolExecutor(4, thread_name_prefix="llm-hedge")
+        from concurrent.futures import TimeoutError as FutureTimeout
+        fut = _POOL.submit(call)
+        try:
+            text = fut.result(timeout=deadline)
+        except FutureTimeout:
+            return local(f"délai {deadline:g}s dépassé"), "local"
+    if text.startswith(LLM_FALLBACK_PREFIX):
+        return local(_reason(text)), "local"
+    return text, "llm"
+
+
+__all__ = ["LocalAdvice", "local_advice", "hedge", "hedge_sync"]
@@ -1,96 +1,49 @@
-import yaml
-import random
-import openai
-from pathlib import Path
-from datetime import datetime
+# main.py
+# Console entry point: one turn of the sample tribe under config.yaml
+# - config.yaml goes through config_loader.load_game_config (schema check, compiled cache)
+# - Turn, advisor (OpenAI, local_advisor past the deadline or on failure) and history.md
+#   through engine_integration.run_one_turn
 
-# === Load Config ===
-with open("config.yaml", "r") as f:
-    CONFIG = yaml.safe_load(f)
+import sys
+from typing import Optional
 
-# === Global Variables ===
-HISTORY_FILE = Path("history.md")
-STATE = {
-    "population": CONFIG["initial_population"],
-    "activities": {},
-    "resources": CONFIG["initial_resources"],
-    "history": []
-}
+CONFIG_PATH = "config.yaml"
+LLM_DEADLINE = 20.0  # secondes accordées au LLM avant le conseiller local
+CONFIG = None  # config_loader.GameConfig, set by load()
 
-# === Production Rules ===
-PRODUCTION_RULES = CONFIG["production_rules"]
 
-# === Helper Classes ===
-class Activity:
-    def __init__(self, name, workers):
-        self.name = name
-        self.workers = workers
-    
-    def produce(self):
-        rules = PRODUCTION_RULES.get(self.name, {})
-        total = 0
-        for w_type, count in self.workers.items():
-            eff = rules.get("workers", {}).get(w_type, 0)
-            total += count * eff
-        return total
+def load(path: str = CONFIG_PATH):
+    """Validated, compiled config.yaml (at startup, not on import).
 
-class NonStockableActivity(Activity):
-    def produce(self, need):
-        produced = super().produce()
-        return min(100, (produced / need) * 100 if need > 0 else 100)
+    Raises config_loader.ConfigError listing every schema problem.
+    """
+    global CONFIG
+    from config_loader import load_game_config
+    CONFIG = load_game_config(path)
+    return CONFIG
 
-# === Compact Rendering ===
-def render_compact(state):
-    lines = []
-    pop = state["population"]
-    res = state["resources"]
-    line1 = f"👥{pop['total']} (💪{pop['workers']})"
-    line2 = f"🧔‍♂️{pop['men']} 👩{pop['women']} 🤰{pop['pregnant']} 👶{pop['babies']} 🧒{pop['children']} 👴{pop['elders_m']} 👵{pop['elders_f']}"
-    line3 = f"🥫{res['food']['stock']} (+{res['food']['prod']}) | ~{res['food']['turns']}t/{res['food']['capacity']}"
-    lines.extend([line1, line2, line3])
-    return "\n".join(lines)
 
-# === Events ===
-def trigger_events():
-    events = CONFIG["events"]
-    triggered = []
-    for event in events:
-        if random.random() < event["probability"]:
-            triggered.append(event)
-    return triggered
+def new_game(config, seed: Optional[int] = None):
+    """Sample starting tribe (same as a new server campaign) with the config's rules and events."""
+    from engine import EventEngine
+    from campaign import default_campaign
+    tribe, inertia, _ = default_campaign().build(0)
+    tribe.rules = config.ruleset
+    return tribe, inertia, EventEngine(specs_by_season=config.specs_by_season, rng_seed=seed)
 
-# === History Logging ===
-def log_history(entry):
-    STATE["history"].append(entry)
-    with open(HISTORY_FILE, "a") as f:
-        f.write(f"\n### {datetime.now().strftime('%Y-%m-%d %H:%M')}\n{entry}\n")
 
-# === LLM Adviser ===
-def ask_adviser(state, events):
-    client = openai.OpenAI(api_key=CONFIG["openai_api_key"])
-    prompt = CONFIG["prompts"]["master"].format(
-        state=render_compact(state),
-        events="\n".join([e["description"] for e in events])
-    )
-    resp = client.chat.completions.create(
-        model=CONFIG["openai_model"],
-        messages=[{"role": "system", "content": "You are the game master."},
-                  {"role": "user", "content": prompt}]
-    )
-    return resp.choices[0].message.content
+def run_turn(config=None, turn: int = 1, orders: str = ""):
+    from engine import openai_llm_call
+    from engine_integration import HistoryBuffer, run_one_turn
+    tribe, inertia, events = new_game(config or CONFIG)
+    return run_one_turn(tribe, inertia, events, HistoryBuffer(), orders, turn,
+                        llm=openai_llm_call, deadline=LLM_DEADLINE)
 
-# === Game Loop Example ===
-def run_turn():
-    events = trigger_events()
-    advice = ask_adviser(STATE, events)
-    print("=== STATE ===")
-    print(render_compact(STATE))
-    print("=== EVENTS ===")
-    for e in events:
-        print("-", e["description"])
-    print("=== ADVISER ===")
-    print(advice)
-    log_history(advice)
 
 if __name__ == "__main__":
+    if "--profile-startup" in sys.argv:
+        from startup import profile_startup
+        profile_startup()
+        sys.exit(0)
+    load()
     run_turn()
@@ -0,0 +1,317 @@
+# metrics.py
+# Per-phase turn instrumentation
+# - Timing spans (engine, inertia, events, render, prompt, llm, history) grouped per turn
+# - Counters: prompt size (chars, tokens), LLM retries/fallbacks, advisor cache hits/misses
+# - Pluggable sinks: in-memory, JSON lines (one record per turn), Prometheus text-format file
+# - Disabled registry (NULL_METRICS, the default) hands out one shared no-op span: a few
+#   attribute lookups per phase, no clock reads, no allocation
+
+import bisect
+import contextvars
+import json
+import math
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence
+
+PHASES = ("engine", "inertia", "events", "render", "prompt", "llm", "history")
+# Seconds; covers a sub-millisecond engine step up to a slow LLM round trip
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_TURN: contextvars.ContextVar = contextvars.ContextVar("metrics_turn", default=None)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float] = BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v: float):
+        self.counts[bisect.bisect_left(self.buckets, v)] += 1
+        self.sum += v
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        out, acc = [], 0
+        for c in self.counts:
+            acc += c
+            out.append(acc)
+        return out
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def stop(self) -> float:
+        return 0.0
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "t0")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+        self.t0 = time.perf_counter()
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def stop(self) -> float:
+        dt = time.perf_counter() - self.t0
+        self.metrics.observe(self.name, dt)
+        return dt
+
+
+class _Turn:
+    __slots__ = ("metrics", "record", "t0", "token")
+
+    def __init__(self, metrics: "Metrics", record: Dict):
+        self.metrics = metrics
+        self.record = record
+
+    def __enter__(self):
+        self.token = _TURN.set(self.record)
+        self.t0 = time.perf_counter()
+        return self.record
+
+    def __exit__(self, exc_type, exc, tb):
+        dt = time.perf_counter() - self.t0
+        _TURN.reset(self.token)
+        self.record["seconds"] = dt
+        if exc_type is not None:
+            self.record["error"] = exc_type.__name__
+        self.metrics._end_turn(self.record, dt)
+        return False
+
+
+class Metrics:
+    """Span/counter registry; totals live here, sinks get one record per finished turn."""
+
+    def __init__(self, sinks: Sequence = (), enabled: bool = True, labels: Optional[Dict[str, str]] = None):
+        self.enabled = enabled
+        self.sinks = list(sinks)
+        self.labels = dict(labels or {})
+        self.phases: Dict[str, Histogram] = {}
+        self.turns = Histogram()
+        self.counters: Dict[str, float] = {}
+
+    # --- instrumentation ---
+    def span(self, name: str):
+        """Context manager timing `name`; `span(name).stop()` also works for overlapping phases."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    start = span
+
+    def incr(self, name: str, n: float = 1):
+        if not self.enabled or not n:
+            return
+        self.counters[name] = self.counters.get(name, 0) + n
+        rec = _TURN.get()
+        if rec is not None:
+            c = rec["counters"]
+            c[name] = c.get(name, 0) + n
+
+    def observe(self, name: str, seconds: float):
+        if not self.enabled:
+            return
+        h = self.phases.get(name)
+        if h is None:
+            h = self.phases[name] = Histogram()
+        h.observe(seconds)
+        rec = _TURN.get()
+        if rec is not None:
+            s = rec["spans"]
+            s[name] = s.get(name, 0.0) + seconds
+
+    def turn(self, turn: int, **labels):
+        """Groups the spans and counters of one turn into a record handed to the sinks."""
+        if not self.enabled:
+            return _NULL_SPAN
+        rec = {"turn": turn, "ts": time.time(), "spans": {}, "counters": {}}
+        if self.labels or labels:
+            rec["labels"] = {**self.labels, **labels}
+        return _Turn(self, rec)
+
+    def _end_turn(self, record: Dict, seconds: float):
+        self.turns.observe(seconds)
+        for sink in self.sinks:
+            sink.emit(record, self)
+
+    # --- export ---
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush(self)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close(self)
+
+    def snapshot(self) -> Dict:
+        return {
+            "turns": {"count": self.turns.count, "sum": self.turns.sum},
+            "phases": {k: {"count": h.count, "sum": h.sum} for k, h in self.phases.items()},
+            "counters": dict(self.counters),
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+NULL_METRICS = Metrics(enabled=False)
+_CURRENT = NULL_METRICS
+
+
+def current_metrics() -> Metrics:
+    """Registry used by the turn loops when none is passed explicitly (disabled by default)."""
+    return _CURRENT
+
+
+def configure(*sinks, labels: Optional[Dict[str, str]] = None) -> Metrics:
+    """Installs an enabled registry writing to `sinks`; no sinks restores NULL_METRICS."""
+    global _CURRENT
+    _CURRENT = Metrics(sinks, labels=labels) if sinks else NULL_METRICS
+    return _CURRENT
+
+
+# --- sinks ---
+class MemorySink:
+    """Keeps the last `max_records` turn records; percentiles for SLO checks."""
+
+    def __init__(self, max_records: int = 10_000):
+        self.records: Deque[Dict] = deque(maxlen=max_records)
+
+    def emit(self, record: Dict, metrics: Metrics):
+        self.records.append(record)
+
+    def flush(self, metrics: Metrics):
+        pass
+
+    def close(self, metrics: Metrics):
+        pass
+
+    def values(self, phase: Optional[str] = None) -> List[float]:
+        """Per-turn seconds of `phase` (whole turn when None), oldest first."""
+        if phase is None:
+            return [r["seconds"] for r in self.records]
+        return [r["spans"][phase] for r in self.records if phase in r["spans"]]
+
+    def percentile(self, q: float, phase: Optional[str] = None) -> float:
+        v = sorted(self.values(phase))
+        if not v:
+            return 0.0
+        return v[min(len(v) - 1, max(0, math.ceil(q / 100.0 * len(v)) - 1))]  # nearest rank
+
+
+class JsonlSink:
+    """One JSON line per turn, appended; buffered until flush() or close()."""
+
+    def __init__(self, path: str, flush_every: int = 1):
+        self.path = path
+        self.flush_every = max(1, flush_every)
+        self._fh = None
+        self._pending = 0
+
+    def emit(self, record: Dict, metrics: Metrics):
+        if self._fh is None:
+            self._fh = open(self.path, "a", encoding="utf-8")
+        self._fh.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush(metrics)
+
+    def flush(self, metrics: Metrics):
+        if self._fh is not None:
+            self._fh.flush()
+        self._pending = 0
+
+    def close(self, metrics: Metrics):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels.items()) + "}"
+
+
+def _histogram_lines(name: str, h: Histogram, labels: Dict[str, str]) -> List[str]:
+    out = []
+    for le, c in zip([*(f"{b:g}" for b in h.buckets), "+Inf"], h.cumulative()):
+        out.append(f"{name}_bucket{_labels({**labels, 'le': le})} {c}")
+    out.append(f"{name}_sum{_labels(labels)} {h.sum:.9g}")
+    out.append(f"{name}_count{_labels(labels)} {h.count}")
+    return out
+
+
+def prometheus_text(metrics: Metrics, prefix: str = "society") -> str:
+    """Registry totals in the Prometheus text exposition format."""
+    base = metrics.labels
+    lines = [f"# HELP {prefix}_turn_seconds Wall time of a whole turn.",
+             f"# TYPE {prefix}_turn_seconds histogram"]
+    lines += _histogram_lines(f"{prefix}_turn_seconds", metrics.turns, base)
+    lines += [f"# HELP {prefix}_turn_phase_seconds Wall time of one turn phase.",
+              f"# TYPE {prefix}_turn_phase_seconds histogram"]
+    for phase in sorted(metrics.phases):
+        lines += _histogram_lines(f"{prefix}_turn_phase_seconds", metrics.phases[phase], {**base, "phase": phase})
+    for name in sorted(metrics.counters):
+        metric = f"{prefix}_{name}_total"
+        lines += [f"# TYPE {metric} counter", f"{metric}{_labels(base)} {metrics.counters[name]:.9g}"]
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusSink:
+    """Rewrites a text-format file (node_exporter textfile collector) at most every `interval` s."""
+
+    def __init__(self, path: str, interval: float = 5.0, prefix: str = "society"):
+        self.path = path
+        self.interval = interval
+        self.prefix = prefix
+        self._written = float("-inf")
+
+    def emit(self, record: Dict, metrics: Metrics):
+        if time.monotonic() - self._written >= self.interval:
+            self.flush(metrics)
+
+    def flush(self, metrics: Metrics):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(prometheus_text(metrics, self.prefix))
+        os.replace(tmp, self.path)  # scrapers never see a half-written file
+        self._written = time.monotonic()
+
+    def close(self, metrics: Metrics):
+        self.flush(metrics)
+
+
+__all__ = [
+    "PHASES", "Histogram", "Metrics", "NULL_METRICS", "current_metrics", "configure",
+    "MemorySink", "JsonlSink", "PrometheusSink", "prometheus_text",
+]
@@ -0,0 +1,314 @@
+# optimizer.py
+# Worker allocation solver on the compiled (linear) production rules
+# - Objectives: food reaching the stock or net food (seasonal agriculture + king bonus included), weights on
+#   other flows, coverage targets for 🎭 📚 👩‍🍼
+# - Constraints: headcounts from Demographics, specialists and the king locked in place,
+#   per-activity moves capped at the inertia threshold (no cooldown penalty), frozen activities
+# - Greedy moves on marginal values, applied in runs while the marginal value holds: milliseconds
+# - Stored food is min(net, 🥫 capacity): when both bind, no single move helps, so bundles of
+#   two move types in the ratio that raises food and capacity together are scored instead
+# - Result checked against the engine itself (exact flows and coverages of the plan)
+
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from engine import (Assignments, InertiaTracker, NonStockActivity, Tribe, FOOD_ACTIVITIES,
+                    MAN, WOMAN, PREGNANT, BABY, CHILD, GRANDPA, GRANDMA, KING)
+
+# Workers with a headcount in Demographics; every other worker type is a specialist
+HEADCOUNT_FIELDS = {
+    MAN: "men", WOMAN: "women_active", PREGNANT: "women_pregnant", BABY: "babies",
+    CHILD: "children", GRANDPA: "grandpas", GRANDMA: "grandmas", KING: "king",
+}
+COVERAGE_ACTIVITIES = ("🎭", "📚", "👩‍🍼")
+IDLE = -1
+
+
+@dataclass
+class Objectives:
+    food: float = 1.0                                        # weight of one portion of food
+    food_mode: str = "stored"  # "stored": surplus counts up to the 🥫 capacity; "net": raw net food
+    weights: Dict[str, float] = field(default_factory=dict)  # extra weight per flow, e.g. {"🔧": 0.5}
+    coverage: Dict[str, float] = field(default_factory=dict) # activity -> minimum coverage %
+
+
+@dataclass
+class Constraints:
+    inertia: Optional[InertiaTracker] = None  # moves measured against its last assignments
+    max_moves_per_activity: Optional[int] = None  # default: inertia threshold (None: unbounded)
+    max_moves: Optional[int] = None
+    locked_workers: Optional[Set[str]] = None     # default: specialists and the king
+    frozen_activities: Set[str] = field(default_factory=set)
+    keep_coverage: bool = True                    # never lower a coverage below its current level
+
+
+@dataclass
+class Plan:
+    per_activity: Dict[str, Dict[str, int]]
+    moves: List[Dict]             # [{"activity", "worker", "delta"}] (fork.Option)
+    flows: Dict[str, int]
+    food: Dict[str, int]
+    coverage: Dict[str, Dict]
+    score: float
+
+
+def _moved(now: Dict[str, int], prev: Dict[str, int]) -> int:
+    return sum(abs(now.get(k, 0) - prev.get(k, 0)) for k in set(now) | set(prev))
+
+
+def optimize_assignments(tribe: Tribe, objectives: Optional[Objectives] = None,
+                         constraints: Optional[Constraints] = None) -> Plan:
+    """Best single-turn reallocation of the free workers under the constraints."""
+    obj = objectives or Objectives()
+    con = constraints or Constraints()
+    rs = tribe.ruleset
+    A, W = len(rs.activities), len(rs.workers)
+    counts = rs.counts(tribe.assign)
+
+    # Movable workers and their idle pool
+    locked = con.locked_workers
+    if locked is None:
+        locked = {w for w in rs.workers if w not in HEADCOUNT_FIELDS or w == KING}
+    free = [wid for wid, w in enumerate(rs.workers) if w in HEADCOUNT_FIELDS and w not in locked]
+    idle = [0] * W
+    for wid in free:
+        head = getattr(tribe.demo, HEADCOUNT_FIELDS[rs.workers[wid]])
+        idle[wid] = max(0, head - sum(counts[a][wid] for a in range(A)))
+    frozen = {rs.activity_id[a] for a in con.frozen_activities if a in rs.activity_id}
+
+    # Inertia budget per activity
+    cap_moves = con.max_moves_per_activity
+    last = None
+    if con.inertia is not None:
+        last = con.inertia.last_assignments
+        if cap_moves is None:
+            cap_moves = con.inertia.threshold
+    budget = [math.inf] * A
+    if cap_moves is not None:
+        for aid, act in enumerate(rs.activities):
+            used = _moved(tribe.assign.per_activity.get(act, {}), last.get(act, {})) if last is not None else 0
+            budget[aid] = max(0, cap_moves - used)
+    total_left = math.inf if con.max_moves is None else con.max_moves
+
+    # Per-worker contributions (linear model): food, storage capacity, weighted other flows
+    agri_factor, king_aid, king_factor = rs.multipliers(tribe.season, tribe.king_activity, tribe.king_bonus)
+    dfood = [[0.0] * W for _ in range(A)]
+    dcap = [[0.0] * W for _ in range(A)]
+    lin = [[0.0] * W for _ in range(A)]
+    for aid in rs.stockable:
+        act = rs.activities[aid]
+        mult = agri_factor if aid == rs.agri else 1.0
+        if aid == king_aid and counts[aid][rs.king] > 0:
+            mult *= king_factor
+        for wid, coef in rs.rows[aid]:
+            if aid == rs.store:
+                dcap[aid][wid] = coef
+            elif act in FOOD_ACTIVITIES:
+                dfood[aid][wid] = coef * mult
+            lin[aid][wid] = obj.weights.get(act, 0.0) * coef * mult
+    net = -tribe.population_total()
+    cap = 0.0
+    for aid in range(A):
+        for wid in range(W):
+            net += dfood[aid][wid] * counts[aid][wid]
+            cap += dcap[aid][wid] * counts[aid][wid]
+
+    def food_score(n: float, c: float) -> float:
+        return n if n < 0 or obj.food_mode == "net" else min(n, c)
+
+    def gain(wid: int, src: int, dst: int) -> float:
+        """Objective change of moving one `wid` worker from src to dst (IDLE allowed)."""
+        g, n, c = 0.0, net, cap
+        if src != IDLE:
+            g -= lin[src][wid]; n -= dfood[src][wid]; c -= dcap[src][wid]
+        if dst != IDLE:
+            g += lin[dst][wid]; n += dfood[dst][wid]; c += dcap[dst][wid]
+        return g + obj.food * (food_score(n, c) - food_score(net, cap))
+
+    # Coverage floors: explicit targets, else the current capacity (capped at needs)
+    nsa = NonStockActivity(tribe.demo, tribe.assign, rs, counts)
+    per_cap = {aid: dict(rows) for aid, rows in rs.capacity_rows.items()}
+    floor: Dict[int, float] = {}
+    cap_now: Dict[int, float] = {}
+    for act in COVERAGE_ACTIVITIES:
+        aid = rs.activity_id.get(act)
+        if aid is None or aid not in per_cap:
+            continue
+        _, needs, have = nsa.coverage(act)
+        cap_now[aid] = have
+        if act in obj.coverage:
+            floor[aid] = obj.coverage[act] / 100.0 * needs
+        elif con.keep_coverage:
+            floor[aid] = min(have, needs)
+
+    moves: Dict[Tuple[int, int], int] = {}
+
+    def can_take(src: int, wid: int) -> bool:
+        if src == IDLE:
+            return idle[wid] > 0
+        if src in frozen or budget[src] < 1 or counts[src][wid] <= 0:
+            return False
+        per = per_cap.get(src, {}).get(wid, 0)
+        return not (per and src in floor and cap_now[src] - per < floor[src] - 1e-9)
+
+    def move(wid: int, src: int, dst: int, k: int = 1):
+        nonlocal total_left, net, cap
+        net += k * (dfood[dst][wid] - (0.0 if src == IDLE else dfood[src][wid]))
+        cap += k * (dcap[dst][wid] - (0.0 if src == IDLE else dcap[src][wid]))
+        if src == IDLE:
+            idle[wid] -= k
+        else:
+            counts[src][wid] -= k
+            budget[src] -= k
+            moves[(src, wid)] = moves.get((src, wid), 0) - k
+            cap_now[src] = cap_now.get(src, 0) - k * per_cap.get(src, {}).get(wid, 0)
+        counts[dst][wid] += k
+        budget[dst] -= k
+        moves[(dst, wid)] = moves.get((dst, wid), 0) + k
+        cap_now[dst] = cap_now.get(dst, 0) + k * per_cap.get(dst, {}).get(wid, 0)
+        total_left -= k
+
+    def sources():
+        yield IDLE
+        yield from range(A)
+
+    # Phase 1: reach the coverage targets at the lowest opportunity cost per unit of capacity
+    for dst in sorted(floor):
+        while cap_now[dst] < floor[dst] - 1e-9 and budget[dst] >= 1 and total_left >= 1 and dst not in frozen:
+            best = None
+            for wid in free:
+                per = per_cap[dst].get(wid, 0)
+                if not per:
+                    continue
+                for src in sources():
+                    if src == dst or not can_take(src, wid):
+                        continue
+                    cost = -gain(wid, src, IDLE) / per
+                    if best is None or (cost, -per) < best[0]:
+                        best = ((cost, -per), wid, src)
+            if best is None:
+                break
+            move(best[1], best[2], dst)
+
+    # Phase 2: best positive move (or bundle of moves) until nothing improves.
+    # A bundle is ((wid, src, dst, k), ...); move types and their deltas are fixed by the linear rules.
+    types, delta = [], {}
+    for wid in free:
+        for src in sources():
+            if src in frozen:
+                continue
+            for dst in range(A):
+                if dst == src or dst in frozen:
+                    continue
+                dn = dfood[dst][wid] - (0.0 if src == IDLE else dfood[src][wid])
+                dc = dcap[dst][wid] - (0.0 if src == IDLE else dcap[src][wid])
+                dl = lin[dst][wid] - (0.0 if src == IDLE else lin[src][wid])
+                if dn or dc or dl:  # a move changing nothing never helps
+                    types.append((wid, src, dst))
+                    delta[(wid, src, dst)] = (dn, dc, dl)
+
+    def open_type(t) -> bool:
+        wid, src, dst = t
+        return budget[dst] >= 1 and can_take(src, wid)
+
+    def bundle_gain(bundle, m: int = 1) -> float:
+        dn = dc = dl = 0.0
+        for wid, src, dst, k in bundle:
+            n_, c_, l_ = delta[(wid, src, dst)]
+            dn += m * k * n_; dc += m * k * c_; dl += m * k * l_
+        return dl + obj.food * (food_score(net + dn, cap + dc) - food_score(net, cap))
+
+    def room(bundle) -> float:
+        """How many times `bundle` fits the pools, budgets, coverage floors and move cap."""
+        pools: Dict[Tuple[int, int], int] = {}
+        use: Dict[int, int] = {}
+        cov: Dict[int, float] = {}
+        units = 0
+        for wid, src, dst, k in bundle:
+            pools[(src, wid)] = pools.get((src, wid), 0) + k
+            for a, sign in ((src, -1), (dst, 1)):
+                if a != IDLE:
+                    use[a] = use.get(a, 0) + k
+                    cov[a] = cov.get(a, 0.0) + sign * k * per_cap.get(a, {}).get(wid, 0)
+            units += k
+        m = total_left if total_left == math.inf else total_left // units  # inf // k is nan
+        for (src, wid), k in pools.items():
+            m = min(m, (idle[wid] if src == IDLE else counts[src][wid]) // k)
+        for a, k in use.items():
+            if budget[a] != math.inf:
+                m = min(m, budget[a] // k)
+        for a, d in cov.items():
+            if d < 0 and a in floor:
+                m = min(m, math.floor((cap_now[a] - floor[a] + 1e-9) / -d))
+        return m
+
+    def longest_run(bundle, per_move: float, limit: float) -> int:
+        """Largest m <= limit keeping the first bundle's gain for every repeat (gain is concave in m)."""
+        lo, hi = 1, int(min(limit, total_units))
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if bundle_gain(bundle, mid) >= mid * per_move - 1e-9:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    total_units = sum(idle) + sum(map(sum, counts))
+    while total_left >= 1:
+        best = None
+        feasible = [t for t in types if open_type(t)]
+        base = food_score(net, cap)
+        for t in feasible:
+            dn, dc, dl = delta[t]
+            g = dl + obj.food * (food_score(net + dn, cap + dc) - base)
+            if g > 1e-9 and (best is None or g > best[0]):
+                best = (g, ((*t, 1),))
+        if best is None and obj.food > 0 and obj.food_mode != "net" and net >= 0:
+            # Food and capacity both binding: pair a food-raising type with a capacity-raising one
+            food_up = sorted((t for t in feasible if delta[t][0] > delta[t][1]),
+                             key=lambda t: -(delta[t][0] + delta[t][1] + delta[t][2] / obj.food))[:8]
+            cap_up = sorted((t for t in feasible if delta[t][1] > delta[t][0]),
+                            key=lambda t: -(delta[t][0] + delta[t][1] + delta[t][2] / obj.food))[:8]
+            for p in food_up:
+                a = delta[p][0] - delta[p][1]
+                for q in cap_up:
+                    r = (delta[q][1] - delta[q][0]) / a  # units of p per unit of q for equal gains
+                    ratios = {(math.ceil(r), 1), (max(1, math.floor(r)), 1)} if r >= 1 else \
+                             {(1, math.ceil(1 / r)), (1, max(1, math.floor(1 / r)))}
+                    for kp, kq in ratios:
+                        bundle = ((*p, kp), (*q, kq))
+                        g = bundle_gain(bundle) / (kp + kq)
+                        if g > 1e-9 and (best is None or g > best[0]) and room(bundle) >= 1:
+                            best = (g, bundle)
+        if best is None:
+            break
+        per_unit, bundle = best
+        units = sum(k for *_, k in bundle)
+        m = longest_run(bundle, per_unit * units, room(bundle))
+        for wid, src, dst, k in bundle:
+            move(wid, src, dst, k * m)
+
+    # Plan and its exact outcome under the engine rules
+    per_activity = {a: dict(m) for a, m in tribe.assign.per_activity.items()}
+    out_moves = []
+    for (aid, wid), d in sorted(moves.items()):
+        if d:
+            act, w = rs.activities[aid], rs.workers[wid]
+            n = per_activity.setdefault(act, {}).get(w, 0) + d
+            if n:
+                per_activity[act][w] = n
+            else:
+                per_activity[act].pop(w, None)
+            out_moves.append({"activity": act, "worker": w, "delta": d})
+    trial = tribe.fork()
+    trial.assign = Assignments(per_activity)
+    trial_counts = rs.counts(trial.assign)
+    trial.res.flows = trial.compute_stockable_flows(trial_counts)
+    food = trial.compute_food_and_storage(trial_counts)
+    coverage = trial.non_stock_coverages(trial_counts)
+    score = obj.food * food_score(food["net"], food["capacity"]) + sum(w * trial.res.flows.get(a, 0) for a, w in obj.weights.items())
+    return Plan(per_activity, out_moves, dict(trial.res.flows), food, coverage, score)
+
+
+__all__ = ["Objectives", "Constraints", "Plan", "optimize_assignments"]
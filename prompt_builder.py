@@ -0,0 +1,178 @@
+# prompt_builder.py
+# Token-budgeted advisor prompt
+# - build_advisor_prompt.md loaded once, reloaded only when its mtime/size change
+# - Static template first so provider-side prompt caching can reuse the prefix
+# - Full state on every turn, minified: advisor calls are stateless chat completions, so the
+#   model never sees the previous prompt; a [CHANGEMENTS] block lists what changed since the
+#   state actually sent last time
+# - Hard token budget: history trimmed first (oldest lines), then the changes, then the state
+
+import hashlib
+import json
+import math
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+class PromptTemplate:
+    """Static prompt text cached in memory, keyed on the file's mtime and size."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._stamp: Tuple[int, int] = (-1, -1)
+        self._text = ""
+        self._digest = ""
+        self._tokens = -1
+        self.loads = 0
+
+    @property
+    def stamp(self) -> Tuple[int, int]:
+        st = self.path.stat()
+        return (st.st_mtime_ns, st.st_size)
+
+    @property
+    def text(self) -> str:
+        stamp = self.stamp
+        if stamp != self._stamp:
+            self._text = self.path.read_text(encoding="utf-8")
+            self._digest = hashlib.sha256(self._text.encode("utf-8")).hexdigest()
+            self._tokens = -1
+            self._stamp = stamp
+            self.loads += 1
+        return self._text
+
+    @property
+    def digest(self) -> str:
+        """sha256 of the current text (part of the advisor cache key)."""
+        self.text
+        return self._digest
+
+    @property
+    def tokens(self) -> int:
+        self.text
+        if self._tokens < 0:
+            self._tokens = count_tokens(self._text + "\n")
+        return self._tokens
+
+
+_TEMPLATES: Dict[str, PromptTemplate] = {}
+
+def load_template(path: str = "build_advisor_prompt.md") -> PromptTemplate:
+    """Shared PromptTemplate for `path` (one per process)."""
+    t = _TEMPLATES.get(path)
+    if t is None:
+        t = _TEMPLATES[path] = PromptTemplate(path)
+    return t
+
+
+_ENCODING = None
+
+def count_tokens(text: str) -> int:
+    """Exact with tiktoken when installed, otherwise ~4 UTF-8 bytes per token."""
+    global _ENCODING
+    if _ENCODING is None:
+        try:
+            import tiktoken
+            _ENCODING = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _ENCODING = False
+    if _ENCODING:
+        return len(_ENCODING.encode(text))
+    return math.ceil(len(text.encode("utf-8")) / 4)
+
+
+def minify(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+_MISSING = object()
+
+def state_delta(prev: Optional[Dict], cur: Dict) -> Dict:
+    """Nested dict of the leaves of `cur` that differ from `prev`; removed keys map to None."""
+    if prev is None:
+        return cur
+    out = {}
+    for k, v in cur.items():
+        p = prev.get(k, _MISSING)
+        if isinstance(v, dict) and isinstance(p, dict):
+            sub = state_delta(p, v)
+            if sub:
+                out[k] = sub
+        elif p is _MISSING or p != v:
+            out[k] = v
+    for k in prev:
+        if k not in cur:
+            out[k] = None
+    return out
+
+
+def _snapshot(obj):
+    # Reports hold live dicts (stocks, flows) that the engine keeps mutating
+    return json.loads(json.dumps(obj, ensure_ascii=False))
+
+
+class PromptBuilder:
+    def __init__(self, template_path: str = "build_advisor_prompt.md", token_budget: int = 3000):
+        self.template = load_template(template_path)
+        self.token_budget = token_budget
+        self._last_state: Optional[Dict] = None
+
+    def reset(self):
+        """Forget the state sent last: the next prompt lists no changes."""
+        self._last_state = None
+
+    def build(self, report: Dict, compact_block: str, history_text: str,
+              events: List[str], last_actions: str) -> str:
+        prefix = self.template.text + "\n"
+        state = _snapshot(report)
+        changes = state_delta(self._last_state, state) if self._last_state is not None else None
+
+        head = [
+            "# CONTEXTE ACTUEL",
+            "[COMPACT]", compact_block,
+            "[STATE]", minify(state),
+            "[ÉVÉNEMENTS]", "\n".join(events) if events else "(aucun)",
+            "[DERNIÈRES_ACTIONS_DU_JOUEUR]", last_actions or "(N/A)",
+        ]
+        if changes is not None:
+            head[5:5] = ["[CHANGEMENTS]", minify(changes) if changes else "(aucun)"]
+        history = [l for l in (history_text or "").splitlines() if l.strip()]
+
+        budget = self.token_budget - self.template.tokens
+        if budget <= 0:
+            raise ValueError(f"token budget {self.token_budget} smaller than the static prompt")
+        # Trim history first, oldest lines out
+        while True:
+            body = "\n".join(head + ["[HISTORIQUE_RÉCENT]"] + (history or ["(vide)"]))
+            if count_tokens(body) <= budget or not history:
+                break
+            history = history[max(1, len(history) // 8):]
+        if count_tokens(body) > budget and changes is not None:
+            # Then the changes: the state block already holds the current values
+            del head[5:7]
+            body = "\n".join(head + ["[HISTORIQUE_RÉCENT]", "(vide)"])
+        if count_tokens(body) > budget:
+            # Then the state block; the compact view still carries the essentials
+            state = {k: v for k, v in state.items() if k in ("season", "population_total", "food_report")}
+            head[4] = minify(state)
+            body = "\n".join(head + ["[HISTORIQUE_RÉCENT]", "(vide)"])
+        if count_tokens(body) > budget:
+            body = _truncate_to(body, budget)
+            state = None  # cut somewhere: the next prompt lists no changes
+        # Changes are computed against what the model was actually given
+        self._last_state = state
+        return prefix + body
+
+
+def _truncate_to(text: str, budget: int) -> str:
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:mid]) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo]
+
+
+__all__ = ["PromptTemplate", "PromptBuilder", "load_template", "count_tokens", "state_delta", "minify"]
@@ -0,0 +1,543 @@
+# server.py
+# Local asyncio game server hosting many independent campaigns (HTTP/JSON over http_util)
+# - One Campaign per player: its own Tribe/InertiaTracker/EventEngine, history buffer,
+#   turn journal and snapshot under <data_dir>/<id>/; reloaded from disk after a restart
+# - Engine steps (engine, inertia, events, render, prompt) run on a shared worker pool:
+#   threads by default, processes with snapshot round trips (--processes)
+# - Advisor calls go through one bounded queue served by a fixed set of workers:
+#   a full queue rejects the turn with 429 + Retry-After before any state changes,
+#   a job waiting past its deadline gets the canned advice, so a slow LLM call only
+#   ever holds one worker and never stalls other sessions
+# - Canned/timeout advice is replaced by local_advisor's rule-based reading of the turn
+# - Open journals kept in an LRU (file descriptors stay bounded with thousands of campaigns)
+#
+# Routes:
+#   POST   /campaigns                    {"id"?, "seed"?} -> 201 {"id", "turn"}
+#   GET    /campaigns/<id>               current state
+#   POST   /campaigns/<id>/turn          {"orders"?, "moves"?: [{"activity","worker","delta"}]}
+#   GET    /campaigns/<id>/history/<n>   journal record of turn n
+#   DELETE /campaigns/<id>               unload (files stay on disk)
+#   GET    /health                       campaigns, queue depth, advisor stats
+
+import argparse
+import asyncio
+import contextvars
+import functools
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from engine import (
+    Tribe, InertiaTracker, EventEngine, LLM_FALLBACK_ADVICE, LLM_FALLBACK_PREFIX, COUNT_MAX, normalize_activity, normalize_worker, render_compact, step_turn,
+)
+from engine_integration import HistoryBuffer, build_advisor_prompt
+from campaign import CampaignConfig, default_campaign, season_for_turn, _game_config
+from journal import TurnJournal
+from snapshot import dumps_game, loads_game
+from http_util import HTTPError, read_request, write_json
+from metrics import current_metrics
+from local_advisor import local_advice, _reason
+
+CAMPAIGN_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+STATE_FILE = "state.snap"
+JOURNAL_FILE = "history.jsonl"
+
+
+class Busy(Exception):
+    """Advisor queue full: the client should retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"advisor queue full, retry in {retry_after:g}s")
+
+
+# --- advisor queue ---
+@dataclass
+class _Job:
+    prompt: str
+    deadline: float
+    future: asyncio.Future
+
+
+class AdvisorQueue:
+    """Bounded queue in front of `advise(prompt) -> str`, served by `workers` tasks.
+
+    reserve() takes a slot without waiting (Busy when none is left); submit() then never blocks.
+    """
+
+    def __init__(self, advise: Callable[[str], Awaitable[str]], maxsize: int = 256, workers: int = 16,
+                 deadline: float = 30.0):
+        self.advise = advise
+        self.maxsize = maxsize
+        self.workers = workers
+        self.deadline = deadline
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self.reserved = 0
+        self.served = 0
+        self.expired = 0
+        self.rejected = 0
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def retry_after(self) -> float:
+        # Rough drain time of the backlog ahead of a new job
+        return max(1.0, round(self.depth / max(1, self.workers), 1))
+
+    def reserve(self):
+        if self.reserved >= self.maxsize:
+            self.rejected += 1
+            raise Busy(self.retry_after())
+        self.reserved += 1
+
+    def release(self):
+        self.reserved -= 1
+
+    def submit(self, prompt: str) -> "asyncio.Future[str]":
+        """Queues a job on a reserved slot; the slot is released when the job finishes."""
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_Job(prompt, time.monotonic() + self.deadline, fut))
+        return fut
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                left = job.deadline - time.monotonic()
+                if left <= 0:
+                    self.expired += 1
+                    text = f"{LLM_FALLBACK_PREFIX} advisor queue timeout\n" + LLM_FALLBACK_ADVICE
+                else:
+                    text = await asyncio.wait_for(self.advise(job.prompt), left)
+                    self.served += 1
+            except asyncio.TimeoutError:
+                self.expired += 1
+                text = f"{LLM_FALLBACK_PREFIX} timeout\n" + LLM_FALLBACK_ADVICE
+            except asyncio.CancelledError:
+                job.future.cancel()
+                self.release()
+                raise
+            except Exception as e:
+                text = f"{LLM_FALLBACK_PREFIX} {e}\n" + LLM_FALLBACK_ADVICE
+            self.release()
+            if not job.future.done():
+                job.future.set_result(text)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {"depth": self.depth, "reserved": self.reserved, "maxsize": self.maxsize,
+                "served": self.served, "expired": self.expired, "rejected": self.rejected}
+
+
+# --- campaigns ---
+@dataclass
+class Campaign:
+    id: str
+    directory: str
+    tribe: Tribe
+    inertia: InertiaTracker
+    events: EventEngine
+    turn: int = 0
+    history: HistoryBuffer = field(default_factory=HistoryBuffer)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    def state(self) -> Dict:
+        return {
+            "id": self.id, "turn": self.turn, "season": self.tribe.season,
+            "stocks": dict(self.tribe.res.stocks), "assignments": {a: dict(ws) for a, ws in self.tribe.assign.per_activity.items()},
+            "demo": asdict(self.tribe.demo),
+        }
+
+
+def check_moves(moves) -> List[Dict]:
+    """Moves checked for shape (same delta shape as fork.Option); check_counts checks the counts they reach."""
+    if not isinstance(moves, list):
+        raise ValueError("moves: expected a list")
+    out = []
+    for m in moves:
+        if not isinstance(m, dict):
+            raise ValueError("moves: expected {activity, worker, delta} objects")
+        out.append({"activity": normalize_activity(m["activity"]), "worker": normalize_worker(m["worker"]),
+                    "delta": int(m["delta"])})
+    return out
+
+
+def check_counts(tribe: Tribe, moves: List[Dict]):
+    """ValueError, before anything changes, if applying `moves` in order takes a count outside 0..COUNT_MAX."""
+    counts = {}
+    for m in moves:
+        key = (m["activity"], m["worker"])
+        n = counts.get(key, tribe.assign.count(*key)) + m["delta"]
+        if not 0 <= n <= COUNT_MAX:
+            raise ValueError(f"moves: {key[0]} {key[1]} would be {n}, outside 0..{COUNT_MAX}")
+        counts[key] = n
+
+
+def _apply_moves(tribe: Tribe, moves: List[Dict]):
+    for move in moves:
+        tribe.assign.add(move["activity"], move["worker"], move["delta"])
+
+
+def _prompt(report: Dict, compact: str, history: str, events: List[str], orders: str) -> str:
+    return build_advisor_prompt(report_json=report, compact_block=compact, history_text=history,
+                                events=events, last_actions=orders)
+
+
+def _step(c: Campaign, season: str, moves: List[Dict], orders: str, metrics):
+    """Engine part of a turn, on a pool thread: (report, events, compact, prompt)."""
+    c.tribe.season = season
+    _apply_moves(c.tribe, moves)
+    report, events = step_turn(c.tribe, c.inertia, c.events, metrics)
+    with metrics.span("render"):
+        compact = render_compact(report, c.tribe.assign, c.tribe.demo)
+    with metrics.span("prompt"):
+        prompt = _prompt(report, compact, c.history.recent_text(), events, orders)
+    return report, events, compact, prompt
+
+
+def _remote_step(data: bytes, config_path: Optional[str], season: str, moves: List[Dict],
+                 orders: str, history: str):
+    """_step in a worker process: the campaign travels as a snapshot both ways."""
+    game = _game_config(config_path)
+    specs, rules = (game.specs_by_season, game.ruleset) if game else ({}, None)
+    s = loads_game(data, specs, rules)
+    s.tribe.season = season
+    _apply_moves(s.tribe, moves)
+    report, events = step_turn(s.tribe, s.inertia, s.events)
+    compact = render_compact(report, s.tribe.assign, s.tribe.demo)
+    prompt = _prompt(report, compact, history, events, orders)
+    return dumps_game(s.tribe, s.inertia, s.events, s.turn), report, events, compact, prompt
+
+
+class GameServer:
+    def __init__(self, data_dir: str = "campaigns", advise: Optional[Callable[[str], Awaitable[str]]] = None,
+                 template: Optional[CampaignConfig] = None, workers: Optional[int] = None,
+                 processes: bool = False, advisor_queue: int = 256, advisor_workers: int = 16,
+                 advisor_deadline: float = 30.0, max_open_journals: int = 256, metrics=None,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.data_dir = data_dir
+        self.template = template or default_campaign()
+        self.workers = workers or os.cpu_count() or 4
+        self.processes = processes
+        self.advisor = AdvisorQueue(advise or _canned_advice, advisor_queue, advisor_workers, advisor_deadline)
+        self.max_open_journals = max_open_journals
+        self.metrics = metrics if metrics is not None else current_metrics()
+        self.host = host
+        self.port = port
+        self.campaigns: Dict[str, Campaign] = {}
+        self._journals: "OrderedDict[str, TurnJournal]" = OrderedDict()
+        self._pool = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    # --- lifecycle ---
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        if self.processes:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # spawn: forked workers would inherit the open client sockets and hold them open
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="engine")
+        self.advisor.start()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.advisor.stop()
+        for j in self._journals.values():
+            j.close()
+        self._journals.clear()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    # --- campaigns ---
+    def _dir(self, cid: str) -> str:
+        return os.path.join(self.data_dir, cid)
+
+    def _journal(self, c: Campaign) -> TurnJournal:
+        j = self._journals.get(c.id)
+        if j is None:
+            j = self._journals[c.id] = TurnJournal(os.path.join(c.directory, JOURNAL_FILE), fsync="flush")
+            # Oldest first, never one whose campaign is mid-turn (its persist may be running)
+            for cid in list(self._journals):
+                if len(self._journals) <= self.max_open_journals:
+                    break
+                other = self.campaigns.get(cid)
+                if cid != c.id and (other is None or not other.lock.locked()):
+                    self._journals.pop(cid).close()
+        self._journals.move_to_end(c.id)
+        return j
+
+    def _rules(self):
+        game = _game_config(self.template.config_path)
+        return (game.specs_by_season, game.ruleset) if game else ({}, None)
+
+    def create(self, cid: Optional[str] = None, seed: Optional[int] = None) -> Campaign:
+        cid = cid or uuid.uuid4().hex[:12]
+        if not CAMPAIGN_ID.match(cid):
+            raise ValueError(f"invalid campaign id {cid!r}")
+        if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool)):
+            raise ValueError(f"seed: expected an integer, got {seed!r}")
+        if cid in self.campaigns or os.path.exists(self._dir(cid)):
+            raise ValueError(f"campaign {cid!r} already exists")
+        tribe, inertia, events = self.template.build(seed if seed is not None else uuid.uuid4().int & 0xFFFFFFFF)
+        c = Campaign(cid, self._dir(cid), tribe, inertia, events)
+        os.makedirs(c.directory)
+        self._save(c)
+        self.campaigns[cid] = c
+        return c
+
+    def get(self, cid: str) -> Optional[Campaign]:
+        """Loaded campaign, or reloaded from its snapshot and journal after a restart."""
+        c = self.campaigns.get(cid)
+        if c is not None or not CAMPAIGN_ID.match(cid):
+            return c
+        if not os.path.exists(os.path.join(self._dir(cid), STATE_FILE)):
+            return None
+        s = self._load(self._dir(cid))
+        c = Campaign(cid, self._dir(cid), s.tribe, s.inertia, s.events, s.turn)
+        j = self._journal(c)
+        for turn in j.turns[-c.history.max_lines:]:
+            rec = j.read(turn)
+            c.history.add_turn(turn, rec["report"], rec["events"], rec["advisor"])
+        self.campaigns[cid] = c
+        return c
+
+    def unload(self, cid: str) -> bool:
+        j = self._journals.pop(cid, None)
+        if j is not None:
+            j.close()
+        return self.campaigns.pop(cid, None) is not None
+
+    def _load(self, directory: str):
+        with open(os.path.join(directory, STATE_FILE), "rb") as fh:
+            return loads_game(fh.read(), *self._rules())
+
+    def _save(self, c: Campaign, turn: Optional[int] = None):
+        path = os.path.join(c.directory, STATE_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(dumps_game(c.tribe, c.inertia, c.events, c.turn if turn is None else turn))
+        os.replace(tmp, path)
+
+    def _persist(self, c: Campaign, j: TurnJournal, turn: int, report: Dict, compact: str, advisor: str,
+                 orders: str, events: List[str]):
+        # Snapshot first: it is the campaign's state, the journal only its record. A failed
+        # journal write leaves a gap in the history, never a turn the journal already holds.
+        self._save(c, turn)
+        j.append(turn, report, compact, advisor, orders, events)
+        j.flush()
+
+    def _restore(self, c: Campaign):
+        """After a failed turn: memory back to the state on disk, journal reopened (recovered)."""
+        j = self._journals.pop(c.id, None)
+        if j is not None:
+            try:
+                j.close()
+            except Exception:
+                pass  # reopening truncates what did not make it to disk
+        s = self._load(c.directory)
+        c.tribe, c.inertia, c.events, c.turn = s.tribe, s.inertia, s.events, s.turn
+
+    async def _run_step(self, c: Campaign, season: str, moves: List[Dict], orders: str):
+        loop = asyncio.get_running_loop()
+        if not self.processes:
+            # copy_context: the pool thread's spans land in this turn's metrics record
+            call = functools.partial(contextvars.copy_context().run, _step, c, season, moves, orders, self.metrics)
+            return await loop.run_in_executor(self._pool, call)
+        data = dumps_game(c.tribe, c.inertia, c.events, c.turn)
+        with self.metrics.span("engine"):
+            data, report, events, compact, prompt = await loop.run_in_executor(
+                self._pool, _remote_step, data, self.template.config_path, season, moves, orders,
+                c.history.recent_text())
+        s = loads_game(data, *self._rules())
+        c.tribe, c.inertia, c.events = s.tribe, s.inertia, s.events
+        return report, events, compact, prompt
+
+    async def play_turn(self, c: Campaign, orders: str = "", moves: Optional[List[Dict]] = None) -> Dict:
+        """One full turn; raises Busy (nothing changed) when the advisor queue is full."""
+        moves = check_moves(moves or [])
+        self.advisor.reserve()
+        submitted = False
+        try:
+            async with c.lock:
+                check_counts(c.tribe, moves)
+                turn = c.turn + 1
+                with self.metrics.turn(turn, campaign=c.id):
+                    try:
+                        report, events, compact, prompt = await self._run_step(
+                            c, season_for_turn(self.template.season, turn), moves, orders)
+                        self.metrics.incr("prompt_chars", len(prompt))
+                        with self.metrics.span("llm"):
+                            pending = self.advisor.submit(prompt)
+                            submitted = True
+                            advisor = await pending
+                        if advisor.startswith(LLM_FALLBACK_PREFIX):
+                            self.metrics.incr("llm_fallbacks")
+                            advisor = local_advice(report, c.tribe.assign, events, c.inertia, _reason(advisor),
+                                                   c.tribe.ruleset).text
+                        with self.metrics.span("history"):
+                            await asyncio.to_thread(self._persist, c, self._journal(c), turn, report, compact, advisor, orders, events)
+                    except Exception:
+                        # Step, advisor or write failed: memory back to the last saved turn
+                        self._restore(c)
+                        raise
+                    c.turn = turn
+                    c.history.add_turn(turn, report, events, advisor)
+        finally:
+            if not submitted:
+                self.advisor.release()
+        return {"id": c.id, "turn": turn, "season": c.tribe.season, "report": report,
+                "compact": compact, "events": events, "advisor": advisor}
+
+    # --- HTTP ---
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    req = await read_request(reader)
+                except HTTPError as e:
+                    await write_json(writer, e.status, {"error": str(e)}, {"Connection": "close"})
+                    break
+                if req is None:
+                    break
+                status, body, headers = await self._route(req)
+                await write_json(writer, status, body, headers)
+                if not req.keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass  # client gone or server shutting down
+        finally:
+            writer.close()
+
+    async def _route(self, req):
+        parts = [p for p in req.path.split("?", 1)[0].split("/") if p]
+        try:
+            if parts == ["health"] and req.method == "GET":
+                return 200, {"campaigns": len(self.campaigns), "open_journals": len(self._journals),
+                             "advisor": self.advisor.stats}, None
+            if parts == ["campaigns"] and req.method == "POST":
+                body = req.json()
+                c = self.create(body.get("id"), body.get("seed"))
+                return 201, {"id": c.id, "turn": c.turn}, None
+            if len(parts) < 2 or parts[0] != "campaigns":
+                return 404, {"error": "not found"}, None
+            c = self.get(parts[1])
+            if c is None:
+                return 404, {"error": f"unknown campaign {parts[1]!r}"}, None
+            rest = parts[2:]
+            if not rest and req.method == "GET":
+                return 200, c.state(), None
+            if not rest and req.method == "DELETE":
+                self.unload(c.id)
+                return 200, {"id": c.id, "unloaded": True}, None
+            if rest == ["turn"] and req.method == "POST":
+                body = req.json()
+                return 200, await self.play_turn(c, str(body.get("orders", "")), body.get("moves") or []), None
+            if len(rest) == 2 and rest[0] == "history" and req.method == "GET":
+                try:
+                    async with c.lock:  # a turn may be appending to the journal
+                        return 200, self._journal(c).read(int(rest[1])), None
+                except (KeyError, ValueError):
+                    return 404, {"error": f"no turn {rest[1]!r}"}, None
+            return 405, {"error": f"{req.method} not allowed here"}, None
+        except Busy as e:
+            return 429, {"error": str(e)}, {"Retry-After": str(int(e.retry_after + 0.999))}
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {"error": str(e)}, None
+        except Exception as e:  # engine pool failure: answer instead of dropping the connection
+            return 500, {"error": f"{type(e).__name__}: {e}"}, None
+
+
+async def _canned_advice(prompt: str) -> str:
+    return f"{LLM_FALLBACK_PREFIX} no advisor configured\n" + LLM_FALLBACK_ADVICE
+
+
+async def _serve(args):
+    from advisor import AsyncAdvisor
+    stub = None
+    if args.stub:
+        from llm_stub import StubLLMServer
+        stub = await StubLLMServer(latency=args.stub_latency).start()
+    llm = AsyncAdvisor(model=args.model, base_url=stub.base_url if stub else args.base_url,
+                       api_key="stub" if stub else None, max_concurrency=args.advisor_workers,
+                       timeout=args.advisor_deadline)
+    advise = llm.advise
+    if args.rpm or args.tpm:
+        from llm_scheduler import LLMScheduler
+        advise = LLMScheduler(llm.complete, rpm=args.rpm, tpm=args.tpm, max_tokens=llm.max_tokens,
+                              max_in_flight=args.advisor_workers).advise
+    server = GameServer(args.data_dir, advise, default_campaign(args.config), args.workers, args.processes,
+                        args.advisor_queue, args.advisor_workers, args.advisor_deadline, host=args.host, port=args.port)
+    async with server:
+        print(f"society server on {server.base_url} (data: {args.data_dir})")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await llm.aclose()
+            if stub is not None:
+                await stub.stop()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Multi-campaign game server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--data-dir", default="campaigns")
+    ap.add_argument("--config", default="config.yaml" if os.path.exists("config.yaml") else None)
+    ap.add_argument("--workers", type=int, default=None, help="engine pool size (default: CPU count)")
+    ap.add_argument("--processes", action="store_true", help="engine steps in worker processes")
+    ap.add_argument("--advisor-queue", type=int, default=256, help="max advisor jobs queued or running")
+    ap.add_argument("--advisor-workers", type=int, default=16, help="concurrent LLM calls")
+    ap.add_argument("--advisor-deadline", type=float, default=30.0, help="seconds before local advice")
+    ap.add_argument("--rpm", type=float, default=None, help="provider requests/min (llm_scheduler)")
+    ap.add_argument("--tpm", type=float, default=None, help="provider tokens/min (llm_scheduler)")
+    ap.add_argument("--base-url", default=None, help="chat-completions endpoint")
+    ap.add_argument("--model", default="gpt-4o-mini")
+    ap.add_argument("--stub", action="store_true", help="answer with the in-process llm_stub")
+    ap.add_argument("--stub-latency", type=float, default=0.5)
+    args = ap.parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
+
+
+__all__ = ["AdvisorQueue", "Busy", "Campaign", "GameServer", "check_counts", "check_moves", "default_campaign"]
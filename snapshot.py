@@ -0,0 +1,375 @@
+# snapshot.py
+# Versioned save/load (:save / :load)
+# - Compact binary container: header + named typed blocks (little-endian)
+# - Worker/activity/stock names stored once in an id table, referenced as u16 ids
+# - Exact restore of EventEngine.rng state and event schedule, InertiaTracker cooldowns, active effects
+# - Migration hooks from older snapshot versions
+# - TribeBatch arrays written/read as raw buffers (no per-tribe work), with the InertiaBatch
+#   and EventBatch state (last assignments, cooldowns, RNG and skip-ahead counters)
+
+import array
+import json
+import struct
+import sys
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from engine import (
+    Demographics, Assignments, Resources, Tribe, InertiaTracker, EventEngine, EventSpec, Ruleset, compile_effect,
+)
+
+MAGIC = b"SOCY"
+SNAPSHOT_VERSION = 1
+KIND_GAME = 1
+KIND_BATCH = 2
+HEADER = struct.Struct("<4sHHI")          # magic, version, kind, block count
+NONE_ID = 0xFFFF
+DEMO_FIELDS = ("men", "women_active", "women_pregnant", "babies", "children", "grandpas", "grandmas", "king")
+
+# version -> function(blocks) -> blocks of version + 1
+MIGRATIONS: Dict[int, Callable[[Dict], Dict]] = {}
+
+def migration(from_version: int):
+    """Registers the upgrade of decoded blocks from `from_version` to `from_version + 1`."""
+    def deco(fn):
+        MIGRATIONS[from_version] = fn
+        return fn
+    return deco
+
+
+# --- container ---
+class _Writer:
+    def __init__(self):
+        self.parts: List = []
+        self.count = 0
+
+    def block(self, name: str, code: str, shape: Tuple[int, ...], payload):
+        n = name.encode("utf-8")
+        c = code.encode("ascii")
+        payload = memoryview(payload).cast("B")
+        self.parts.append(
+            struct.pack(f"<B{len(n)}sB{len(c)}sB{len(shape)}QQ", len(n), n, len(c), c, len(shape), *shape, payload.nbytes)
+        )
+        self.parts.append(payload)
+        self.count += 1
+
+    def array(self, name: str, code: str, values):
+        a = values if isinstance(values, array.array) else array.array(code, values)
+        if sys.byteorder == "big":
+            a = array.array(code, a)
+            a.byteswap()
+        self.block(name, code, (len(a),), a)
+
+    def strings(self, name: str, values: List[str]):
+        self.block(name, "s", (len(values),), "\0".join(values).encode("utf-8"))
+
+    def dump(self, kind: int) -> List:
+        return [HEADER.pack(MAGIC, SNAPSHOT_VERSION, kind, self.count)] + self.parts
+
+
+def _read_blocks(buf) -> Tuple[int, int, Dict[str, Tuple[str, Tuple[int, ...], memoryview]]]:
+    mv = memoryview(buf)
+    magic, version, kind, count = HEADER.unpack_from(mv, 0)
+    if magic != MAGIC:
+        raise ValueError("not a society snapshot")
+    pos = HEADER.size
+    blocks = {}
+    for _ in range(count):
+        ln = mv[pos]; pos += 1
+        name = bytes(mv[pos:pos + ln]).decode("utf-8"); pos += ln
+        lc = mv[pos]; pos += 1
+        code = bytes(mv[pos:pos + lc]).decode("ascii"); pos += lc
+        nd = mv[pos]; pos += 1
+        shape = struct.unpack_from(f"<{nd}Q", mv, pos); pos += 8 * nd
+        (nbytes,) = struct.unpack_from("<Q", mv, pos); pos += 8
+        blocks[name] = (code, shape, mv[pos:pos + nbytes])
+        pos += nbytes
+    return version, kind, blocks
+
+
+def _array(blocks, name: str) -> array.array:
+    code, _, payload = blocks[name]
+    a = array.array(code)
+    a.frombytes(payload)
+    if sys.byteorder == "big":
+        a.byteswap()
+    return a
+
+
+def _strings(blocks, name: str) -> List[str]:
+    _, shape, payload = blocks[name]
+    return bytes(payload).decode("utf-8").split("\0") if shape[0] else []
+
+
+def _migrate(version: int, blocks: Dict) -> Dict:
+    if version > SNAPSHOT_VERSION:
+        raise ValueError(f"snapshot version {version} is newer than supported ({SNAPSHOT_VERSION})")
+    while version < SNAPSHOT_VERSION:
+        if version not in MIGRATIONS:
+            raise ValueError(f"no migration from snapshot version {version}")
+        blocks = MIGRATIONS[version](blocks)
+        version += 1
+    return blocks
+
+
+# --- single game ---
+@dataclass
+class GameState:
+    tribe: Tribe
+    inertia: InertiaTracker
+    events: EventEngine
+    turn: int = 0
+
+
+class _Names:
+    def __init__(self):
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+
+    def __call__(self, name: Optional[str]) -> int:
+        if name is None:
+            return NONE_ID
+        i = self.ids.get(name)
+        if i is None:
+            i = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+
+def _pack_nested(w: _Writer, names: _Names, prefix: str, nested: Dict[str, Dict[str, int]]):
+    outer, inner, vals = array.array("H"), array.array("H"), array.array("q")
+    for act, m in nested.items():
+        if not m:
+            outer.append(names(act)); inner.append(NONE_ID); vals.append(0)  # keeps empty activities
+        for worker, n in m.items():
+            outer.append(names(act)); inner.append(names(worker)); vals.append(n)
+    w.array(prefix + ".outer", "H", outer)
+    w.array(prefix + ".inner", "H", inner)
+    w.array(prefix + ".value", "q", vals)
+
+
+def _unpack_nested(blocks, names: List[str], prefix: str) -> Dict[str, Dict[str, int]]:
+    out: Dict[str, Dict[str, int]] = {}
+    for a, wk, v in zip(_array(blocks, prefix + ".outer"), _array(blocks, prefix + ".inner"), _array(blocks, prefix + ".value")):
+        m = out.setdefault(names[a], {})
+        if wk != NONE_ID:
+            m[names[wk]] = v
+    return out
+
+
+def _pack_flat(w: _Writer, names: _Names, prefix: str, flat: Dict[str, int]):
+    w.array(prefix + ".key", "H", [names(k) for k in flat])
+    w.array(prefix + ".value", "q", list(flat.values()))
+
+
+def _unpack_flat(blocks, names: List[str], prefix: str) -> Dict[str, int]:
+    return {names[k]: v for k, v in zip(_array(blocks, prefix + ".key"), _array(blocks, prefix + ".value"))}
+
+
+def dumps_game(tribe: Tribe, inertia: InertiaTracker, events: EventEngine, turn: int = 0) -> bytes:
+    w = _Writer()
+    names = _Names()
+    w.array("demo", "q", [getattr(tribe.demo, f) for f in DEMO_FIELDS])
+    _pack_nested(w, names, "assign", tribe.assign.per_activity)
+    _pack_flat(w, names, "stocks", tribe.res.stocks)
+    _pack_flat(w, names, "flows", tribe.res.flows)
+    w.array("tribe.ids", "H", [names(tribe.season), names(tribe.king_activity)])
+    w.array("tribe.real", "d", [tribe.king_bonus])
+    if tribe.effects:
+        w.strings("tribe.effects", [json.dumps([e.to_dict(), left]) for e, left in tribe.effects.active])
+    _pack_nested(w, names, "inertia.last", inertia.last_assignments)
+    _pack_flat(w, names, "inertia.cooldowns", inertia.cooldowns)
+    w.array("inertia.params", "d", [inertia.penalty, inertia.threshold, inertia.cooldown_len])
+    version, internal, gauss = events.rng.getstate()
+    w.strings("rng.seed", [] if events.rng_seed is None else [str(events.rng_seed)])  # empty: unseeded
+    w.array("rng.state", "I", [version] + list(internal))
+    w.array("rng.gauss", "d", [] if gauss is None else [gauss])
+    sched = events.schedule_state()
+    if sched is not None:
+        w.array("events.turn", "q", [sched["turn"]])
+        w.array("events.clock", "q", sched["clock"])
+        w.array("events.due", "q", [x for e in sched["due"] for x in e])
+        w.array("events.cooling", "q", [x for e in sched["cooling"] for x in e])
+    w.array("turn", "q", [turn])
+    w.strings("names", names.names)
+    return b"".join(bytes(p) for p in w.dump(KIND_GAME))
+
+
+def loads_game(data: bytes, specs_by_season: Optional[Dict[str, List[EventSpec]]] = None,
+               rules: Optional[Ruleset] = None) -> GameState:
+    """Rebuilds the classes; event specs and the ruleset are code/config, pass the same ones back in."""
+    version, kind, blocks = _read_blocks(data)
+    if kind != KIND_GAME:
+        raise ValueError("snapshot holds a tribe batch, use load_batch")
+    blocks = _migrate(version, blocks)
+    names = _strings(blocks, "names")
+    demo = Demographics(**dict(zip(DEMO_FIELDS, _array(blocks, "demo"))))
+    season_id, king_id = _array(blocks, "tribe.ids")
+    (king_bonus,) = _array(blocks, "tribe.real")
+    tribe = Tribe(
+        demo=demo,
+        assign=Assignments(per_activity=_unpack_nested(blocks, names, "assign")),
+        res=Resources(stocks=_unpack_flat(blocks, names, "stocks"), flows=_unpack_flat(blocks, names, "flows")),
+        season=names[season_id], king_activity=names[king_id], king_bonus=king_bonus, rules=rules,
+    )
+    if "tribe.effects" in blocks:
+        for text in _strings(blocks, "tribe.effects"):
+            effect, left = json.loads(text)
+            tribe.effects.active.append([compile_effect(effect), left])
+    penalty, threshold, cooldown_len = _array(blocks, "inertia.params")
+    inertia = InertiaTracker(
+        last_assignments=_unpack_nested(blocks, names, "inertia.last"),
+        penalty=penalty, threshold=int(threshold),
+        cooldowns=_unpack_flat(blocks, names, "inertia.cooldowns"),
+        cooldown_len=int(cooldown_len),
+    )
+    state = _array(blocks, "rng.state")
+    gauss = _array(blocks, "rng.gauss")
+    seed = _strings(blocks, "rng.seed")
+    events = EventEngine(specs_by_season=specs_by_season or {}, rng_seed=int(seed[0]) if seed else None)
+    events.rng.setstate((state[0], tuple(state[1:]), gauss[0] if gauss else None))
+    if "events.turn" in blocks:  # absent until the first roll: the schedule is drawn then
+        due, cooling = _array(blocks, "events.due"), _array(blocks, "events.cooling")
+        events.restore_schedule({
+            "turn": _array(blocks, "events.turn")[0], "clock": list(_array(blocks, "events.clock")),
+            "due": list(zip(due[::2], due[1::2])), "cooling": list(zip(cooling[::2], cooling[1::2])),
+        })
+    (turn,) = _array(blocks, "turn")
+    return GameState(tribe, inertia, events, turn)
+
+
+def save_game(path: str, tribe: Tribe, inertia: InertiaTracker, events: EventEngine, turn: int = 0):
+    with open(path, "wb") as fh:
+        fh.write(dumps_game(tribe, inertia, events, turn))
+
+
+def load_game(path: str, specs_by_season: Optional[Dict[str, List[EventSpec]]] = None,
+              rules: Optional[Ruleset] = None) -> GameState:
+    with open(path, "rb") as fh:
+        return loads_game(fh.read(), specs_by_season, rules)
+
+
+# --- tribe batches ---
+BATCH_ARRAYS = ("demo", "assign", "stocks", "season", "king_activity", "king_bonus")
+
+
+@dataclass
+class BatchState:
+    batch: "TribeBatch"
+    inertia: Optional["InertiaBatch"] = None   # None when the snapshot holds no inertia
+    events: Optional["EventBatch"] = None      # None when the snapshot holds no event schedule
+    turn: int = 0
+
+
+def _np_block(w: _Writer, name: str, a):
+    import numpy as np
+    a = np.ascontiguousarray(a)
+    le = a.dtype.newbyteorder("<")
+    w.block(name, le.str, a.shape, a.astype(le, copy=False))
+
+
+def _np_array(blocks, name: str):
+    import numpy as np
+    code, shape, payload = blocks[name]
+    return np.frombuffer(payload, dtype=np.dtype(code)).reshape(shape)
+
+
+def save_batch(path: str, batch, inertia=None, events=None, turn: int = 0) -> None:
+    """Writes a batch.TribeBatch, with its InertiaBatch and EventBatch state when given.
+
+    Arrays go out as raw buffers, no per-tribe encoding.
+    """
+    w = _Writer()
+    w.strings("activities", list(batch.activities))
+    w.strings("workers", list(batch.workers))
+    w.strings("seasons", list(batch.seasons))
+    for name in BATCH_ARRAYS:
+        _np_block(w, name, getattr(batch, name))
+    _np_block(w, "present", batch.present)
+    if inertia is not None:
+        w.array("inertia.params", "d", [inertia.penalty, inertia.threshold, inertia.cooldown_len])
+        _np_block(w, "inertia.last", inertia.last)
+        _np_block(w, "inertia.cooldown", inertia.cooldown)
+    if events is not None:
+        w.strings("events.names", [spec.name for spec in events.specs])
+        w.strings("events.rng", [json.dumps(events.rng.bit_generator.state)])
+        _np_block(w, "events.left", events.left)
+        _np_block(w, "events.cooldown", events.cooldown)
+    w.array("turn", "q", [turn])
+    with open(path, "wb") as fh:
+        for part in w.dump(KIND_BATCH):
+            fh.write(part)
+
+
+def load_batch(path: str, rules=None, specs_by_season: Optional[Dict[str, List[EventSpec]]] = None) -> BatchState:
+    """Reads a TribeBatch back, remapping worker/activity ids onto the current ruleset.
+
+    Event columns are matched by event name; events absent from the snapshot keep a
+    fresh schedule. The event schedule is restored only when `specs_by_season` is given.
+    """
+    import numpy as np
+    from batch import TribeBatch, InertiaBatch, EventBatch
+    with open(path, "rb") as fh:
+        buf = bytearray(fh.read())  # writable: arrays are views on it
+    version, kind, blocks = _read_blocks(buf)
+    if kind != KIND_BATCH:
+        raise ValueError("snapshot holds a single game, use load_game")
+    blocks = _migrate(version, blocks)
+    arrays = {name: _np_array(blocks, name) for name in BATCH_ARRAYS}
+    n = arrays["demo"].shape[0]
+    batch = TribeBatch(0, seasons=_strings(blocks, "seasons"), rules=rules)
+    batch.n = n
+    acts, workers = _strings(blocks, "activities"), _strings(blocks, "workers")
+    same = acts == batch.activities and workers == batch.workers
+    a_map = np.array([batch.activity_id.get(a, -1) for a in acts])
+    w_map = np.array([batch.worker_id.get(w, -1) for w in workers])
+    ai, wi = np.nonzero(a_map >= 0)[0], np.nonzero(w_map >= 0)[0]
+
+    def remap(a):
+        # (n, A, W) or (n, A) array of the snapshot's ids onto the current ones
+        if same:
+            return a
+        if a.ndim == 2:
+            out = np.zeros((n, len(batch.activities)), dtype=a.dtype)
+            out[:, a_map[ai]] = a[:, ai]
+            return out
+        out = np.zeros((n, len(batch.activities), len(batch.workers)), dtype=a.dtype)
+        out[:, a_map[ai][:, None], w_map[wi][None, :]] = a[:, ai[:, None], wi[None, :]]
+        return out
+
+    batch.assign = remap(arrays["assign"])
+    k = arrays["king_activity"]
+    batch.king_activity = k if same else np.where(k >= 0, a_map[np.maximum(k, 0)], -1)
+    batch.demo = arrays["demo"]
+    batch.stocks = arrays["stocks"]
+    batch.season = arrays["season"]
+    batch.king_bonus = arrays["king_bonus"]
+    # Older snapshots have no mask: activities with workers are present anyway
+    batch.present = remap(_np_array(blocks, "present")) if "present" in blocks else np.zeros((n, len(batch.activities)), dtype=bool)
+
+    inertia = None
+    if "inertia.params" in blocks:
+        penalty, threshold, cooldown_len = _array(blocks, "inertia.params")
+        inertia = InertiaBatch(batch, penalty, int(threshold), int(cooldown_len))
+        inertia.last = remap(_np_array(blocks, "inertia.last")).copy()
+        inertia.cooldown = remap(_np_array(blocks, "inertia.cooldown")).copy()
+
+    events = None
+    if "events.rng" in blocks and specs_by_season is not None:
+        events = EventBatch(batch, specs_by_season)
+        saved = {name: e for e, name in enumerate(_strings(blocks, "events.names"))}
+        cols = [(e, saved[spec.name]) for e, spec in enumerate(events.specs) if spec.name in saved]
+        if cols:
+            cur, old = map(list, zip(*cols))
+            events.left[:, cur] = _np_array(blocks, "events.left")[:, old]
+            events.cooldown[:, cur] = _np_array(blocks, "events.cooldown")[:, old]
+        events.rng.bit_generator.state = json.loads(_strings(blocks, "events.rng")[0])
+
+    turn = int(_array(blocks, "turn")[0]) if "turn" in blocks else 0
+    return BatchState(batch, inertia, events, turn)
+
+
+__all__ = [
+    "SNAPSHOT_VERSION", "GameState", "BatchState", "migration",
+    "dumps_game", "loads_game", "save_game", "load_game", "save_batch", "load_batch",
+]
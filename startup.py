@@ -0,0 +1,77 @@
+# startup.py
+# Startup-time budget (python main.py --profile-startup)
+# - Import and initialization time per phase, measured in this fresh process
+# - Headless guarantee: the simulation modules import without the LLM stack or YAML,
+#   checked in a clean interpreter so earlier phases cannot hide a leak
+
+import importlib
+import os
+import subprocess
+import sys
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HEADLESS_MODULES = ("engine", "campaign", "batch", "fork", "optimizer", "snapshot", "config_loader", "history_memory", "metrics")
+LLM_STACK = ("openai", "httpx", "yaml")
+
+
+def headless_leaks(modules: Sequence[str] = HEADLESS_MODULES) -> List[str]:
+    """LLM_STACK modules loaded by importing `modules` in a clean interpreter (empty is good)."""
+    code = (f"import sys\nfor m in {tuple(modules)!r}: __import__(m)\n"
+            f"print(' '.join(m for m in {LLM_STACK!r} if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True)
+    return out.stdout.split()
+
+
+def _import(name: str) -> Callable[[], object]:
+    return lambda: importlib.import_module(name)
+
+
+def _config(path: str) -> Callable[[], object]:
+    def run():
+        from config_loader import load_game_config
+        return load_game_config(path)
+    return run
+
+
+def phases(config_path: str) -> List[Tuple[str, Callable[[], object]]]:
+    return [
+        ("engine (headless core)", _import("engine")),
+        ("campaign + config_loader", _import("campaign")),
+        ("batch (numpy)", _import("batch")),
+        ("config.yaml (compiled, cached)", _config(config_path)),
+        ("yaml", _import("yaml")),
+        ("advisor stack (prompt_builder, history)", lambda: (_import("advisor")(), _import("history_memory")())),
+        ("openai SDK", _import("openai")),
+    ]
+
+
+def profile_startup(config_path: Optional[str] = None, out=None) -> List[Tuple[str, float, str]]:
+    """Runs the phases in order and prints their wall time; returns (phase, ms, status)."""
+    out = out or sys.stdout
+    config_path = config_path or os.path.join(HERE, "config.yaml")
+    if HERE not in sys.path:
+        sys.path.insert(0, HERE)
+    rows = []
+    total = 0.0
+    for name, run in phases(config_path):
+        t0 = time.perf_counter()
+        try:
+            run()
+            status = "ok"
+        except ImportError as e:
+            status = f"not installed ({e.name})"
+        except Exception as e:
+            status = f"error: {e}"
+        ms = (time.perf_counter() - t0) * 1000.0
+        total += ms
+        rows.append((name, ms, status))
+        out.write(f"{name:<42} {ms:8.1f} ms  {status}\n")
+    out.write(f"{'total':<42} {total:8.1f} ms\n")
+    leaks = headless_leaks()
+    out.write("headless imports: " + ("clean" if not leaks else "LOAD " + ", ".join(leaks)) + "\n")
+    return rows
+
+
+__all__ = ["HEADLESS_MODULES", "LLM_STACK", "headless_leaks", "profile_startup"]
@@ -0,0 +1,128 @@
+# test_advisor.py
+# AsyncAdvisor.advise_stream on failed or cut-short streams, and what the turn shows and caches
+#
+# Usage:
+#   python -m pytest -q test_advisor.py
+
+import asyncio
+import contextlib
+import io
+import os
+import random
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import engine_integration as ei
+from advisor import AsyncAdvisor
+from advisor_cache import AdvisorCache
+from journal import TurnJournal
+from engine import EventEngine, InertiaTracker, LLM_FALLBACK_PREFIX
+from metrics import Metrics, MemorySink
+from test_parity import random_tribe
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _chunk(content=None, finish=None):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content), finish_reason=finish)])
+
+
+class FakeClient:
+    """chat.completions.create(stream=True) replaying `chunks`; an exception in the list is raised there."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        if isinstance(self.chunks, Exception):
+            raise self.chunks
+        return self._iter()
+
+    async def _iter(self):
+        for c in self.chunks:
+            if isinstance(c, Exception):
+                raise c
+            yield c
+
+    async def close(self):
+        pass
+
+
+def advisor(chunks):
+    a = AsyncAdvisor(api_key="x")
+    a._client = FakeClient(chunks)
+    return a
+
+
+WHOLE = [_chunk("Bonjour "), _chunk("chef."), _chunk(finish="stop")]
+CASES = {
+    "before_first_chunk": ConnectionError("refusé"),
+    "mid_stream": [_chunk("Bonjour "), ConnectionError("coupé")],
+    "no_finish_reason": [_chunk("Bonjour "), _chunk("ch")],
+}
+
+
+def test_whole_stream_is_returned_and_cached():
+    async def run():
+        cache, got = AdvisorCache(), []
+        text = await cache.aget_or_call("k", lambda: advisor(WHOLE).advise_stream("p", got.append))
+        return text, got, cache.get("k")
+    text, got, cached = asyncio.run(run())
+    assert text == "Bonjour chef." == "".join(got) == cached
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_failed_stream_gives_fallback_and_is_not_cached(case):
+    async def run():
+        cache, got = AdvisorCache(), []
+        text = await cache.aget_or_call("k", lambda: advisor(CASES[case]).advise_stream("p", got.append))
+        return text, got, cache.get("k")
+    text, got, cached = asyncio.run(run())
+    assert text.startswith(LLM_FALLBACK_PREFIX)
+    assert cached is None
+    assert all(not d.startswith(LLM_FALLBACK_PREFIX) for d in got)  # the fallback is never streamed
+    if case == "before_first_chunk":
+        assert got == []
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_turn_shows_one_advice_block(case, tmp_path, monkeypatch):
+    monkeypatch.chdir(HERE)  # build_advisor_prompt.md
+    monkeypatch.setattr(ei, "HISTORY_PATH", tmp_path / "history.md")
+    metrics = Metrics([MemorySink()])
+    tribe = random_tribe(random.Random(0))
+
+    async def run():
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            r = await ei.run_one_turn_async(tribe, InertiaTracker(), EventEngine({}, rng_seed=0), ei.HistoryBuffer(),
+                                            "", 1, advisor(CASES[case]), cache=AdvisorCache(), metrics=metrics,
+                                            stream=True)
+        return r, out.getvalue()
+    r, out = asyncio.run(run())
+    assert r["advisor"].startswith(LLM_FALLBACK_PREFIX + " conseiller local")
+    assert out.count(LLM_FALLBACK_PREFIX) == 1
+    if case == "before_first_chunk":
+        assert out.count("Conseiller >") == 1
+        assert "llm_first_token" not in metrics.phases
+
+
+def test_journal_append_runs_off_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.chdir(HERE)
+    journal = TurnJournal(str(tmp_path / "history.jsonl"), fsync="always")
+    threads = []
+    append = journal.append
+    monkeypatch.setattr(journal, "append", lambda *a: (threads.append(threading.current_thread()), append(*a)))
+    tribe = random_tribe(random.Random(0))
+
+    async def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return await ei.run_one_turn_async(tribe, InertiaTracker(), EventEngine({}, rng_seed=0), ei.HistoryBuffer(),
+                                               "", 1, advisor(WHOLE), journal=journal)
+    asyncio.run(run())
+    journal.close()
+    assert len(threads) == 1 and threads[0] is not threading.main_thread()
+    assert (tmp_path / "history.jsonl").stat().st_size > 0
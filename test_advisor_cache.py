@@ -0,0 +1,54 @@
+# test_advisor_cache.py
+# AdvisorCache keys: stable over equivalent inputs, invalidated by the template text and TEMPLATE_VERSION
+#
+# Usage:
+#   python -m pytest -q test_advisor_cache.py
+
+import advisor_cache
+from advisor_cache import AdvisorCache
+from engine import LLM_FALLBACK_PREFIX
+
+REPORT = {"season": "summer", "stocks": {"🥫": 10, "🔧": 2}, "flows": {"🌾": 5}}
+
+
+def _cache(tmp_path, **kw):
+    template = tmp_path / "prompt.md"
+    if not template.exists():
+        template.write_text("Tu es le conseiller.\n", encoding="utf-8")
+    return AdvisorCache(directory=str(tmp_path / "cache"), template_path=str(template), **kw), template
+
+
+def test_key_ignores_dict_order_and_whitespace(tmp_path):
+    cache, _ = _cache(tmp_path)
+    reordered = {"flows": {"🌾": 5}, "stocks": {"🔧": 2, "🥫": 10}, "season": "summer"}
+    assert cache.key(REPORT, ["Orage"], "rien ") == cache.key(reordered, ["Orage"], " rien")
+    assert cache.key(REPORT, ["Orage"], "") != cache.key(REPORT, [], "")
+
+
+def test_template_edit_changes_the_key(tmp_path):
+    cache, template = _cache(tmp_path)
+    key = cache.key(REPORT, [], "")
+    cache.put(key, "conseil")
+    template.write_text("Tu es le conseiller du roi.\n", encoding="utf-8")
+    fresh, _ = _cache(tmp_path)  # same disk store, new process
+    assert fresh.key(REPORT, [], "") != key
+    assert fresh.get(fresh.key(REPORT, [], "")) is None
+    assert fresh.get(key) == "conseil"
+
+
+def test_template_version_changes_the_key(tmp_path, monkeypatch):
+    cache, _ = _cache(tmp_path)
+    key = cache.key(REPORT, [], "")
+    monkeypatch.setattr(advisor_cache, "TEMPLATE_VERSION", advisor_cache.TEMPLATE_VERSION + 1)
+    assert cache.key(REPORT, [], "") != key
+
+
+def test_ttl_and_fallbacks(tmp_path):
+    now = [0.0]
+    cache, _ = _cache(tmp_path, ttl=10, clock=lambda: now[0])
+    cache.put("a" * 64, "conseil")
+    cache.put("b" * 64, f"{LLM_FALLBACK_PREFIX} hors ligne")
+    assert cache.get("a" * 64) == "conseil" and cache.get("b" * 64) is None
+    now[0] = 11
+    assert cache.get("a" * 64) is None
+    assert cache.stats == {"hits": 1, "misses": 2, "disk_hits": 0, "entries": 0}
@@ -0,0 +1,32 @@
+# test_assignments.py
+# Assignments storage limits: counts outside array('H') raise ValueError, nothing half-applied
+#
+# Usage:
+#   python -m pytest -q test_assignments.py
+
+import pytest
+
+from engine import Assignments, COUNT_MAX, MAN, WOMAN
+
+
+@pytest.mark.parametrize("write", [
+    lambda a: a.add("🌾", MAN, -5),
+    lambda a: a.set("🌾", MAN, COUNT_MAX + 1),
+    lambda a: a.per_activity["🌾"].__setitem__(MAN, -1),
+    lambda a: a.per_activity.__setitem__("🐟", {MAN: 1, WOMAN: COUNT_MAX + 1}),
+    lambda a: setattr(a, "per_activity", {"🦌": {MAN: 1}, "🌾": {MAN: -1}}),
+])
+def test_out_of_range_count_raises_and_keeps_state(write):
+    a = Assignments({"🌾": {MAN: 3}, "🐟": {WOMAN: 2}})
+    with pytest.raises(ValueError, match="outside"):
+        write(a)
+    assert a.to_dict() == {"🌾": {MAN: 3}, "🐟": {WOMAN: 2}}
+
+
+def test_unknown_key_in_new_mapping_keeps_state():
+    a = Assignments({"🌾": {MAN: 3}})
+    with pytest.raises(ValueError):
+        a.per_activity = {"🦌": {MAN: 1}, "🌾": {"nope": 1}}
+    assert a.to_dict() == {"🌾": {MAN: 3}}
+    a.per_activity = {"🦌": {MAN: COUNT_MAX}}
+    assert a.to_dict() == {"🦌": {MAN: COUNT_MAX}}
@@ -0,0 +1,40 @@
+# test_batch.py
+# EventBatch scheduling against the batch's season table, including seasons added after it was built
+#
+# Usage:
+#   python -m pytest -q test_batch.py
+
+import random
+
+import numpy as np
+
+from batch import EventBatch, TribeBatch
+from engine import EventSpec
+from test_parity import random_tribe
+
+ALWAYS = EventSpec("Crue", 1.0, 1, lambda t: "")
+WINTER = EventSpec("Gel", 1.0, 1, lambda t: "")
+SPECS = {"monsoon": [ALWAYS], "winter": [WINTER, ALWAYS]}
+
+
+def test_hits_follow_each_tribe_season():
+    rng = random.Random(0)
+    batch = TribeBatch.from_tribes([random_tribe(rng) for _ in range(3)])
+    events = EventBatch(batch, SPECS, rng_seed=0)
+    batch.season[:] = [batch.season_id["winter"], batch.season_id["summer"], batch.season_id["winter"]]
+    hits = events.roll()
+    assert [events.names(hits, i) for i in range(3)] == [["Crue", "Gel"], [], ["Crue", "Gel"]]
+
+
+def test_season_added_after_the_event_batch_is_rolled():
+    rng = random.Random(1)
+    batch = TribeBatch.from_tribes([random_tribe(rng) for _ in range(2)])
+    events = EventBatch(batch, SPECS, rng_seed=0)
+    tribe = random_tribe(rng)
+    tribe.season = "monsoon"
+    batch.set_tribe(1, tribe)  # new season id past the table EventBatch started with
+    batch.season[0] = batch.season_id["spring"]
+    hits = events.roll()
+    assert hits.shape == (2, 2)
+    assert events.names(hits, 0) == [] and events.names(hits, 1) == ["Crue"]
+    assert np.array_equal(events.in_season[batch.season_id["monsoon"]], [True, False])
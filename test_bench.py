@@ -0,0 +1,39 @@
+# test_bench.py
+# Benchmark suite smoke test: every single-tribe phase runs, baselines compare and gate the exit code
+#
+# Usage:
+#   python -m pytest -q test_bench.py
+
+import io
+import json
+
+import pytest
+
+import bench
+
+
+@pytest.mark.parametrize("case", bench.cases(scales=["1"]), ids=lambda c: c.key)
+def test_each_phase_runs(case, monkeypatch):
+    monkeypatch.chdir(bench.HERE)  # build_advisor_prompt.md, as when run from the repo
+    call = case.setup()
+    call()
+    call()
+
+
+def test_compare_flags_only_past_the_threshold():
+    results = {"a@1": {"us": 115.0}, "b@1": {"us": 105.0}, "c@1": {"us": 50.0}}
+    baseline = {"a@1": {"us": 100.0}, "b@1": {"us": 100.0}}
+    assert bench.compare(results, baseline, 10.0) == {"a@1": pytest.approx(15.0)}
+    assert results["b@1"]["change_pct"] == 5.0 and "change_pct" not in results["c@1"]
+
+
+def test_main_writes_results_and_fails_on_regression(tmp_path, monkeypatch):
+    monkeypatch.setattr("sys.stdout", io.StringIO())
+    base = tmp_path / "base.json"
+    args = ["--phases", "render_compact", "--scales", "1"]
+    assert bench.main(args + ["--save-baseline", str(base)]) == 0
+    doc = json.loads(base.read_text(encoding="utf-8"))
+    assert list(doc["results"]) == ["render_compact@1"] and doc["regressions"] == {}
+    doc["results"]["render_compact@1"]["us"] /= 100  # pretend the stored run was 100x faster
+    base.write_text(json.dumps(doc), encoding="utf-8")
+    assert bench.main(args + ["--baseline", str(base)]) == 1
@@ -0,0 +1,49 @@
+# test_campaign.py
+# Headless Monte Carlo campaigns: seasons, per-seed determinism, pool results against in-process runs
+#
+# Usage:
+#   python -m pytest -q test_campaign.py
+
+import os
+from dataclasses import replace
+
+from campaign import aggregate, default_campaign, percentile, run_seed, season_for_turn, simulate
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CONFIG = os.path.join(HERE, "config.yaml")
+
+
+def idle(turn, tribe):
+    """Policy: everyone stops working on turn 1 (module level, so it pickles)."""
+    return {a: {} for a in tribe.assign.per_activity} if turn == 1 else None
+
+
+def test_season_for_turn():
+    assert [season_for_turn("summer", t) for t in (1, 3, 4, 10, 13)] == ["summer", "summer", "autumn", "spring", "summer"]
+    assert season_for_turn("monsoon", 1) == "spring"
+
+
+def test_percentile():
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile([0, 10], 25) == 2.5
+
+
+def test_runs_are_deterministic_per_seed():
+    config = default_campaign(CONFIG)
+    a, b = run_seed(config, 7, 12), run_seed(config, 7, 12)
+    assert a == b and len(a["stocks"]) == 12
+
+
+def test_pool_matches_in_process_runs():
+    config = default_campaign(CONFIG)
+    seeds = list(range(6))
+    result = simulate(config, seeds, 8, processes=2, chunk_size=4)
+    assert result == aggregate([run_seed(config, s, 8) for s in seeds], 8)
+    assert result.seeds == 6 and len(result.stock_percentiles["p50"]) == 8
+
+
+def test_idle_tribe_starves():
+    config = replace(default_campaign(), stocks={"🥫": 50, "🔧": 0})  # under one turn of consumption
+    result = simulate(config, range(4), 6, policy=idle, processes=2)
+    assert result.starvation_probability == 1.0
+    assert result.starved_turns == [6] * 4
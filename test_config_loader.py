@@ -0,0 +1,56 @@
+# test_config_loader.py
+# load_game_config's compiled cache: keyed on the file and on the engine defaults it merges into
+#
+# Usage:
+#   python -m pytest -q test_config_loader.py
+
+import os
+
+import pytest
+
+import config_loader
+from campaign import default_campaign
+from config_loader import ConfigError, load_game_config
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def config(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text("seasonal_agri:\n  summer: 0.9\n", encoding="utf-8")
+    return str(path)
+
+
+def test_warm_load_comes_from_the_cache(config, tmp_path, monkeypatch):
+    cold = load_game_config(config, cache_dir=str(tmp_path / "cache"))
+    monkeypatch.setattr(config_loader, "validate", None)  # a second parse would fail
+    warm = load_game_config(config, cache_dir=str(tmp_path / "cache"))
+    assert warm.digest == cold.digest
+    assert warm.ruleset.season_factor == cold.ruleset.season_factor
+
+
+def test_changed_engine_defaults_miss_the_cache(config, tmp_path, monkeypatch):
+    cache = str(tmp_path / "cache")
+    before = load_game_config(config, cache_dir=cache)
+    assert before.ruleset.season_factor["winter"] == 0.2
+    monkeypatch.setitem(config_loader.SEASONAL_AGRI, "winter", 0.4)
+    after = load_game_config(config, cache_dir=cache)
+    assert after.digest != before.digest
+    assert after.ruleset.season_factor == dict(before.ruleset.season_factor, winter=0.4)
+    assert len(os.listdir(cache)) == 2
+
+
+def test_schema_errors_are_reported_together(tmp_path):
+    path = tmp_path / "bad.yaml"
+    path.write_text("seasonal_agri:\n  monsoon: 1\n  winter: -1\nproduction_rules:\n  farming: {nobody: 1}\n",
+                    encoding="utf-8")
+    with pytest.raises(ConfigError) as err:
+        load_game_config(str(path), cache_dir=None)
+    assert len(err.value.errors) == 3
+
+
+def test_default_campaign_builds_with_the_config_rules():
+    tribe, _, events = default_campaign(os.path.join(HERE, "config.yaml")).build(3)
+    assert tribe.rules is not None and tribe.season == "summer"
+    assert events.rng_seed == 3
@@ -0,0 +1,34 @@
+# test_console.py
+# engine.run_turn_console plays a turn end to end: prompt, advisor fallback, history.md, console block
+#
+# Usage:
+#   python -m pytest -q test_console.py
+
+import os
+import random
+
+import engine
+from engine import EventEngine, InertiaTracker, LLM_FALLBACK_PREFIX, run_turn_console
+from test_parity import random_tribe
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_console_turn_runs_and_writes_real_newlines(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(HERE)  # build_advisor_prompt.md
+    monkeypatch.setattr(engine, "HISTORY_PATH", str(tmp_path / "history.md"))
+    prompts = []
+    monkeypatch.setattr(engine, "openai_llm_call",
+                        lambda prompt: prompts.append(prompt) or f"{LLM_FALLBACK_PREFIX} hors ligne")
+    monkeypatch.setattr(engine, "_OPENAI_CLIENT", object())  # no warm-up thread
+    tribe = random_tribe(random.Random(0))
+    run_turn_console(tribe, tribe.assign, "ordres", InertiaTracker(), EventEngine({}, rng_seed=0), turn=3)
+
+    out = capsys.readouterr().out
+    assert "\\n" not in out
+    assert out.startswith("\n===== TOUR 3 =====\n")
+    assert out.count("Conseiller >") == 1
+    assert "[STATE_JSON]" in prompts[0] and "ordres" in prompts[0]
+    history = (tmp_path / "history.md").read_text(encoding="utf-8")
+    assert "\\n" not in history
+    assert history.startswith("## Tour 3  •  ") and history.endswith("---\n")
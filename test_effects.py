@@ -0,0 +1,57 @@
+# test_effects.py
+# Event effect IR (compile_effect / EffectTable) and where it lands in Tribe.next_turn
+# - Flow factors before the food balance, 🥫 factors on what gets stored, coverage factors
+#   on the capacity; N-turn and while scopes
+#
+# Usage:
+#   python -m pytest -q test_effects.py
+
+import pytest
+
+from campaign import default_campaign
+from engine import Effect, compile_effect
+
+# default_campaign in summer: 🌾 192, produced 372, consumed 103, 🥫 capacity 300, 🎭 capacity 75
+
+
+def _turn(*effects):
+    tribe, _, _ = default_campaign().build(0)
+    for e in effects:
+        tribe.effects.add(e)
+    return tribe, tribe.next_turn()
+
+
+def test_storage_factor_scales_what_is_stored():
+    _, r = _turn(Effect("mul", "🥫", 0.5))
+    assert r["food_report"]["stored"] == r["flows"]["🥫"] == 134
+    assert r["stocks"]["🥫"] == 1519 + 134
+
+
+def test_food_factor_comes_before_the_food_balance():
+    _, r = _turn(Effect("mul", "🌾", 0.5))
+    assert r["flows"]["🌾"] == 96
+    assert r["food_report"] == {"produced": 276, "consumed": 103, "net": 173, "stored": 173, "capacity": 300}
+    _, r = _turn(Effect("mul", "🌾", 0.5), Effect("mul", "🥫", 0.5))
+    assert r["food_report"]["stored"] == 86
+
+
+def test_stock_and_coverage_effects():
+    _, r = _turn(Effect("add_stock", "🔧", 10), Effect("mul", "🎭", 0.5))
+    assert r["stocks"]["🔧"] == 100 + 10 + 30
+    assert r["coverage"]["🎭"]["capacity"] == 37.5
+
+
+def test_scopes():
+    tribe, r = _turn(compile_effect({"type": "modify_flow_factor", "flow": "farming", "factor": 0.5, "turns": 2}),
+                     compile_effect({"type": "mul", "activity": "hunting", "factor": 0.0,
+                                     "while": "stock.food < 1600"}))
+    assert (r["flows"]["🌾"], r["flows"]["🦌"]) == (96, 0)
+    r = tribe.next_turn()  # 🥫 1519 + 83 = 1602: the hunting effect lapses
+    assert (r["flows"]["🌾"], r["flows"]["🦌"]) == (96, 90)
+    r = tribe.next_turn()
+    assert r["flows"]["🌾"] == 192 and not tribe.effects
+
+
+def test_compile_rejects_unknown_types():
+    with pytest.raises(ValueError):
+        compile_effect({"type": "explode", "flow": "farming"})
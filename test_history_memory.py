@@ -0,0 +1,79 @@
+# test_history_memory.py
+# HistoryMemory season/year rollups, retrieval under budget, and its use as the turn's history block
+#
+# Usage:
+#   python -m pytest -q test_history_memory.py
+
+import contextlib
+import io
+import os
+import random
+
+import engine_integration as ei
+from engine import EventEngine, InertiaTracker
+from history_memory import TURNS_PER_YEAR, HistoryMemory
+from test_parity import random_tribe
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SEASONS = ("spring", "summer", "autumn", "winter")
+
+
+def _report(turn, net=5):
+    return {"season": SEASONS[(turn - 1) % TURNS_PER_YEAR // 3], "stocks": {"🥫": 100 + turn},
+            "food_report": {"produced": 20 + net, "consumed": 20, "net": net, "stored": 1},
+            "coverage": {"🎭": {"coverage_pct": 100.0 - turn}}}
+
+
+def _memory(turns, **kw):
+    mem = HistoryMemory(**kw)
+    for t in range(1, turns + 1):
+        mem.add_turn(t, _report(t, net=-1 if t == 2 else 5), ["Orage"] if t == 3 else [])
+    return mem
+
+
+def test_seasons_and_years_roll_up_at_their_boundaries():
+    mem = _memory(TURNS_PER_YEAR + 4)
+    seasons = [text for text, _ in mem.seasons]
+    assert len(seasons) == 5 and len(mem.years) == 1
+    assert seasons[0] == ("Printemps an 1 (T1-T3): 🍛 +69/-60 = +9 | 🥫 100→103"
+                          " | déficit 1t | couv. min 🎭97.0% | évts: Orage×1")
+    assert seasons[4].startswith("Printemps an 2 (T13-T15)")
+    assert mem.years[0][0].startswith("An 1 (T1-T12): 🍛 +294/-240 = +54 | 🥫 100→112")
+
+
+def test_retrieve_includes_the_season_and_year_in_progress():
+    text = _memory(TURNS_PER_YEAR + 4).retrieve(10_000)
+    lines = text.splitlines()
+    assert lines[0] == "[ANNÉES]"
+    assert lines[2].startswith("An 2 (T13-T16, en cours)")
+    assert lines.index("[TOURS]") - 1 == lines.index("Été an 2 (T16-T16, en cours): 🍛 +25/-20 = +5 | 🥫 115→116"
+                                                     " | couv. min 🎭84.0%")
+    assert lines[-1].startswith("[Tour 16] 🍛+5 🥫116")
+    assert "en cours" in _memory(1).retrieve()
+
+
+def test_retrieve_keeps_the_newest_within_budget():
+    mem = _memory(5 * TURNS_PER_YEAR, recent_turns=4)
+    full = mem.retrieve(10_000)
+    short = mem.retrieve(120)
+    assert len(short) < len(full)
+    assert "[Tour 60]" in short and "[Tour 56]" not in full
+    assert "An 1 " not in short and "An 1 " in full
+
+
+def test_turn_prompt_uses_the_memory(tmp_path, monkeypatch):
+    monkeypatch.chdir(HERE)  # build_advisor_prompt.md
+    monkeypatch.setattr(ei, "HISTORY_PATH", tmp_path / "history.md")
+    tribe, inertia, events = random_tribe(random.Random(0)), InertiaTracker(), EventEngine({}, rng_seed=0)
+    buf, mem, prompts = ei.HistoryBuffer(), HistoryMemory(), []
+
+    def llm(prompt):
+        prompts.append(prompt)
+        return f"conseil {len(prompts)}"
+    with contextlib.redirect_stdout(io.StringIO()):
+        for turn in (1, 2):
+            ei.run_one_turn(tribe, inertia, events, buf, "", turn, llm=llm, memory=mem)
+    assert "[TOURS]" not in prompts[0]
+    assert "[TOURS]\n[Tour 1] " in prompts[1] and "conseil 1" in prompts[1]
+    assert "(T1-T1, en cours)" in prompts[1]
+    assert [t for t, _ in mem.recent][-1].startswith("[Tour 2]")
@@ -0,0 +1,67 @@
+# test_http_util.py
+# read_request limits: oversized bodies get 413, malformed lengths 400, and the connection closes
+#
+# Usage:
+#   python -m pytest -q test_http_util.py
+
+import asyncio
+import json
+
+import pytest
+
+import http_util
+from http_util import HTTPError, read_request
+from llm_stub import StubLLMServer
+from server import GameServer
+
+
+def _read(raw: bytes):
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        return await read_request(reader), reader
+    return asyncio.run(run())
+
+
+def _request(length: str, body: bytes = b"") -> bytes:
+    return f"POST /x HTTP/1.1\r\nHost: x\r\nContent-Length: {length}\r\n\r\n".encode() + body
+
+
+def test_body_read_exactly():
+    req, _ = _read(_request("2", b"{}") + b"GET /next HTTP/1.1\r\n\r\n")
+    assert req.body == b"{}" and req.json() == {}
+
+
+@pytest.mark.parametrize("length, status", [("abc", 400), ("-1", 400), ("1e3", 400), ("11", 413)])
+def test_bad_lengths_raise(length, status, monkeypatch):
+    monkeypatch.setattr(http_util, "MAX_BODY", 10)
+    with pytest.raises(HTTPError) as e:
+        _read(_request(length, b"x" * 11))
+    assert e.value.status == status
+
+
+async def _exchange(port: int, raw: bytes):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw)
+    await writer.drain()
+    data = await asyncio.wait_for(reader.read(), 5)  # EOF: the server closed the connection
+    writer.close()
+    head, _, body = data.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+@pytest.mark.parametrize("length, status", [("abc", 400), ("11", 413)])
+def test_servers_answer_and_close(length, status, tmp_path, monkeypatch):
+    monkeypatch.setattr(http_util, "MAX_BODY", 10)
+    # The unread body would otherwise be parsed as the next request line
+    raw = _request(length, b'{"orders":1}') + b"GET /health HTTP/1.1\r\n\r\n"
+
+    async def run():
+        async with StubLLMServer() as stub:
+            got = [await _exchange(stub.port, raw)]
+        async with GameServer(str(tmp_path), workers=1) as srv:
+            got.append(await _exchange(srv.port, raw))
+        return got
+    for code, body in asyncio.run(run()):
+        assert code == status and "error" in body
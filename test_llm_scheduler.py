@@ -0,0 +1,123 @@
+# test_llm_scheduler.py
+# LLMScheduler against the local stub endpoint (llm_stub.StubLLMServer) injecting throttling
+#
+# Usage:
+#   python -m pytest -q test_llm_scheduler.py
+
+import asyncio
+import random
+import time
+
+import pytest
+
+from advisor import AsyncAdvisor
+from engine import LLM_FALLBACK_PREFIX
+from llm_scheduler import BACKGROUND, INTERACTIVE, LLMScheduler, TokenBucket
+from llm_stub import StubLLMServer
+from metrics import Metrics
+
+
+async def _with_stub(test, **stub_kwargs):
+    async with StubLLMServer(reply=lambda p: f"re:{p}", **stub_kwargs) as stub:
+        async with AsyncAdvisor(base_url=stub.base_url, api_key="stub", max_concurrency=16) as llm:
+            return await test(stub, llm)
+
+
+def _scheduler(llm, **kwargs):
+    kwargs.setdefault("base_delay", 0.01)
+    return LLMScheduler(llm.complete, rng=random.Random(0), metrics=Metrics(), **kwargs)
+
+
+def test_429_backs_off_for_retry_after():
+    async def run(stub, llm):
+        async with _scheduler(llm) as sched:
+            t0 = time.monotonic()
+            text = await sched.request("a")
+            return text, time.monotonic() - t0, sched.stats
+    text, elapsed, stats = asyncio.run(_with_stub(run, errors=[429], retry_after=0.3))
+    assert text == "re:a"
+    assert elapsed >= 0.3  # base_delay alone would retry within 10 ms
+    assert stats["throttled"] == 1 and stats["retries"] == 1 and stats["calls"] == 2
+
+
+def test_5xx_retries_then_succeeds():
+    async def run(stub, llm):
+        async with _scheduler(llm, max_retries=3) as sched:
+            return await sched.request("a"), stub.statuses
+    text, statuses = asyncio.run(_with_stub(run, errors=[500, 503, 502]))
+    assert text == "re:a" and statuses == [500, 503, 502, 200]
+
+
+def test_5xx_gives_up_after_max_retries():
+    async def run(stub, llm):
+        async with _scheduler(llm, max_retries=2) as sched:
+            with pytest.raises(Exception) as e:
+                await sched.request("a")
+            fallback = await sched.advise("b")
+            return e.value, fallback, stub.statuses, sched.stats
+    error, fallback, statuses, stats = asyncio.run(_with_stub(run, errors=[500] * 6))
+    assert getattr(error, "status_code", None) == 500
+    assert fallback.startswith(LLM_FALLBACK_PREFIX)
+    assert statuses == [500] * 6  # 1 + 2 retries, twice
+    assert stats["failures"] == 2
+
+
+def test_identical_prompts_in_flight_are_coalesced():
+    async def run(stub, llm):
+        async with _scheduler(llm) as sched:
+            texts = await asyncio.gather(*[sched.request("même") for _ in range(5)], sched.request("autre"))
+            return texts, stub.prompts, sched.stats
+    texts, prompts, stats = asyncio.run(_with_stub(run, latency=0.1))
+    assert texts == ["re:même"] * 5 + ["re:autre"]
+    assert sorted(prompts) == ["autre", "même"]
+    assert stats["coalesced"] == 4
+
+
+def test_interactive_served_before_background():
+    async def run(stub, llm):
+        async with _scheduler(llm, max_in_flight=1) as sched:
+            first = asyncio.ensure_future(sched.request("tour 1"))
+            await asyncio.sleep(0.02)  # in flight, holding the only slot
+            queued = [asyncio.ensure_future(sched.request(p, BACKGROUND)) for p in ("résumé 1", "résumé 2")]
+            queued.append(asyncio.ensure_future(sched.request("tour 2", INTERACTIVE)))
+            await asyncio.gather(first, *queued)
+            return stub.prompts
+    prompts = asyncio.run(_with_stub(run, latency=0.05))
+    assert prompts == ["tour 1", "tour 2", "résumé 1", "résumé 2"]
+
+
+def _spacing(starts):
+    return [b - a for a, b in zip(starts, starts[1:])]
+
+
+@pytest.mark.parametrize("limit", ["rpm", "tpm"])
+def test_token_buckets_space_requests(limit):
+    async def run(stub, llm):
+        starts = []
+
+        async def complete(prompt):
+            starts.append(time.monotonic())
+            return await llm.complete(prompt)
+        sched = LLMScheduler(complete, max_tokens=99, metrics=Metrics())
+        # Bursts of one call: 10 requests/s, or 10 × 100 tokens/s
+        if limit == "rpm":
+            sched.requests = TokenBucket(600, capacity=1)
+        else:
+            sched.tokens = TokenBucket(60_000, capacity=100)
+        async with sched:
+            await asyncio.gather(*[sched.request(f"p{i}") for i in range(4)])
+        return starts
+    starts = asyncio.run(_with_stub(run))
+    assert len(starts) == 4
+    assert all(gap >= 0.08 for gap in _spacing(starts)), _spacing(starts)
+
+
+def test_token_bucket_refills_at_rate():
+    now = [0.0]
+    bucket = TokenBucket(60, capacity=2, clock=lambda: now[0])  # 1 per second
+    assert bucket.delay(2) == 0
+    bucket.take(2)
+    assert bucket.delay(1) == pytest.approx(1.0)
+    now[0] = 0.5
+    assert bucket.delay(1) == pytest.approx(0.5)
+    assert bucket.delay(5) == pytest.approx(1.5)  # capped at a full bucket
@@ -0,0 +1,67 @@
+# test_local_advisor.py
+# local_advice under the tribe's own season factors, and hedge_sync past its deadline
+#
+# Usage:
+#   python -m pytest -q test_local_advisor.py
+
+import random
+import threading
+import time
+
+from advisor_cache import AdvisorCache
+from engine import LLM_FALLBACK_PREFIX, SEASONAL_AGRI, Ruleset
+from local_advisor import hedge_sync, local_advice
+from test_parity import random_tribe
+
+SHORT = {"season": "winter", "stocks": {"🥫": 2}, "food_report": {"net": -5, "consumed": 10}}
+
+
+def test_season_factor_comes_from_the_tribe_ruleset():
+    tribe = random_tribe(random.Random(0))
+    default = local_advice(SHORT, tribe.assign)
+    assert "Renforcer 🐟" in default.text  # winter 0.2: fields are not worth it
+    mild = Ruleset(seasonal_agri=dict(SEASONAL_AGRI, winter=1.0))
+    advice = local_advice(SHORT, tribe.assign, rules=mild)
+    assert "Renforcer 🌾" in advice.text
+    assert all(m["activity"] != "🐟" for m in advice.options["prudent"])
+
+
+def test_late_call_is_abandoned_and_still_lands_in_the_cache():
+    cache = AdvisorCache()
+    release = threading.Event()
+
+    def call():
+        release.wait(5)
+        return "tardif"
+
+    text, source = hedge_sync(lambda: cache.get_or_call("k", call), lambda r: f"{LLM_FALLBACK_PREFIX} {r}", deadline=0.05)
+    assert source == "local" and "dépassé" in text
+    assert cache.get("k") is None
+    release.set()
+    for _ in range(100):
+        if cache.get("k") == "tardif":
+            break
+        time.sleep(0.01)
+    assert cache.get("k") == "tardif"
+
+
+def test_cache_takes_writes_from_many_threads(tmp_path):
+    cache = AdvisorCache(max_entries=50, directory=tmp_path)
+    errors = []
+
+    def writer(n):
+        try:
+            for i in range(200):
+                cache.put(f"{(n * 7 + i) % 80:064x}", f"texte {n}/{i}")
+                cache.get(f"{i % 80:064x}")
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert cache.stats["entries"] == 50
+    assert not list(tmp_path.rglob("*.tmp"))
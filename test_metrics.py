@@ -0,0 +1,93 @@
+# test_metrics.py
+# Per-turn metrics records and the memory, JSON lines and Prometheus sinks
+#
+# Usage:
+#   python -m pytest -q test_metrics.py
+
+import json
+
+import pytest
+
+import metrics as m
+from metrics import Histogram, JsonlSink, MemorySink, Metrics, PrometheusSink, configure, current_metrics
+
+
+def _turns(reg, n=3):
+    for t in range(1, n + 1):
+        with reg.turn(t, session="a"):
+            reg.observe("engine", 0.002 * t)
+            with reg.span("render"):
+                pass
+            reg.incr("prompt_tokens", 100)
+    reg.incr("llm_retries")  # outside any turn: totals only
+
+
+def test_records_group_spans_and_counters_per_turn():
+    sink = MemorySink(max_records=2)
+    reg = Metrics([sink], labels={"host": "x"})
+    _turns(reg)
+    assert [r["turn"] for r in sink.records] == [2, 3]
+    last = sink.records[-1]
+    assert last["labels"] == {"host": "x", "session": "a"}
+    assert last["spans"]["engine"] == pytest.approx(0.006) and "render" in last["spans"]
+    assert last["counters"] == {"prompt_tokens": 100}
+    assert reg.counters == {"prompt_tokens": 300, "llm_retries": 1}
+    assert sink.values("engine") == pytest.approx([0.004, 0.006])
+    assert sink.percentile(50, "engine") == pytest.approx(0.004)
+    assert sink.percentile(51, "engine") == sink.percentile(100, "engine") == pytest.approx(0.006)
+
+
+def test_failed_turn_is_still_recorded():
+    sink = MemorySink()
+    reg = Metrics([sink])
+    with pytest.raises(KeyError):
+        with reg.turn(1):
+            raise KeyError("x")
+    assert sink.records[0]["error"] == "KeyError" and reg.turns.count == 1
+
+
+def test_disabled_registry_records_nothing():
+    reg = Metrics([MemorySink()], enabled=False)
+    _turns(reg)
+    assert reg.snapshot() == {"turns": {"count": 0, "sum": 0.0}, "phases": {}, "counters": {}}
+    assert not reg.sinks[0].records
+
+
+def test_jsonl_sink_buffers_until_flush(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    sink = JsonlSink(str(path), flush_every=2)
+    with Metrics([sink]) as reg:
+        _turns(reg, 1)
+        assert path.read_text(encoding="utf-8") == ""
+        _turns(reg, 2)
+    lines = [json.loads(l) for l in path.read_text(encoding="utf-8").splitlines()]
+    assert [r["turn"] for r in lines] == [1, 1, 2]
+    assert lines[-1]["counters"] == {"prompt_tokens": 100}
+
+
+def test_prometheus_text(tmp_path):
+    path = tmp_path / "society.prom"
+    with Metrics([PrometheusSink(str(path), interval=3600)], labels={"host": 'a"b'}) as reg:
+        _turns(reg)
+        first = path.read_text(encoding="utf-8")  # written on the first turn only
+    text = path.read_text(encoding="utf-8")
+    assert first != text
+    assert 'society_turn_seconds_count{host="a\\"b"} 3' in text
+    assert 'society_turn_phase_seconds_bucket{host="a\\"b",phase="engine",le="0.005"} 2' in text
+    assert 'society_turn_phase_seconds_bucket{host="a\\"b",phase="engine",le="+Inf"} 3' in text
+    assert 'society_prompt_tokens_total{host="a\\"b"} 300' in text
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_histogram_buckets_are_upper_bounds():
+    h = Histogram((0.1, 1.0))
+    for v in (0.1, 0.5, 2.0):
+        h.observe(v)
+    assert h.cumulative() == [1, 2, 3]
+
+
+def test_configure_installs_and_restores_the_default(monkeypatch):
+    monkeypatch.setattr(m, "_CURRENT", m.NULL_METRICS)
+    reg = configure(MemorySink())
+    assert current_metrics() is reg and reg.enabled
+    assert configure() is m.NULL_METRICS and current_metrics() is m.NULL_METRICS
@@ -0,0 +1,66 @@
+# test_optimizer.py
+# optimize_assignments on cases where the stored food objective min(net, 🥫 capacity) binds
+#
+# Usage:
+#   python -m pytest -q test_optimizer.py
+
+import random
+
+import pytest
+
+from engine import Demographics, Assignments, Resources, Tribe, InertiaTracker, MAN, WOMAN, CHILD
+from optimizer import Constraints, Objectives, optimize_assignments
+from test_parity import random_tribe
+
+SEASONS = ("spring", "summer", "autumn", "winter")
+
+
+def idle(tribe, per_activity, worker, field):
+    return getattr(tribe.demo, field) - sum(m.get(worker, 0) for m in per_activity.values())
+
+
+@pytest.mark.parametrize("season", SEASONS)
+def test_capacity_binding_keeps_raising_food_and_storage(season):
+    # Only 🧔‍♂️ add 🥫 capacity (100 each); 👩 only add food. The optimum splits the men
+    # between storage and food and puts the women on food: about 32700 stored.
+    tribe = Tribe(Demographics(men=2000, women_active=2000, children=1, king=1), Assignments({"🥫": {MAN: 1}}),
+                  Resources(stocks={"🥫": 0}), season=season, king_activity="")
+    plan = optimize_assignments(tribe)
+    assert plan.food["stored"] == plan.food["capacity"]
+    assert plan.food["stored"] >= 32_000
+    assert idle(tribe, plan.per_activity, MAN, "men") == 0
+    assert idle(tribe, plan.per_activity, WOMAN, "women_active") < 20
+
+
+def test_capacity_bound_from_equal_start():
+    # Net food already equals the capacity: every single move scores zero
+    tribe = Tribe(Demographics(men=199, women_active=200, king=1),
+                  Assignments({"🥫": {MAN: 1}, "🐟": {MAN: 50}}), Resources(stocks={"🥫": 0}),
+                  season="winter", king_activity="")
+    before = tribe.fork().next_turn()["food_report"]
+    assert before["stored"] == before["capacity"] == 100
+    plan = optimize_assignments(tribe)
+    assert plan.food["stored"] > 1000
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_never_worse_and_within_constraints(seed):
+    rng = random.Random(seed)
+    tribe = random_tribe(rng)
+    tribe.demo.men += 30
+    tribe.demo.women_active += 30
+    current = tribe.fork().next_turn()["food_report"]
+    inertia = InertiaTracker(tribe.assign.to_dict())
+    plan = optimize_assignments(tribe, Objectives(), Constraints(inertia=inertia))
+    if current["net"] >= 0:
+        assert plan.food["stored"] >= current["stored"]
+    else:
+        assert plan.food["net"] >= current["net"]
+    moved = {}
+    for m in plan.moves:
+        moved[m["activity"]] = moved.get(m["activity"], 0) + abs(m["delta"])
+    assert all(n <= inertia.threshold for n in moved.values())
+    for worker, field in ((MAN, "men"), (WOMAN, "women_active"), (CHILD, "children")):
+        # Never assigns more workers than exist (unless the tribe already did)
+        before = idle(tribe, tribe.assign.per_activity, worker, field)
+        assert idle(tribe, plan.per_activity, worker, field) >= min(0, before)
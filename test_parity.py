@@ -0,0 +1,110 @@
+# test_parity.py
+# Seeded parity checks for the fast engine paths
+# - TribeBatch.next_turn against the scalar Tribe.next_turn, tribe by tribe
+# - Incremental Tribe.next_turn (TurnMemo) against a full recompute, through moves,
+#   season changes and king reassignments
+# - InertiaBatch against the scalar InertiaTracker, including activities emptied to 0 workers
+#   (still in the mapping) and activities dropped from it
+#
+# Usage:
+#   python -m pytest -q test_parity.py
+
+import random
+
+import pytest
+
+from engine import Demographics, Assignments, Resources, Tribe, InertiaTracker, default_ruleset
+from batch import TribeBatch, InertiaBatch
+
+SEASONS = ("spring", "summer", "autumn", "winter")
+SEEDS = range(5)
+
+
+def random_tribe(rng: random.Random) -> Tribe:
+    rs = default_ruleset()
+    demo = Demographics(*(rng.randint(0, 40) for _ in range(7)), king=1)
+    pa = {}
+    for a in rng.sample(list(rs.activities), rng.randint(1, len(rs.activities))):
+        pa[a] = {w: rng.randint(0, 12) for w in rng.sample(list(rs.workers), rng.randint(1, 4))}
+    return Tribe(demo, Assignments(pa), Resources(stocks={"🥫": rng.randint(0, 500), "🔧": rng.randint(0, 20)}),
+                 season=rng.choice(SEASONS), king_activity=rng.choice(list(rs.activities) + [""]),
+                 king_bonus=rng.choice((0.0, 0.2, 0.35)))
+
+
+def full_copy(t: Tribe) -> Tribe:
+    """Same state, fresh Assignments and no TurnMemo: next_turn recomputes everything."""
+    return Tribe(t.demo, Assignments(t.assign.to_dict()),
+                 Resources(stocks=dict(t.res.stocks)), t.season, t.king_activity, t.king_bonus)
+
+
+def mutate(t: Tribe, rng: random.Random):
+    rs = default_ruleset()
+    for _ in range(rng.randint(0, 3)):
+        a, w = rng.choice(rs.activities), rng.choice(rs.workers)
+        t.assign.add(a, w, max(-t.assign.count(a, w), rng.randint(-4, 4)))
+    if rng.random() < 0.3:
+        t.season = rng.choice(SEASONS)
+    if rng.random() < 0.2:
+        t.king_activity = rng.choice(rs.activities)
+    if rng.random() < 0.1:
+        t.king_bonus = rng.choice((0.0, 0.2, 0.35))
+
+
+def comparable(report):
+    return {k: (dict(v) if k in ("flows", "stocks") else v) for k, v in report.items()}
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_batch_matches_scalar(seed):
+    rng = random.Random(seed)
+    tribes = [random_tribe(rng) for _ in range(50)]
+    batch = TribeBatch.from_tribes(tribes)
+    for turn in range(6):
+        batch.next_turn()
+        for i, t in enumerate(tribes):
+            assert batch.report(i) == comparable(t.next_turn()), (seed, turn, i)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_incremental_matches_full(seed):
+    rng = random.Random(seed)
+    for _ in range(10):
+        t = random_tribe(rng)
+        for turn in range(20):
+            full = full_copy(t).next_turn()
+            assert comparable(t.next_turn()) == comparable(full), (seed, turn)
+            mutate(t, rng)
+
+
+def reshuffle(t: Tribe, rng: random.Random):
+    """Moves plus the edge cases of presence: an activity emptied to 0, one dropped, one re-added."""
+    mutate(t, rng)
+    acts = list(t.assign.per_activity)
+    if acts and rng.random() < 0.3:
+        a = rng.choice(acts)
+        for w in list(t.assign.per_activity[a]):
+            t.assign.set(a, w, 0)  # stays in the mapping with no workers
+    if acts and rng.random() < 0.15:
+        del t.assign.per_activity[rng.choice(acts)]
+    if rng.random() < 0.15:
+        t.assign.per_activity[rng.choice(default_ruleset().activities)] = {}
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_inertia_batch_matches_scalar(seed):
+    rng = random.Random(seed)
+    tribes = [random_tribe(rng) for _ in range(30)]
+    trackers = [InertiaTracker() for _ in tribes]
+    batch = TribeBatch.from_tribes(tribes)
+    inertia = InertiaBatch.from_trackers(batch, trackers)
+    for turn in range(15):
+        for i, t in enumerate(tribes):
+            batch.set_tribe(i, t)
+        flows = inertia.apply(batch.next_turn()["flows"])
+        for i, (t, tracker) in enumerate(zip(tribes, trackers)):
+            expected = tracker.apply(t.assign.per_activity, t.next_turn()["flows"])
+            got = {a: int(flows[i, k]) for k, a in enumerate(batch.activities) if batch.stockable[k]}
+            assert got == {a: expected[a] for a in got}, (seed, turn, i)
+            assert inertia.tracker(i).cooldowns == tracker.cooldowns, (seed, turn, i)
+        for t in tribes:
+            reshuffle(t, rng)
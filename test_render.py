@@ -0,0 +1,26 @@
+# test_render.py
+# render_compact (uncached) and CompactRenderer (per-line cache) give the same text
+#
+# Usage:
+#   python -m pytest -q test_render.py
+
+import random
+
+import pytest
+
+from engine import CompactRenderer, render_compact
+from test_parity import random_tribe, mutate
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_render_compact_matches_renderer(seed):
+    rng = random.Random(seed)
+    tribes = [random_tribe(rng) for _ in range(20)]
+    own = [CompactRenderer() for _ in tribes]
+    for turn in range(5):
+        for t, r in zip(tribes, own):
+            report = t.next_turn()
+            text = render_compact(report, t.assign, t.demo)
+            assert text == r.render(report, t.assign, t.demo), (seed, turn)
+            assert text == CompactRenderer().render(report, t.assign, t.demo), (seed, turn)
+            mutate(t, rng)
@@ -0,0 +1,101 @@
+# test_server.py
+# GameServer.play_turn keeps memory and disk in step when persisting a turn fails
+#
+# Usage:
+#   python -m pytest -q test_server.py
+
+import asyncio
+
+import pytest
+
+import server
+from journal import TurnJournal
+from server import GameServer
+
+
+async def _advise(prompt):
+    return "[CHOIX]\n1. ok"
+
+
+def _failing_once(monkeypatch, cls, name):
+    real = getattr(cls, name)
+    calls = []
+
+    def fail(self, *args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError("disque plein")
+        return real(self, *args, **kwargs)
+    monkeypatch.setattr(cls, name, fail)
+
+
+def _disk_state(srv, c):
+    s = srv._load(c.directory)
+    return s.turn, server.dumps_game(s.tribe, s.inertia, s.events, s.turn)
+
+
+async def _play(tmp_path, monkeypatch, cls, name):
+    async with GameServer(str(tmp_path), _advise, workers=1) as srv:
+        c = srv.create(seed=1)
+        _failing_once(monkeypatch, cls, name)
+        with pytest.raises(OSError):
+            await srv.play_turn(c, "go")
+        # In memory exactly what the disk holds
+        turn, data = _disk_state(srv, c)
+        assert c.turn == turn
+        assert server.dumps_game(c.tribe, c.inertia, c.events, c.turn) == data
+        failed_at = c.turn
+        res = await srv.play_turn(c, "go")
+        assert res["turn"] == failed_at + 1 == c.turn
+        assert _disk_state(srv, c)[0] == c.turn
+        assert srv._journal(c).turns[-1] == c.turn
+        return failed_at, srv._journal(c).turns
+
+
+def test_failed_snapshot_keeps_the_turn(tmp_path, monkeypatch):
+    failed_at, turns = asyncio.run(_play(tmp_path, monkeypatch, GameServer, "_save"))
+    assert failed_at == 0 and turns == [1]
+
+
+def test_failed_journal_write_keeps_the_saved_turn(tmp_path, monkeypatch):
+    # The snapshot made it: turn 1 happened, only its journal record is missing
+    failed_at, turns = asyncio.run(_play(tmp_path, monkeypatch, TurnJournal, "append"))
+    assert failed_at == 1 and turns == [2]
+
+
+async def _bad_turn(tmp_path, monkeypatch, moves=None, fail=None):
+    async with GameServer(str(tmp_path), _advise, workers=1) as srv:
+        c = srv.create(seed=1)
+        before = _disk_state(srv, c)
+        if fail:
+            _failing_once(monkeypatch, *fail)
+        with pytest.raises((ValueError, OSError)):
+            await srv.play_turn(c, "go", moves)
+        assert c.turn == 0
+        assert (c.turn, server.dumps_game(c.tribe, c.inertia, c.events, c.turn)) == before == _disk_state(srv, c)
+        res = await srv.play_turn(c, "go")
+        return res["turn"], srv._journal(c).turns
+
+
+def test_out_of_range_moves_change_nothing(tmp_path, monkeypatch):
+    moves = [{"activity": "🌾", "worker": "🧔‍♂️", "delta": 5}, {"activity": "🌾", "worker": "🧔‍♂️", "delta": -10000}]
+    assert asyncio.run(_bad_turn(tmp_path, monkeypatch, moves)) == (1, [1])
+
+
+def test_failed_step_restores_the_saved_state(tmp_path, monkeypatch):
+    # The engine step raises after the moves were applied
+    moves = [{"activity": "🌾", "worker": "🧔‍♂️", "delta": 2}]
+    assert asyncio.run(_bad_turn(tmp_path, monkeypatch, moves, (server.EventEngine, "roll"))) == (1, [1])
+
+
+@pytest.mark.parametrize("seed", ["abc", 1.5, True, [1]])
+def test_create_rejects_non_integer_seeds(tmp_path, seed):
+    async def run():
+        async with GameServer(str(tmp_path), _advise, workers=1) as srv:
+            with pytest.raises(ValueError):
+                srv.create("b", seed=seed)
+            assert srv.get("b") is None
+            srv.create("b", seed=2**40)
+            srv.unload("b")
+            assert srv.get("b").id == "b"
+    asyncio.run(run())
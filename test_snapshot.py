@@ -0,0 +1,100 @@
+# test_snapshot.py
+# Save/load round trips continue exactly like an uninterrupted run
+#
+# Usage:
+#   python -m pytest -q test_snapshot.py
+
+import os
+import random
+
+import numpy as np
+import pytest
+
+from batch import TribeBatch, InertiaBatch, EventBatch
+from engine import EventEngine, EventSpec, InertiaTracker, step_turn
+from snapshot import save_batch, load_batch, dumps_game, loads_game
+from test_parity import random_tribe, mutate
+
+
+def _storm(tribe):
+    tribe.res.stocks["🥫"] = max(0, tribe.res.stocks.get("🥫", 0) - 10)
+    return "Orage sur les réserves."
+
+
+_EVENTS = [EventSpec("Orage", 0.3, 2, _storm, cooldown=2), EventSpec("Marchands", 0.2, 1, lambda t: "Marchands."),
+           EventSpec("Épidémie", 0.05, 3, lambda t: "Épidémie.", cooldown=4)]
+SPECS = {season: _EVENTS for season in ("spring", "summer", "autumn", "winter")}
+
+
+def step(batch, inertia, events, rng):
+    # Random reassignments so inertia cooldowns keep firing
+    rows = rng.integers(0, batch.n, size=batch.n // 4)
+    batch.assign[rows] = np.maximum(0, batch.assign[rows] + rng.integers(-3, 4, size=batch.assign[rows].shape))
+    report = batch.next_turn()
+    flows = inertia.apply(report["flows"])
+    hits = events.roll()
+    return flows, hits, batch.stocks.copy()
+
+
+def run(batch, inertia, events, turns, seed):
+    rng = np.random.default_rng(seed)
+    return [step(batch, inertia, events, rng) for _ in range(turns)]
+
+
+def new_batch(seed):
+    rng = random.Random(seed)
+    batch = TribeBatch.from_tribes([random_tribe(rng) for _ in range(40)])
+    batch.season[:] = 0
+    return batch, InertiaBatch(batch), EventBatch(batch, SPECS, rng_seed=seed)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_batch_round_trip_continues_identically(seed, tmp_path):
+    batch, inertia, events = new_batch(seed)
+    run(batch, inertia, events, 5, seed)
+    path = os.path.join(tmp_path, "batch.snap")
+    save_batch(path, batch, inertia, events, turn=5)
+    expected = run(batch, inertia, events, 10, seed + 100)
+
+    state = load_batch(path, specs_by_season=SPECS)
+    assert state.turn == 5
+    got = run(state.batch, state.inertia, state.events, 10, seed + 100)
+    for (f1, h1, s1), (f2, h2, s2) in zip(expected, got):
+        np.testing.assert_array_equal(f1, f2)
+        np.testing.assert_array_equal(h1, h2)
+        np.testing.assert_array_equal(s1, s2)
+
+
+def test_batch_without_state_loads_arrays_only(tmp_path):
+    batch, _, _ = new_batch(0)
+    path = os.path.join(tmp_path, "batch.snap")
+    save_batch(path, batch)
+    state = load_batch(path, specs_by_season=SPECS)
+    assert state.inertia is None and state.events is None
+    np.testing.assert_array_equal(state.batch.assign, batch.assign)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2, None])
+def test_game_round_trip_continues_identically(seed):
+    # None: an unseeded engine (main.new_game's default) resumes from its live RNG state
+    rng = random.Random(seed)
+    tribe, inertia, events = random_tribe(rng), InertiaTracker(), EventEngine(SPECS, rng_seed=seed)
+    for _ in range(5):
+        step_turn(tribe, inertia, events)
+        mutate(tribe, rng)
+    data = dumps_game(tribe, inertia, events, 5)
+    moves = random.Random((seed or 0) + 100)
+
+    def play(tribe, inertia, events):
+        out = []
+        for _ in range(10):
+            report, names = step_turn(tribe, inertia, events)
+            out.append((dict(report["flows"]), dict(report["stocks"]), names))
+            mutate(tribe, moves)
+        return out
+
+    expected = play(tribe, inertia, events)
+    moves.seed((seed or 0) + 100)
+    s = loads_game(data, SPECS)
+    assert s.events.rng_seed == seed
+    assert play(s.tribe, s.inertia, s.events) == expected
@@ -0,0 +1,36 @@
+# test_startup.py
+# Startup profiler smoke test and the headless import guarantee
+#
+# Usage:
+#   python -m pytest -q test_startup.py
+
+import io
+import subprocess
+import sys
+
+from startup import HERE, headless_leaks, phases, profile_startup
+
+
+def test_headless_modules_do_not_load_the_llm_stack():
+    assert headless_leaks() == []
+
+
+def test_leak_check_sees_a_direct_import():
+    assert headless_leaks(("engine", "yaml")) == ["yaml"]
+
+
+def test_profile_reports_every_phase():
+    out = io.StringIO()
+    rows = profile_startup(out=out)
+    assert [r[0] for r in rows] == [name for name, _ in phases("")]
+    assert all(ms >= 0 for _, ms, _ in rows)
+    assert all(status == "ok" or status.startswith("not installed") for _, _, status in rows)
+    text = out.getvalue()
+    assert "total" in text and text.rstrip().endswith("headless imports: clean")
+
+
+def test_main_flag_exits_before_loading_the_game():
+    run = subprocess.run([sys.executable, "main.py", "--profile-startup"], cwd=HERE,
+                         capture_output=True, text=True, timeout=60)
+    assert run.returncode == 0, run.stderr
+    assert "headless imports: clean" in run.stdout